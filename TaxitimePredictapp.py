@@ -1,57 +1,228 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import xgboost as xgb
-import lightgbm as lgb
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-from sklearn.linear_model import LinearRegression
-import optuna
-import matplotlib.pyplot as plt
-import seaborn as sns
-import joblib
 import warnings
-import time
+import os
+import json
+import copy
+
+import atd_collinearity as collinearity
+import atd_engine as engine
+import atd_explain as explain
+import atd_whatif as whatif
+import atd_ingest as ingest
+import atd_jobs as jobs
+import atd_lazy as lazy
+import atd_store as datastore
+import atd_trace as trace
+from atd_registry import ModelRegistry
 
 warnings.filterwarnings('ignore')
 
+# 그래프/학습 라이브러리는 해당 탭·학습 모드에서 처음 쓸 때 import (업로드 화면은 바로 뜸, atd_lazy)
+plt = lazy.module('matplotlib.pyplot')
+sns = lazy.module('seaborn')
+
 # 폰트 깨짐 방지를 위해 영문 라벨 사용 (한글 폰트 설정 제거)
 # plt.rcParams['font.family'] = 'Malgun Gothic'
 # plt.rcParams['axes.unicode_minus'] = False
 
 st.set_page_config(page_title="❄️ ATD-RAM 예측 랩", layout="wide")
 
+# 세션별 계측기: 데이터 로드 / 필터 / 학습(trial, 재학습, 메타 모델) / SHAP / VIF / 예측 구간을 기록 (사이드바 계측 패널)
+if 'tracer' not in st.session_state:
+    st.session_state['tracer'] = trace.Tracer()
+trace.use(st.session_state['tracer'])
+
+# 화면 라벨 -> 학습 엔진 옵션 매핑
+SOURCE_UPLOAD, SOURCE_DATASET = 'upload', 'dataset'
+DATA_SOURCES = {
+    "📤 파일 업로드": SOURCE_UPLOAD,
+    "🗄️ 로컬 증분 데이터셋": SOURCE_DATASET,
+}
+LEARNING_MODES = {
+    "🚀 빠른 분석 (XGBoost 단일)": engine.MODE_SINGLE,
+    "🎯 영혼 끌어모으기 (Stacking)": engine.MODE_STACKING,
+}
+PRUNERS = {
+    "끄기": engine.PRUNER_NONE,
+    "Median": engine.PRUNER_MEDIAN,
+    "Hyperband": engine.PRUNER_HYPERBAND,
+}
+REFITS = {
+    "처음부터 전체 재학습 (기본)": engine.REFIT_FULL,
+    "최적 라운드 수로 재학습": engine.REFIT_BEST_ROUNDS,
+    "튜닝된 부스터 이어서 학습": engine.REFIT_CONTINUE,
+}
+TEST_MODES = {
+    "학습 데이터 내에서 10% 자동 분할 (기본)": engine.SPLIT_AUTO,
+    "특정 연도를 통째로 평가(Test)에 배정": engine.SPLIT_HOLDOUT,
+    "선택한 연도 전체를 학습하고 자체 평가 (In-Sample)": engine.SPLIT_IN_SAMPLE,
+}
+
 # ==========================================
 # 0. 사이드바 - 데이터 업로드 구역
 # ==========================================
 st.sidebar.header("📁 데이터 업로드")
-st.sidebar.info("코랩에서 만든 `ATD_RAM_Master.parquet` 파일을 여기에 올려주세요!")
-uploaded_file = st.sidebar.file_uploader("데이터 파일 업로드", type=['parquet'])
+data_source = st.sidebar.radio("데이터 소스", list(DATA_SOURCES), horizontal=True,
+                               help="로컬 증분 데이터셋은 일일 추출본만 추가하고, 필터/연도/변수에 해당하는 부분만 읽어옵니다.")
+
+if DATA_SOURCES[data_source] == SOURCE_UPLOAD:
+    st.sidebar.info("코랩에서 만든 `ATD_RAM_Master.parquet` 파일을 여기에 올려주세요!")
+    uploaded_file = st.sidebar.file_uploader("데이터 파일 업로드", type=['parquet'])
+else:
+    dataset_root = st.sidebar.text_input("데이터셋 폴더", ingest.DEFAULT_ROOT)
+    extract_file = st.sidebar.file_uploader("📥 일일 RAM/ATD 추출본 추가", type=['parquet'],
+                                            help="마스터 파일 전체를 올려 데이터셋을 처음 만들 수도 있습니다. 같은 편(FLT + RAM_Datetime)은 새 값으로 교체됩니다.")
+    if extract_file is not None and st.sidebar.button("➕ 데이터셋에 추가", use_container_width=True):
+        try:
+            summary = ingest.append_extract(extract_file, dataset_root)
+            st.sidebar.success(f"✅ {summary['rows_added']:,} 건 추가 ({len(summary['partitions'])}개 월 파티션 갱신)")
+            if summary['missing_columns']:
+                st.sidebar.warning(f"⚠️ 추출본에 없는 컬럼은 빈 값으로 저장했습니다: {', '.join(summary['missing_columns'])}")
+        except (KeyError, ValueError, OSError) as e:
+            st.sidebar.error(f"🚨 추출본을 추가할 수 없습니다: {e}")
+
+compact = st.sidebar.toggle("🗜️ 메모리 절약 모드", value=False,
+                            help="문자열은 category/Arrow 문자열, 숫자는 float32/작은 정수형으로 읽어 메모리를 절반 이하로 줄입니다. "
+                                 "XGBoost 결과는 같지만 LightGBM(스태킹 모드)은 실수 값의 bin 경계가 달라져 결과가 조금 달라질 수 있습니다.")
 
 # ==========================================
-# 1. 데이터 로드 (업로드된 파일 읽기)
+# 1. 데이터 로드 (업로드된 파일 읽기 / 로컬 데이터셋 열기)
 # ==========================================
-@st.cache_data
-def load_data(file):
+@st.cache_resource
+def dataset_store():
+    # 업로드 파일 -> 내용 해시 이름의 Arrow 파일 (모든 세션/학습 워커가 memory map으로 공유)
+    return datastore.DatasetStore()
+
+@st.cache_resource(max_entries=4)
+def open_stored(digest, compact=False):
+    # 같은 내용의 파일을 올린 세션들은 매핑 하나 + 필터 엔진(범주 코드/결과 캐시) 하나를 공유
+    return ingest.FrameSource(dataset_store().frame(digest, compact))
+
+def load_data(file, compact=False):
+    # 내용 해시는 업로드 파일당 한 번만 계산 (재실행마다 파일 전체를 다시 읽지 않음)
+    key = f"dataset_{file.file_id}_{compact}"
     try:
-        df = pd.read_parquet(file)
-        target_col = 'Target_ATD_RAM'
-        drop_from_train = ['Year', 'FLT', 'RAM_Datetime', target_col]
-        available_features = [c for c in df.columns if c not in drop_from_train]
-        return df, available_features, target_col
+        digest = st.session_state.get(key)
+        if digest is None or not dataset_store().exists(digest, compact):
+            digest = st.session_state[key] = dataset_store().put(file, compact)
+        return digest, open_stored(digest, compact)
     except Exception as e:
-        return None, None, None
-
-if uploaded_file is None:
-    st.title("📊 ATD-RAM 예측 대시보드")
-    st.warning("👈 사이드바에서 데이터 파일(`.parquet`)을 먼저 업로드해주세요!")
-    st.stop() 
-
-master_df, available_features, target_col = load_data(uploaded_file)
+        return None, None
+
+@st.cache_resource(max_entries=8)
+def read_dataset(root, version, spec_json, columns, years, compact=False):
+    # version: 파티션 파일 해시 -> 추출본이 추가되면 캐시가 자동으로 무효화됨
+    return ingest.DatasetSource(root, compact).read(json.loads(spec_json), list(columns), list(years))
+
+def read_filtered(spec, columns, years):
+    if isinstance(source, ingest.DatasetSource):
+        return read_dataset(source.root, source.version, json.dumps(spec, sort_keys=True), tuple(columns), tuple(years),
+                            source.compact)
+    return source.read(spec, columns, years)
+
+if DATA_SOURCES[data_source] == SOURCE_UPLOAD:
+    if uploaded_file is None:
+        st.title("📊 ATD-RAM 예측 대시보드")
+        st.warning("👈 사이드바에서 데이터 파일(`.parquet`)을 먼저 업로드해주세요!")
+        st.stop() 
+
+    dataset_digest, source = load_data(uploaded_file, compact)
+
+    if source is None:
+        st.error("🚨 파일을 읽는 중 오류가 발생했습니다. 정상적인 Parquet 파일인지 확인해주세요.")
+        st.stop()
+    stored = dataset_store()
+    st.sidebar.caption(f"🗄️ 공유 데이터 저장소 `{dataset_digest[:12]}` · {len(stored.entries())}개 / "
+                       f"{stored.total_bytes() / 2 ** 30:.2f} GB (한도 {stored.max_bytes / 2 ** 30:.0f} GB)")
+else:
+    if not ingest.dataset_exists(dataset_root):
+        st.title("📊 ATD-RAM 예측 대시보드")
+        st.warning(f"👈 `{dataset_root}` 데이터셋이 비어 있습니다. 사이드바에서 추출본을 먼저 추가해주세요!")
+        st.stop()
+    source = ingest.DatasetSource(dataset_root, compact)
+    with st.sidebar.expander(f"🗄️ 데이터셋 파티션 ({source.num_rows:,} 건)"):
+        st.dataframe(source.partitions(), hide_index=True, use_container_width=True)
 
-if master_df is None:
-    st.error("🚨 파일을 읽는 중 오류가 발생했습니다. 정상적인 Parquet 파일인지 확인해주세요.")
-    st.stop()
+# ==========================================
+# 1-5. 모델 레지스트리 (저장된 모델을 재학습 없이 바로 불러오기)
+# ==========================================
+registry = ModelRegistry()
+
+@st.cache_resource
+def load_registered_model(model_id):
+    return registry.load(model_id)
+
+@st.cache_resource
+def job_scheduler():
+    # 서버 프로세스당 하나 (모든 세션이 같은 작업 큐/워커를 공유, 워커 수: $ATD_JOB_WORKERS)
+    return jobs.JobScheduler(registry_root=registry.root)
+
+@st.cache_resource
+def contribution_cache():
+    return explain.ContributionCache()
+
+@st.cache_data(max_entries=16)
+def compute_vif(data_key, features, _X):
+    # 데이터 키(모델 ID + 데이터 범위) + 변수 조합별로 캐시
+    return collinearity.vif_table(_X, list(features))
+
+def editor_columns(schema):
+    # 입력 스키마 -> st.data_editor 컬럼 설정 (선택형은 드롭다운, 숫자는 학습 범위/간격)
+    config = {}
+    for name, spec in schema.items():
+        if spec['kind'] == 'choice':
+            config[name] = st.column_config.SelectboxColumn(name, options=spec['categories'])
+        elif spec['kind'] == 'number':
+            config[name] = st.column_config.NumberColumn(name, min_value=spec['min'], max_value=spec['max'], step=spec['step'])
+    return config
+
+def store_result(result):
+    # 학습 또는 불러온 모델의 결과를 다른 탭들이 쓰는 세션 상태에 저장
+    artifact = result.artifact
+    if getattr(artifact, 'schema', None) is None:
+        # 입력 스키마 없이 저장된 예전 모델은 평가 데이터로 만들어 둠
+        # -> 레지스트리 캐시(load_registered_model)의 공유 객체는 그대로 두고 이 세션의 사본에만 설정
+        artifact = copy.copy(artifact)
+        artifact.schema = engine.feature_profile(result.X_test)
+    st.session_state['artifact'] = artifact
+    # 배포되는 파이프라인 전체(스태킹이면 XGBoost + LightGBM + 메타 가중치)를 하나의 예측기로 -> SHAP/What-If/실시간 예측 공통 사용
+    st.session_state['predictor'] = explain.EnsemblePredictor(artifact)
+    st.session_state['xgb_model'] = artifact.xgb_model
+    st.session_state['meta_model'] = artifact.meta_model
+    st.session_state['metrics'] = result.metrics
+    st.session_state['test_actual'] = result.y_test
+    st.session_state['test_pred'] = result.y_pred
+    st.session_state['X_test'] = result.X_test
+    st.session_state['mode'] = {v: k for k, v in LEARNING_MODES.items()}[artifact.mode]
+    st.session_state['selected_features'] = artifact.features
+    # SHAP 캐시 키: 같은 모델이라도 평가 데이터가 바뀌면 다시 계산
+    st.session_state['explain_key'] = f"{artifact.model_id}:{engine.dataset_fingerprint(result.X_test)}"
+
+def load_model(model_id):
+    # 레지스트리 모델을 학습 당시 필터/연도 분할로 현재 데이터에 다시 평가해 세션에 올림 (실패하면 오류 메시지)
+    try:
+        artifact = load_registered_model(model_id)
+        years = engine.split_years(artifact.split_mode, artifact.train_years, artifact.test_years)
+        store_result(engine.evaluate_artifact(artifact, read_filtered(artifact.filter_spec, artifact.features, years)))
+    except (KeyError, engine.TrainingError) as e:
+        return str(e)
+    return None
+
+st.sidebar.header("💾 모델 레지스트리")
+registered_models = registry.list()
+if registered_models:
+    model_labels = {f"{m['model_name']} | MAE {m['metrics']['MAE']:.2f} | {m['created_at']}": m['model_id'] for m in registered_models}
+    picked_model = st.sidebar.selectbox("저장된 모델", list(model_labels))
+    if st.sidebar.button("📂 모델 불러오기", use_container_width=True):
+        error = load_model(model_labels[picked_model])
+        if error:
+            st.sidebar.error(f"🚨 현재 데이터로 모델을 평가할 수 없습니다: {error}")
+        else:
+            st.sidebar.success(f"✅ 모델 `{model_labels[picked_model]}` 불러오기 완료!")
+else:
+    st.sidebar.caption("아직 등록된 모델이 없습니다. 학습을 완료하면 자동으로 저장됩니다.")
 
 # ==========================================
 # 2. 사이드바 컨트롤러 (강력한 필터링 장착!)
@@ -60,7 +231,7 @@ st.sidebar.header("🎛️ 학습 및 시뮬레이션 세팅")
 
 learning_mode = st.sidebar.radio(
     "학습 모드 선택 (Speed vs Accuracy)",
-    ["🚀 빠른 분석 (XGBoost 단일", "🎯 영혼 끌어모으기 (Stacking)"]
+    list(LEARNING_MODES)
 )
 
 # 🌟 데이터 정밀 필터링 스위치 구역
@@ -70,30 +241,30 @@ st.sidebar.subheader("🔍 데이터 정밀 필터링 (Data Filters)")
 remove_outliers = st.sidebar.toggle("🚨 3-Sigma 극단치(대규모 지연) 제외", value=True)
 
 # 1. 기상 현상 (Weather Type) 필터
-if 'Weather_Type' in master_df.columns:
-    available_weather = master_df['Weather_Type'].dropna().unique().tolist()
+if 'Weather_Type' in source.columns:
+    available_weather = source.distinct('Weather_Type')
     selected_weather = st.sidebar.multiselect("🌤️ 기상 현상 (Weather Type)", available_weather, default=available_weather)
 else:
     selected_weather = []
 
 # 2. 강설 페이즈 필터
-if 'Snow_Phase' in master_df.columns:
-    available_phases = master_df['Snow_Phase'].dropna().unique().tolist()
+if 'Snow_Phase' in source.columns:
+    available_phases = source.distinct('Snow_Phase')
     default_phases = [p for p in available_phases if 'Clear' not in p] 
     selected_phases = st.sidebar.multiselect("❄️ 강설 라이프사이클 (Snow Phase)", available_phases, default=default_phases)
 else:
     selected_phases = []
 
 # 3. 여객/화물 구분 (NAT 열 기반)
-if 'NAT' in master_df.columns:
-    available_nats = master_df['NAT'].dropna().unique().tolist()
+if 'NAT' in source.columns:
+    available_nats = source.distinct('NAT')
     selected_nats = st.sidebar.multiselect("✈️ 운항편 타입 (NAT)", available_nats, default=available_nats)
 else:
     selected_nats = []
 
 # 4. 운항 상태 (STS) 필터
-if 'STS' in master_df.columns:
-    available_sts = master_df['STS'].dropna().unique().tolist()
+if 'STS' in source.columns:
+    available_sts = source.distinct('STS')
     selected_sts = st.sidebar.multiselect("📌 운항 상태 (STS)", available_sts, default=available_sts)
 else:
     selected_sts = []
@@ -104,8 +275,8 @@ else:
 st.sidebar.markdown("---")
 st.sidebar.subheader("📅 데이터 연도(Year) 조립기")
 
-if 'Year' in master_df.columns:
-    available_years = sorted(master_df['Year'].dropna().unique().astype(int).tolist())
+if 'Year' in source.columns:
+    available_years = sorted(int(y) for y in source.distinct('Year'))
     
     train_years = st.sidebar.multiselect(
         "🧠 학습(Train)에 사용할 연도 선택", 
@@ -116,11 +287,7 @@ if 'Year' in master_df.columns:
     
     test_mode = st.sidebar.radio(
         "🎯 평가(Test) 데이터 추출 방식",
-        [
-            "학습 데이터 내에서 10% 자동 분할 (기본)", 
-            "특정 연도를 통째로 평가(Test)에 배정",
-            "선택한 연도 전체를 학습하고 자체 평가 (In-Sample)"
-        ],
+        list(TEST_MODES),
         help="'자동 분할'은 학습 데이터의 마지막 10%를 씁니다. '통째로 평가'는 아예 본 적 없는 연도로 백테스트할 때 쓰며, '자체 평가'는 Test 데이터 없이 학습한 데이터를 그대로 다시 풀어보는 방식입니다."
     )
     
@@ -142,8 +309,18 @@ st.sidebar.subheader("⚙️ Optuna 튜닝 설정")
 n_trials = st.sidebar.slider("Optuna 최대 탐색 횟수", 10, 100, 30, 10)
 early_stop_rounds = st.sidebar.number_input("조기 종료 브레이크 (0=끄기)", min_value=0, max_value=50, value=10, step=1)
 
-exclude_from_train = ['Year', 'FLT', 'RAM_Datetime', target_col, 'Snow_Phase', 'STS', 'NAT', 'Weather_Type']
-trainable_features = [c for c in master_df.columns if c not in exclude_from_train]
+with st.sidebar.expander("⚡ 고속 튜닝 모드 (Pruning / 병렬)"):
+    pruner_name = st.selectbox("가지치기(Pruner)", list(PRUNERS), help="라운드별 검증 MAE를 보고 가망 없는 trial을 중간에 끊습니다.")
+    round_early_stop = st.number_input("trial 내부 조기 종료 라운드 (0=끄기)", min_value=0, max_value=500, value=0, step=50)
+    n_workers = st.number_input("병렬 워커 수", min_value=1, max_value=os.cpu_count() or 1, value=1, step=1,
+                                help="2 이상이면 워커 프로세스들이 하나의 Optuna 스토리지를 공유하며 동시에 탐색합니다.")
+    cv_folds = st.number_input("시계열 CV fold 수 (0=단일 검증 구간)", min_value=0, max_value=10, value=0, step=1,
+                               help="연도/시간 순 확장 윈도우 K-Fold로 채점하고, 스태킹 가중치를 OOF(Out-of-Fold) 예측으로 학습합니다.")
+    refit_name = st.selectbox("최종 재학습 방식", list(REFITS), help="튜닝 중 찾은 최적 라운드 수를 재사용하면 최종 재학습 시간이 크게 줄어듭니다. (조기 종료 라운드를 켜야 정확합니다)")
+tuning = engine.TuningConfig(PRUNERS[pruner_name], n_workers, round_early_stop=round_early_stop,
+                             refit=REFITS[refit_name], cv_folds=cv_folds)
+
+trainable_features = engine.trainable_features(source.columns)
 
 selected_features = st.sidebar.multiselect("⚙️ 학습 변수 (Feature Selection)", trainable_features, default=trainable_features)
 start_training = st.sidebar.button("🚀 모델 학습 시작", type="primary", use_container_width=True)
@@ -151,201 +328,139 @@ start_training = st.sidebar.button("🚀 모델 학습 시작", type="primary",
 # ==========================================
 # 2-5. 필터링 적용 로직
 # ==========================================
-def apply_filters(df):
-    filtered_df = df.copy()
-    
-    if remove_outliers:
-        mean_delay, std_delay = filtered_df[target_col].mean(), filtered_df[target_col].std()
-        threshold = max(mean_delay + (3 * std_delay), 240.0)
-        filtered_df = filtered_df[filtered_df[target_col] <= threshold]
-        
-    if selected_weather:
-        filtered_df = filtered_df[filtered_df['Weather_Type'].isin(selected_weather)]
-        
-    if selected_phases:
-        filtered_df = filtered_df[filtered_df['Snow_Phase'].isin(selected_phases)]
-
-    if selected_nats:
-        filtered_df = filtered_df[filtered_df['NAT'].isin(selected_nats)]
-        
-    if selected_sts:
-        filtered_df = filtered_df[filtered_df['STS'].isin(selected_sts)]
-        
-    return filtered_df
-
-current_df = apply_filters(master_df)
+filter_spec = engine.make_filter_spec(
+    remove_outliers,
+    Weather_Type=selected_weather,
+    Snow_Phase=selected_phases,
+    NAT=selected_nats,
+    STS=selected_sts,
+)
+# 로컬 데이터셋은 필터/연도 조건과 선택 변수만 읽기 단계에서 적용 (pushdown)
+current_df = read_filtered(filter_spec, selected_features,
+                           engine.split_years(TEST_MODES[test_mode], train_years, target_test_years))
 
 # ==========================================
 # 🌟 Optuna 스트림릿 전용 콜백 클래스
+#  - 학습 엔진이 보내는 진행 이벤트를 진행바/상태창에 그려줌
 # ==========================================
 class StreamlitOptunaCallback:
-    def __init__(self, n_trials, early_stopping_rounds, model_name, pbar, status_text):
-        self.n_trials = n_trials
-        self.early_stopping_rounds = early_stopping_rounds
-        self.model_name = model_name
+    # 스태킹 모드에서는 두 모델의 튜닝이 동시에 진행되므로 모델별로 진행률/상태를 모아서 표시
+    def __init__(self, pbar, status_text):
         self.pbar = pbar
         self.status_text = status_text
-        self.best_score = float('inf')
-        self.no_improvement_count = 0
-
-    def __call__(self, study, trial):
-        current_trial = trial.number + 1
-        progress = min(current_trial / self.n_trials, 1.0)
-        
-        if trial.value is not None:
-            if trial.value < self.best_score:
-                self.best_score = trial.value
-                self.no_improvement_count = 0
-                improvement_flag = "✨ **최고 기록 갱신!**"
+        self.progress = {}
+        self.lines = {}
+
+    def _render(self):
+        self.pbar.progress(sum(self.progress.values()) / len(self.progress))
+        self.status_text.markdown("  \n".join(self.lines.values()))
+
+    def __call__(self, event):
+        if event['type'] == 'study_start':
+            self.progress[event['model']] = 0.0
+            self.lines[event['model']] = f"**[{event['model']}]** 튜닝 시작..."
+            self._render()
+
+        elif event['type'] == 'trial':
+            if event.get('pruned'):
+                improvement_flag = "✂️ 가지치기"
             else:
-                self.no_improvement_count += 1
-                improvement_flag = ""
+                improvement_flag = "✨ **최고 기록 갱신!**" if event['improved'] else ""
+            self.progress[event['model']] = min(event['trial'] / event['n_trials'], 1.0)
+            self.lines[event['model']] = f"**[{event['model']}]** 진행: {event['trial']} / {event['n_trials']} | 현재 최고 MAE: `{event['best']:.4f}` | 정체 카운트: {event['stall']}/{event['patience']} {improvement_flag}"
+            self._render()
 
-            self.pbar.progress(progress)
-            self.status_text.markdown(f"**[{self.model_name}]** 진행: {current_trial} / {self.n_trials} | 현재 최고 MAE: `{self.best_score:.4f}` | 정체 카운트: {self.no_improvement_count}/{self.early_stopping_rounds} {improvement_flag}")
+        elif event['type'] == 'early_stop':
+            self.progress[event['model']] = 1.0
+            self.lines[event['model']] = f"🛑 **{event['model']} 조기 종료:** {event['patience']}회 연속 개선이 없어 튜닝을 멈춥니다."
+            self._render()
 
-            if self.early_stopping_rounds > 0 and self.no_improvement_count >= self.early_stopping_rounds:
-                self.status_text.warning(f"🛑 **{self.model_name} 조기 종료:** {self.early_stopping_rounds}회 연속 개선이 없어 튜닝을 멈춥니다.")
-                study.stop()
+        elif event['type'] == 'stage':
+            self.status_text.success(event['message'])
 
 # ==========================================
-# 3. 모델 학습 함수
+# 3. 학습 작업 큐 (학습은 백그라운드 워커 프로세스에서 실행 -> 화면이 멈추지 않음)
+#  - 추적 중인 작업 ID는 URL(?job=...)에 남겨 새로고침해도 같은 작업을 계속 보여줌
+#  - 진행 이벤트는 작업 폴더에 쌓이고, 화면은 몇 초마다 처음부터 다시 그림
 # ==========================================
-def run_training(df, features, mode, trials, early_stop_rounds, pbar, status_text, train_years, test_mode, target_test_years):
-    X_all = df[features]
-    y_all = np.log1p(df[target_col])
-    year_col = df['Year'].astype(int)
-    
-    # 🌟 연도 분할 로직 적용
-    if test_mode == "학습 데이터 내에서 10% 자동 분할 (기본)":
-        mask = year_col.isin(train_years)
-        X_selected = X_all[mask]
-        y_selected = y_all[mask]
-        
-        if len(X_selected) < 100:
-            st.error("🚨 선택한 학습 연도에 데이터가 너무 적습니다. 조건을 완화해주세요!")
-            st.stop()
-            
-        X_train_full, X_test, y_train_full, y_test = train_test_split(X_selected, y_selected, test_size=0.1, random_state=42, shuffle=False)
-        
-    elif test_mode == "특정 연도를 통째로 평가(Test)에 배정":
-        train_mask = year_col.isin(train_years)
-        test_mask = year_col.isin(target_test_years)
-        
-        X_train_full = X_all[train_mask]
-        y_train_full = y_all[train_mask]
-        X_test = X_all[test_mask]
-        y_test = y_all[test_mask]
-        
-        if len(X_train_full) < 50 or len(X_test) == 0:
-            st.error("🚨 학습 또는 테스트 데이터가 비어있습니다. 연도를 다시 선택해주세요!")
-            st.stop()
-            
-    else: # 선택한 연도 전체를 학습하고 자체 평가 (In-Sample)
-        mask = year_col.isin(train_years)
-        X_train_full = X_all[mask]
-        y_train_full = y_all[mask]
-        
-        if len(X_train_full) < 50:
-            st.error("🚨 선택한 학습 연도에 데이터가 너무 적습니다!")
-            st.stop()
-            
-        X_test = X_train_full.copy()
-        y_test = y_train_full.copy()
-
-    X_train, X_valid, y_train, y_valid = train_test_split(X_train_full, y_train_full, test_size=0.1, random_state=42, shuffle=False)
-    
-    # 1. XGBoost 튜닝
-    def xgb_obj(trial):
-        params = {
-            'n_estimators': trial.suggest_int('n_estimators', 500, 1500, step=500),
-            'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.05, log=True),
-            'max_depth': trial.suggest_int('max_depth', 4, 8),
-            'objective': 'reg:squarederror', 'random_state': 42, 'n_jobs': -1
-        }
-        model = xgb.XGBRegressor(**params)
-        model.fit(X_train, y_train, eval_set=[(X_valid, y_valid)], verbose=False)
-        return mean_absolute_error(np.expm1(y_valid), np.expm1(model.predict(X_valid)))
-
-    study_xgb = optuna.create_study(direction='minimize')
-    xgb_callback = StreamlitOptunaCallback(trials, early_stop_rounds, "XGBoost", pbar, status_text)
-    study_xgb.optimize(xgb_obj, n_trials=trials, callbacks=[xgb_callback])
-    
-    time.sleep(1)
-    
-    xgb_best = xgb.XGBRegressor(**study_xgb.best_params, objective='reg:squarederror', random_state=42, n_jobs=-1)
-    xgb_best.fit(X_train_full, y_train_full)
-    
-    final_model_name = "XGBoost (Single)"
-    
-    if mode == "🚀 빠른 분석 (XGBoost 단일)":
-        final_preds_log = xgb_best.predict(X_test)
-        meta_model = None
-        
-    else: # 스태킹 모드
-        pbar.progress(0)
-        def lgb_obj(trial):
-            params = {
-                'n_estimators': trial.suggest_int('n_estimators', 500, 1500, step=500),
-                'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.05, log=True),
-                'max_depth': trial.suggest_int('max_depth', 4, 10),
-                'num_leaves': trial.suggest_int('num_leaves', 15, 63),
-                'objective': 'regression', 'random_state': 42, 'n_jobs': -1, 'verbose': -1
-            }
-            model = lgb.LGBMRegressor(**params)
-            model.fit(X_train, y_train, eval_set=[(X_valid, y_valid)])
-            return mean_absolute_error(np.expm1(y_valid), np.expm1(model.predict(X_valid)))
-
-        study_lgb = optuna.create_study(direction='minimize')
-        lgb_callback = StreamlitOptunaCallback(trials, early_stop_rounds, "LightGBM", pbar, status_text)
-        study_lgb.optimize(lgb_obj, n_trials=trials, callbacks=[lgb_callback])
-        
-        lgb_best = lgb.LGBMRegressor(**study_lgb.best_params, objective='regression', random_state=42, n_jobs=-1, verbose=-1)
-        lgb_best.fit(X_train_full, y_train_full)
-        
-        status_text.success("🎉 메타 모델(Stacking) 가중치 조율 중...")
-        
-        xgb_val = xgb_best.predict(X_valid)
-        lgb_val = lgb_best.predict(X_valid)
-        meta_model = LinearRegression(positive=True)
-        meta_model.fit(pd.DataFrame({'XGB': xgb_val, 'LGBM': lgb_val}), y_valid)
-        
-        xgb_test = xgb_best.predict(X_test)
-        lgb_test = lgb_best.predict(X_test)
-        final_preds_log = meta_model.predict(pd.DataFrame({'XGB': xgb_test, 'LGBM': lgb_test}))
-        final_model_name = "Stacking (Ensenble)"
-
-    final_preds = np.expm1(final_preds_log)
-    if 'Physical_Min_Taxi' in X_test.columns:
-        final_preds = np.maximum(final_preds, X_test['Physical_Min_Taxi'].values)
-    y_test_real = np.expm1(y_test)
-    
-    # 🌟 연도별 성능 리포트용 DataFrame 생성
-    results_df = pd.DataFrame({
-        'Year': df.loc[X_test.index, 'Year'],
-        'Actual': y_test_real,
-        'Pred': final_preds
-    })
-    
-    res = {
-        'Model': final_model_name,
-        'RMSE': np.sqrt(mean_squared_error(y_test_real, final_preds)),
-        'MAE': mean_absolute_error(y_test_real, final_preds),
-        'R2': r2_score(y_test_real, final_preds),
-        'Yearly_Results': results_df
+scheduler = job_scheduler()
+
+def submit_training_job():
+    spec = {
+        'features': list(selected_features), 'mode': LEARNING_MODES[learning_mode], 'trials': int(n_trials),
+        'early_stop_rounds': int(early_stop_rounds), 'split_mode': TEST_MODES[test_mode],
+        'train_years': [int(y) for y in train_years], 'test_years': [int(y) for y in target_test_years],
+        'filter_spec': filter_spec, 'tuning': vars(tuning),
     }
-    
-    if meta_model is not None:
-        res['XGB_W'] = meta_model.coef_[0]
-        res['LGB_W'] = meta_model.coef_[1]
-        
-    return xgb_best, meta_model, res, y_test_real, final_preds, X_test
+    label = f"{learning_mode} | {len(current_df):,} 건 | {n_trials} trials"
+    if isinstance(source, ingest.DatasetSource):
+        # 로컬 데이터셋은 워커가 같은 조건으로 직접 읽음 (데이터 복사 없음)
+        spec['source'] = {'kind': jobs.SOURCE_PATH, 'path': source.root, 'compact': source.compact}
+        return scheduler.submit(spec, label=label)
+    # 업로드 데이터는 공유 저장소의 같은 Arrow 파일을 워커가 매핑해서 읽음 (작업마다 복사본을 쓰지 않음)
+    spec['source'] = {'kind': jobs.SOURCE_STORE, 'root': dataset_store().root, 'digest': dataset_digest,
+                      'compact': compact}
+    return scheduler.submit(spec, label=label)
+
+def tracked_job():
+    job_id = st.query_params.get('job')
+    if not job_id:
+        return None
+    try:
+        return scheduler.store.get(job_id)
+    except OSError:
+        return None
+
+@st.fragment(run_every=2)
+def job_progress(job_id):
+    job = scheduler.store.get(job_id)
+    if job['status'] not in jobs.ACTIVE_STATES:
+        st.rerun()
+    if job['status'] == jobs.QUEUED:
+        st.info(f"⏳ 대기 중입니다. (대기 순번: {scheduler.queue_position(job_id) or '-'} / 워커 {scheduler.n_workers}개)")
+    pbar = st.progress(0)
+    status_text = st.empty()
+    callback = StreamlitOptunaCallback(pbar, status_text)
+    for event in scheduler.store.events(job_id):
+        callback(event)
+    if st.button("⛔ 학습 취소", key=f"cancel_{job_id}"):
+        scheduler.cancel(job_id)
+
+JOB_STATUS_LABELS = {
+    jobs.QUEUED: "⏳ 대기", jobs.RUNNING: "🏃 실행 중", jobs.DONE: "✅ 완료", jobs.FAILED: "🚨 실패", jobs.CANCELLED: "⛔ 취소",
+}
+
+@st.fragment(run_every=3)
+def job_queue_panel():
+    job_list = scheduler.store.list()
+    st.caption(f"워커 {scheduler.n_workers}개 · 대기 {sum(j['status'] == jobs.QUEUED for j in job_list)}건 · "
+               f"실행 {sum(j['status'] == jobs.RUNNING for j in job_list)}건")
+    if not job_list:
+        st.caption("아직 제출된 학습 작업이 없습니다.")
+        return
+    rows = []
+    for job in job_list[:50]:
+        progress = 1.0 if job['status'] == jobs.DONE else jobs.progress_fraction(scheduler.store.events(job['job_id']))
+        rows.append({'작업': job['job_id'], '상태': JOB_STATUS_LABELS[job['status']], '진행': progress,
+                     '설정': job['label'], '모델 ID': job.get('model_id'), '제출': job['created_at']})
+    st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True,
+                 column_config={'진행': st.column_config.ProgressColumn('진행', min_value=0.0, max_value=1.0)})
+    picked_job = st.selectbox("작업 선택", [r['작업'] for r in rows], key='picked_job')
+    c1, c2 = st.columns(2)
+    if c1.button("👀 결과 보기", use_container_width=True, help="진행 중이면 진행 상황을, 완료됐으면 학습된 모델을 1번 탭에 불러옵니다."):
+        st.query_params['job'] = picked_job
+        st.rerun()
+    if c2.button("⛔ 취소", use_container_width=True):
+        scheduler.cancel(picked_job)
+
+with st.sidebar.expander("🧵 학습 작업 큐", expanded=False):
+    job_queue_panel()
 
 # ==========================================
 # 4. 화면 구성
 # ==========================================
 st.title("📊 ATD-RAM 예측 랩 (Lab)")
-st.info(f"💡 현재 설정된 필터 기준 데이터: **총 {len(current_df):,} 건** (전체 {len(master_df):,} 건)")
+st.info(f"💡 현재 설정된 필터 기준 데이터: **총 {len(current_df):,} 건** (전체 {source.num_rows:,} 건)")
 
 # 🌟 [NEW] 연도별 데이터 분포(통계) 접었다 펴기 버튼 추가
 with st.expander("📅 필터링된 데이터 연도별 건수 보기 (클릭하여 펼치기)"):
@@ -358,6 +473,30 @@ with st.expander("📅 필터링된 데이터 연도별 건수 보기 (클릭하
         # 가로로 깔끔하게 표(Table) 형태로 출력
         st.dataframe(yearly_counts, hide_index=True, use_container_width=True)
         
+def show_report(metrics, y_actual, y_pred):
+    c1, c2, c3 = st.columns(3)
+    c1.metric("R² Score", f"{metrics['R2']:.4f}")
+    c2.metric("MAE (Mean Abs Error)", f"{metrics['MAE']:.2f} Min")
+    c3.metric("RMSE", f"{metrics['RMSE']:.2f} Min")
+
+    if 'XGB_W' in metrics:
+        st.info(f"⚖️ **Stacking Weights** - XGBoost: {metrics['XGB_W']:.3f} | LightGBM: {metrics['LGB_W']:.3f}")
+
+    fig, ax = plt.subplots(figsize=(8, 5))
+    sns.scatterplot(x=y_actual, y=y_pred, alpha=0.5, ax=ax)
+    ax.plot([0, max(y_actual)], [0, max(y_actual)], 'r--', lw=2)
+    ax.set_xlabel('Actual Delay (Minutes)')
+    ax.set_ylabel('Predicted Delay (Minutes)')
+    ax.set_title(f'Actual vs Predicted Delay ({metrics["Model"]})')
+    st.pyplot(fig)
+
+    # 🌟 [NEW] 연도별 세부 성능 리포트 출력
+    st.markdown("---")
+    st.subheader("📅 연도별 세부 성능 리포트 (Year-wise Analysis)")
+
+    st.table(pd.DataFrame(metrics['Yearly']))
+    st.caption("※ 평가(Test) 대상 데이터 내에 포함된 연도별 성능입니다.")
+
 tab1, tab2, tab3, tab4, tab5 = st.tabs([ # 👈 tab5 추가!
     "📊 모델 평가", "🧠 SHAP 분석", "🔗 다중공선성(VIF)", "🎯 핀셋 튜닝", "🚀 실시간 예측(Deploy)" # 👈 이름 추가!
 ])
@@ -367,109 +506,66 @@ with tab1:
         if len(selected_features) < 5:
             st.warning("변수를 최소 5개 이상 선택해주세요!")
         else:
-            st.markdown("### 🏃‍♂️ 실시간 튜닝 진행 상황")
-            pbar = st.progress(0)
-            status_text = st.empty()
-            
-            with st.spinner("AI가 최적의 파라미터를 찾는 중입니다..."):
-                xgb_model, meta_model, metrics, y_actual, y_pred, X_test = run_training(
-                    current_df, selected_features, learning_mode, n_trials, early_stop_rounds, pbar, status_text,
-                    train_years, test_mode, target_test_years
-                )
-                
-                st.session_state['xgb_model'] = xgb_model
-                st.session_state['meta_model'] = meta_model
-                st.session_state['test_actual'] = y_actual
-                st.session_state['test_pred'] = y_pred
-                st.session_state['X_test'] = X_test
-                st.session_state['mode'] = learning_mode
-                st.session_state['selected_features'] = selected_features
-            
-            st.success(f"✅ {metrics['Model']} 학습 완료!")
-            
-            c1, c2, c3 = st.columns(3)
-            c1.metric("R² Score", f"{metrics['R2']:.4f}")
-            c2.metric("MAE (Mean Abs Error)", f"{metrics['MAE']:.2f} Min")
-            c3.metric("RMSE", f"{metrics['RMSE']:.2f} Min")
-            
-            if meta_model is not None:
-                st.info(f"⚖️ **Stacking Weights** - XGBoost: {metrics['XGB_W']:.3f} | LightGBM: {metrics['LGB_W']:.3f}")
-                
-            fig, ax = plt.subplots(figsize=(8, 5))
-            sns.scatterplot(x=y_actual, y=y_pred, alpha=0.5, ax=ax)
-            ax.plot([0, max(y_actual)], [0, max(y_actual)], 'r--', lw=2)
-            ax.set_xlabel('Actual Delay (Minutes)')
-            ax.set_ylabel('Predicted Delay (Minutes)')
-            ax.set_title(f'Actual vs Predicted Delay ({metrics["Model"]})')
-            st.pyplot(fig)
-            
-            # 🌟 [NEW] 연도별 세부 성능 리포트 출력
-            st.markdown("---")
-            st.subheader("📅 연도별 세부 성능 리포트 (Year-wise Analysis)")
-            
-            yearly_res = metrics['Yearly_Results']
-            summary_list = []
-            
-            for year in sorted(yearly_res['Year'].unique()):
-                y_sub = yearly_res[yearly_res['Year'] == year]
-                mae = mean_absolute_error(y_sub['Actual'], y_sub['Pred'])
-                rmse = np.sqrt(mean_squared_error(y_sub['Actual'], y_sub['Pred']))
-                r2 = r2_score(y_sub['Actual'], y_sub['Pred'])
-                summary_list.append({
-                    'Year': f"{int(year)}",
-                    'Count': f"{len(y_sub):,} rows",
-                    'MAE (Min)': round(mae, 2),
-                    'RMSE (Min)': round(rmse, 2),
-                    'R2 Score': round(r2, 4)
-                })
-            
-            st.table(pd.DataFrame(summary_list))
-            st.caption("※ 평가(Test) 대상 데이터 내에 포함된 연도별 성능입니다.")
-            
+            st.query_params['job'] = submit_training_job()
+
+    job = tracked_job()
+    if job is not None and job['status'] == jobs.DONE and st.session_state.get('loaded_job') != job['job_id']:
+        # 완료된 작업의 모델을 한 번만 불러옴 (새로고침/다른 세션에서도 같은 작업 ID로 받음)
+        error = load_model(job['model_id'])
+        st.session_state['loaded_job'] = job['job_id']
+        if error:
+            st.error(f"🚨 학습된 모델을 현재 데이터로 평가할 수 없습니다: {error}")
+    elif job is not None and job['status'] == jobs.FAILED:
+        st.error(job.get('error') or "🚨 학습 작업이 실패했습니다.")
+    elif job is not None and job['status'] == jobs.CANCELLED:
+        st.warning("⛔ 학습 작업이 취소되었습니다.")
+
+    if job is not None and job['status'] in jobs.ACTIVE_STATES:
+        st.markdown("### 🏃‍♂️ 실시간 튜닝 진행 상황")
+        st.caption(f"작업 `{job['job_id']}` · {job['label']} — 다른 탭을 쓰거나 새로고침해도 학습은 계속됩니다.")
+        job_progress(job['job_id'])
+
+    elif job is not None and job['status'] == jobs.DONE and 'metrics' in st.session_state \
+            and st.session_state['artifact'].model_id == job['model_id']:
+        st.success(f"✅ {st.session_state['metrics']['Model']} 학습 완료! (작업 `{job['job_id']}`, 모델 레지스트리 ID: `{job['model_id']}`)")
+        show_report(st.session_state['metrics'], st.session_state['test_actual'], st.session_state['test_pred'])
+
+    elif 'metrics' in st.session_state:
+        model_id = st.session_state['artifact'].model_id
+        st.success(f"📂 현재 모델: {st.session_state['metrics']['Model']} (모델 레지스트리 ID: `{model_id}`)")
+        show_report(st.session_state['metrics'], st.session_state['test_actual'], st.session_state['test_pred'])
+
     else:
         st.info("👈 사이드바에서 세팅을 마치고 '학습 시작'을 눌러주세요.")
 
 with tab2:
     st.subheader("🧠 SHAP 분석 (지연 원인 해부)")
-    if 'xgb_model' in st.session_state:
+    if 'predictor' in st.session_state:
         st.info("💡 **SHAP (SHapley Additive exPlanations)**: AI가 특정 항공편의 지연을 예측할 때, 어떤 변수가 지연을 늘렸고(+) 어떤 변수가 줄였는지(-) 기여도를 분석합니다.")
         
-        with st.spinner("SHAP Value 계산 중입니다. 데이터가 많으면 수십 초 정도 걸릴 수 있습니다..."):
-            model = st.session_state['xgb_model']
-            X_test_shap = st.session_state['X_test']
-            
-            # 속도를 위해 최대 1000건만 샘플링하여 분석
-            if len(X_test_shap) > 1000:
-                X_test_shap = X_test_shap.sample(1000, random_state=42)
-                
-            explainer = shap.TreeExplainer(model)
-            shap_values = explainer(X_test_shap)
+        with st.spinner("SHAP Value 계산 중입니다. 모델당 한 번만 계산하고 이후에는 캐시를 사용합니다..."):
+            # 평가(Test) 데이터 전체의 기여도를 부스터 내장 트리 SHAP으로 한 번에 계산 (모델 ID 기준 캐시)
+            contributions = contribution_cache().get(st.session_state['explain_key'], st.session_state['artifact'],
+                                                     st.session_state['X_test'])
+            leg = st.radio("분석할 모델", list(contributions), horizontal=True) if len(contributions) > 1 else next(iter(contributions))
+            contrib = contributions[leg]
             
             col1, col2 = st.columns(2)
             
             with col1:
                 st.markdown("#### 📊 변수 중요도 (Summary Plot)")
-                fig1, ax1 = plt.subplots(figsize=(8, 6))
-                # 한글 깨짐 방지를 위해 내부 폰트 사이즈 조정
-                shap.summary_plot(shap_values, X_test_shap, plot_type="bar", show=False)
-                plt.title("Overall Feature Importance", fontsize=12)
-                st.pyplot(fig1)
+                st.pyplot(explain.summary_figure(contrib))
                 
             with col2:
                 st.markdown("#### 🐝 변수 영향도 (Beeswarm Plot)")
-                fig2, ax2 = plt.subplots(figsize=(8, 6))
-                shap.plots.beeswarm(shap_values, show=False)
-                plt.title("Impact on Delay (+: Increase, -: Decrease)", fontsize=12)
-                st.pyplot(fig2)
+                st.pyplot(explain.beeswarm_figure(contrib))
+                if len(contrib) > explain.PLOT_ROWS:
+                    st.caption(f"평가 데이터 {len(contrib):,}건 중 {explain.PLOT_ROWS:,}건을 무작위로 골라 표시합니다 (변수 중요도는 전체 기준).")
                 
             st.markdown("---")
             st.markdown("#### 🔍 개별 항공편 원인 분석 (Waterfall Plot)")
-            sample_idx = st.number_input("분석할 항공편의 인덱스(순번)를 입력하세요 (0 ~ 999):", min_value=0, max_value=min(999, len(X_test_shap)-1), value=0)
-            
-            fig3, ax3 = plt.subplots(figsize=(10, 5))
-            shap.plots.waterfall(shap_values[sample_idx], show=False)
-            plt.title(f"Why was Flight #{sample_idx} delayed?", fontsize=12)
-            st.pyplot(fig3)
+            sample_idx = st.number_input(f"분석할 항공편의 인덱스(순번)를 입력하세요 (0 ~ {len(contrib) - 1}):", min_value=0, max_value=len(contrib) - 1, value=0)
+            st.pyplot(explain.waterfall_figure(contrib, int(sample_idx)))
     else:
         st.warning("👈 1번 탭에서 '모델 학습'을 먼저 완료해야 분석이 가능합니다!")
 
@@ -477,20 +573,21 @@ with tab3:
     st.subheader("🔗 다중공선성(VIF) 검사기")
     if 'X_test' in st.session_state:
         st.info("💡 **VIF (Variance Inflation Factor)**: 변수들끼리 의미가 겹치는지(상관관계) 확인합니다. VIF가 10 이상이면 다른 변수와 의미가 중복되므로 모델에서 빼는 것이 좋습니다.")
+        vif_scope = st.radio("검사 대상 데이터", ["평가(Test) 데이터", "전체 학습 연도 데이터"], horizontal=True,
+                             help="상관행렬 역행렬로 모든 변수의 VIF를 한 번에 계산하므로 전체 학습 데이터도 빠르게 검사할 수 있습니다.")
         
         with st.spinner("다중공선성을 계산 중입니다..."):
-            X_vif = st.session_state['X_test'].copy()
-            # 결측치나 무한대 값이 있으면 VIF 에러가 나므로 0으로 채움
-            X_vif = X_vif.replace([np.inf, -np.inf], 0).fillna(0)
-            
-            vif_data = pd.DataFrame()
-            vif_data["Feature"] = X_vif.columns
-            vif_data["VIF_Score"] = [variance_inflation_factor(X_vif.values, i) for i in range(len(X_vif.columns))]
-            vif_data = vif_data.sort_values(by="VIF_Score", ascending=False).reset_index(drop=True)
+            artifact = st.session_state['artifact']
+            if vif_scope == "평가(Test) 데이터":
+                vif_key, X_vif = st.session_state['explain_key'], st.session_state['X_test']
+            else:
+                vif_key = f"{artifact.model_id}:train"
+                X_vif = read_filtered(artifact.filter_spec, artifact.features, artifact.train_years)
+            vif_data = compute_vif(vif_key, tuple(artifact.features), X_vif)
             
             # VIF가 10 이상인 '위험' 변수와 안전한 변수 분리
-            danger_vif = vif_data[vif_data["VIF_Score"] >= 10.0]
-            safe_vif = vif_data[vif_data["VIF_Score"] < 10.0]
+            danger_vif = vif_data[vif_data["VIF_Score"] >= collinearity.VIF_DANGER]
+            safe_vif = vif_data[vif_data["VIF_Score"] < collinearity.VIF_DANGER]
             
             c1, c2 = st.columns(2)
             with c1:
@@ -504,52 +601,112 @@ with tab3:
 
 with tab4:
     st.subheader("🎯 핀셋 튜닝 (What-If 시뮬레이터)")
-    if 'xgb_model' in st.session_state:
+    if 'predictor' in st.session_state:
         st.info("💡 **What-If 분석**: 특정 항공편의 조건(날씨, 거리 등)을 통제센터에서 인위적으로 변경해 보았을 때, 지연 시간이 어떻게 변하는지 실시간으로 시뮬레이션합니다.")
         
-        model = st.session_state['xgb_model']
-        X_test_sim = st.session_state['X_test'].copy()
+        predictor = st.session_state['predictor']
+        X_test_sim = st.session_state['X_test']
+        
+        whatif_mode = st.radio("시뮬레이션 방식", ["✏️ 단일 항공편 편집", "📈 민감도 스윕 (PD/ICE)"], horizontal=True)
         
-        # 특정 상황의 비행기 고르기
-        row_idx = st.selectbox("✈️ 시뮬레이션 할 항공편 선택 (Test 데이터 기준)", X_test_sim.index.tolist())
-        original_data = X_test_sim.loc[[row_idx]]
+        if whatif_mode == "✏️ 단일 항공편 편집":
+            # 특정 상황의 비행기 고르기
+            row_idx = st.selectbox("✈️ 시뮬레이션 할 항공편 선택 (Test 데이터 기준)", X_test_sim.index.tolist())
+            original_data = X_test_sim.loc[[row_idx]]
         
-        # 원본 예측값
-        orig_pred = np.expm1(model.predict(original_data))[0]
-        actual_delay = st.session_state['test_actual'][X_test_sim.index.get_loc(row_idx)]
+            # 원본 예측값 (학습된 전체 파이프라인 기준)
+            orig_pred = predictor.predict(original_data)[0]
+            actual_delay = st.session_state['test_actual'][X_test_sim.index.get_loc(row_idx)]
         
-        col_m1, col_m2, col_m3 = st.columns(3)
-        col_m1.metric("실제 지연 시간 (Actual)", f"{actual_delay:.1f} 분")
-        col_m2.metric("AI 예측 지연 (Original)", f"{orig_pred:.1f} 분")
+            col_m1, col_m2, col_m3 = st.columns(3)
+            col_m1.metric("실제 지연 시간 (Actual)", f"{actual_delay:.1f} 분")
+            col_m2.metric("AI 예측 지연 (Original)", f"{orig_pred:.1f} 분")
         
-        st.markdown("---")
-        st.markdown("### 🎛️ 변수 조작 패널 (값을 더블클릭해서 수정해보세요!)")
+            st.markdown("---")
+            st.markdown("### 🎛️ 변수 조작 패널 (값을 더블클릭해서 수정해보세요!)")
         
-        # 🌟 핵심! st.data_editor를 통한 실시간 데이터 수정
-        edited_data = st.data_editor(original_data, num_rows="fixed", use_container_width=True)
+            # 🌟 핵심! st.data_editor를 통한 실시간 데이터 수정
+            edited_data = st.data_editor(original_data, num_rows="fixed", use_container_width=True,
+                                         column_config=editor_columns(st.session_state['artifact'].schema))
         
-        if st.button("🚀 조작된 데이터로 다시 예측하기 (Re-Predict)"):
-            new_pred = np.expm1(model.predict(edited_data))[0]
-            diff = new_pred - orig_pred
+            if st.button("🚀 조작된 데이터로 다시 예측하기 (Re-Predict)"):
+                new_pred = predictor.predict(edited_data)[0]
+                diff = new_pred - orig_pred
             
-            # 결과 출력
-            if diff > 0:
-                col_m3.metric("시뮬레이션 결과 (New)", f"{new_pred:.1f} 분", f"+{diff:.1f} 분 악화됨", delta_color="inverse")
+                # 결과 출력
+                if diff > 0:
+                    col_m3.metric("시뮬레이션 결과 (New)", f"{new_pred:.1f} 분", f"+{diff:.1f} 분 악화됨", delta_color="inverse")
+                else:
+                    col_m3.metric("시뮬레이션 결과 (New)", f"{new_pred:.1f} 분", f"{diff:.1f} 분 단축됨!", delta_color="normal")
+            
+                st.success("✅ 시뮬레이션 완료! 조작한 조건에 따라 지연 시간이 위와 같이 변동됩니다.")
+
+        else:
+            # 항공편 n편 x 변수 값 격자를 하나의 행렬로 만들어 한 번에 예측 -> ICE(항공편별) / PD(평균) 반응 곡선
+            st.markdown("### 📈 민감도 스윕 (Partial Dependence / ICE)")
+            sc1, sc2 = st.columns(2)
+            flight_scope = sc1.radio("대상 항공편", ["직접 선택", "무작위 샘플", "평가 데이터 전체"])
+            if flight_scope == "직접 선택":
+                picked = sc1.multiselect("✈️ 항공편 선택 (Test 데이터 기준)", X_test_sim.index.tolist(), default=X_test_sim.index[:5].tolist())
+                X_sweep = X_test_sim.loc[picked]
+            elif flight_scope == "무작위 샘플":
+                n_sample = sc1.slider("샘플 항공편 수", 1, min(2000, len(X_test_sim)), min(200, len(X_test_sim)))
+                X_sweep = X_test_sim.sample(n_sample, random_state=42)
             else:
-                col_m3.metric("시뮬레이션 결과 (New)", f"{new_pred:.1f} 분", f"{diff:.1f} 분 단축됨!", delta_color="normal")
+                X_sweep = X_test_sim
             
-            st.success("✅ 시뮬레이션 완료! 조작한 조건에 따라 지연 시간이 위와 같이 변동됩니다.")
+            sweep_features = sc2.multiselect("🎛️ 스윕할 변수 (1~2개)", predictor.features, default=predictor.features[:1], max_selections=2)
+            n_points = sc2.slider("격자 점 개수", 5, 50, 20)
+            grids = []
+            for name in sweep_features:
+                grid = whatif.value_grid(X_test_sim[name], n_points)
+                if len(grid) < n_points:
+                    # 0/1 플래그처럼 값 종류가 적은 변수는 실제 값만 사용
+                    grids.append(grid)
+                else:
+                    col_min, col_max = float(X_test_sim[name].min()), float(X_test_sim[name].max())
+                    lo, hi = sc2.slider(f"{name} 범위", col_min, col_max, (float(grid[0]), float(grid[-1])))
+                    grids.append(np.linspace(lo, hi, n_points))
+            
+            if sweep_features and len(X_sweep) > 0:
+                try:
+                    result = whatif.sweep(predictor, X_sweep, sweep_features, grids)
+                except ValueError as e:
+                    st.error(f"🚨 {e}")
+                    result = None
+                
+                if result is not None:
+                    pdp = result.partial_dependence
+                    st.caption(f"항공편 {len(X_sweep):,} 편 x 격자 {pdp.size:,} 개 = {len(X_sweep) * pdp.size:,} 건을 한 번에 예측했습니다.")
+                    if len(sweep_features) == 1:
+                        fig, ax = plt.subplots(figsize=(10, 5))
+                        grid = result.grids[0]
+                        ax.plot(grid, result.ice[:300].T, color='gray', alpha=0.15, linewidth=0.8)
+                        ax.plot(grid, pdp, color='crimson', linewidth=3, label='Partial Dependence (mean)')
+                        ax.set_xlabel(sweep_features[0])
+                        ax.set_ylabel('Predicted ATD-RAM (min)')
+                        ax.set_title(f"ICE / PD: {sweep_features[0]}", fontsize=12)
+                        ax.legend()
+                        st.pyplot(fig)
+                        st.metric("평균 반응 폭 (PD max - min)", f"{pdp.max() - pdp.min():.1f} 분")
+                    else:
+                        fig, ax = plt.subplots(figsize=(10, 7))
+                        pd_table = pd.DataFrame(pdp, index=np.round(result.grids[0], 2), columns=np.round(result.grids[1], 2))
+                        sns.heatmap(pd_table, cmap='YlOrRd', ax=ax, cbar_kws={'label': 'Predicted ATD-RAM (min)'})
+                        ax.set_xlabel(sweep_features[1])
+                        ax.set_ylabel(sweep_features[0])
+                        ax.set_title(f"Partial Dependence: {sweep_features[0]} x {sweep_features[1]}", fontsize=12)
+                        st.pyplot(fig)
     else:
         st.warning("👈 1번 탭에서 '모델 학습'을 먼저 완료해야 분석이 가능합니다!")
 
 with tab5:
     st.subheader("🚀 실시간 지연 예측기 (Live Inference)")
-    if 'xgb_model' in st.session_state:
-        st.info("💡 **통제센터 실무 모드**: 현재 들어온 비행 스케줄과 기상 상황을 입력하면, 학습된 챔피언 모델(XGBoost)이 즉시 예상 지연 시간을 도출합니다.")
+    if 'predictor' in st.session_state:
+        st.info("💡 **통제센터 실무 모드**: 현재 들어온 비행 스케줄과 기상 상황을 입력하면, 학습된 챔피언 모델(스태킹 모드라면 앙상블 전체)이 즉시 예상 지연 시간을 도출합니다.")
         
-        # 모델이 학습할 때 썼던 변수 목록과 데이터의 형태(타입/범위) 가져오기
-        selected_features = st.session_state['selected_features']
-        X_template = st.session_state['X_test']
+        # 모델과 함께 저장된 입력 변수 스키마 (학습 시 한 번 계산한 종류/범위/기본값)
+        schema = st.session_state['artifact'].schema
         
         st.markdown("### 📝 운항 및 기상 조건 수동 입력")
         
@@ -559,51 +716,34 @@ with tab5:
             user_inputs = {}
             
             # 선택된 변수 개수만큼 알아서 입력 칸(Widget) 생성
-            for i, col_name in enumerate(selected_features):
+            for i, col_name in enumerate(st.session_state['selected_features']):
                 col = cols[i % 3]
+                spec = schema[col_name]
                 
-                # 숫자형 변수인 경우
-                if pd.api.types.is_numeric_dtype(X_template[col_name]):
-                    unique_vals = X_template[col_name].dropna().unique()
+                # 1. 0/1 등 범주가 5개 이하인 숫자 (예: Is_Cargo) -> 선택창(Selectbox)
+                if spec['kind'] == 'choice':
+                    idx = spec['categories'].index(spec['default'])
+                    user_inputs[col_name] = col.selectbox(f"🗂️ {col_name}", spec['categories'], index=idx)
                     
-                    # 1. 0/1 등 범주가 5개 이하인 숫자 (예: Is_Cargo) -> 선택창(Selectbox)
-                    if len(unique_vals) <= 5:
-                        unique_vals = sorted(unique_vals.tolist())
-                        default_val = int(X_template[col_name].mode()[0])
-                        idx = unique_vals.index(default_val) if default_val in unique_vals else 0
-                        user_inputs[col_name] = col.selectbox(f"🗂️ {col_name}", unique_vals, index=idx)
-                        
-                    # 2. 연속된 진짜 숫자 (예: 이동거리, 온도 등) -> 숫자 입력창(Number_input)
-                    else:
-                        min_v = float(X_template[col_name].min())
-                        max_v = float(X_template[col_name].max())
-                        mean_v = float(X_template[col_name].mean())
-                        step = (max_v - min_v) / 100 if max_v != min_v else 0.1
-                        user_inputs[col_name] = col.number_input(f"🔢 {col_name}", min_value=min_v, max_value=max_v, value=mean_v, step=step)
+                # 2. 연속된 진짜 숫자 (예: 이동거리, 온도 등) -> 숫자 입력창(Number_input)
+                elif spec['kind'] == 'number':
+                    user_inputs[col_name] = col.number_input(f"🔢 {col_name}", min_value=spec['min'], max_value=spec['max'], value=spec['default'], step=spec['step'])
                 
                 # 문자형 변수인 경우 (텍스트) -> 선택창
                 else:
-                    unique_vals = X_template[col_name].dropna().unique().tolist()
-                    user_inputs[col_name] = col.selectbox(f"🔠 {col_name}", unique_vals)
+                    user_inputs[col_name] = col.selectbox(f"🔠 {col_name}", spec['categories'])
             
             st.markdown("---")
             submit_btn = st.form_submit_button("🔮 AI 실시간 예측 수행", type="primary", use_container_width=True)
             
         # [예측 실행 로직]
         if submit_btn:
-            # 유저가 입력한 딕셔너리를 1줄짜리 데이터프레임으로 변환
-            input_df = pd.DataFrame([user_inputs])
-            model = st.session_state['xgb_model']
+            predictor = st.session_state['predictor']
             
             with st.spinner("AI가 지연 시간을 계산하고 있습니다..."):
-                # 예측 (Log로 변환해서 학습했으므로 다시 expm1으로 원복)
-                pred_log = model.predict(input_df)
-                pred_minutes = np.expm1(pred_log)[0]
-                
-                # '물리적 최소 지상 이동시간' 변수가 있다면 그 이하로는 예측하지 못하게 방어
-                if 'Physical_Min_Taxi' in input_df.columns:
-                    min_taxi = input_df['Physical_Min_Taxi'].values[0]
-                    pred_minutes = max(pred_minutes, min_taxi)
+                # 학습된 전체 파이프라인(스태킹 포함)으로 예측
+                # (Log 역변환 및 '물리적 최소 지상 이동시간' 하한 방어는 predictor 내부에서 처리)
+                pred_minutes = predictor.predict([[user_inputs[name] for name in predictor.features]])[0]
             
             st.markdown("---")
             st.success("✅ 타겟 비행편의 ATD-RAM (주기장 출발 ~ 실제 이륙) 소요 시간 분석 완료!")
@@ -622,3 +762,45 @@ with tab5:
                 
     else:
         st.warning("👈 1번 탭에서 과거 데이터로 '모델 학습'을 먼저 완료해야 실시간 예측이 가능합니다!")
+
+
+# ==========================================
+# 5. 성능 계측 패널 (구간별 경과 시간 / CPU 시간 / 최대 메모리 / 행 수)
+# ==========================================
+def trace_panel(tracer, name, clearable=False):
+    spans = tracer.to_frame()
+    if spans.empty:
+        st.caption("아직 기록된 구간이 없습니다. 데이터를 읽거나 학습/분석을 실행하면 단계별 소요 시간이 쌓입니다.")
+        return
+    st.markdown("**단계별 합계** (소요 시간 큰 순)")
+    st.dataframe(tracer.summary(), hide_index=True, use_container_width=True)
+    st.markdown("**최근 구간** (들여쓰기 = 중첩)")
+    st.dataframe(spans[['label', 'wall_s', 'cpu_s', 'peak_rss_mb', 'rows', 'rows_per_s']].tail(200),
+                 hide_index=True, use_container_width=True)
+    c1, c2 = st.columns(2)
+    c1.download_button("JSON", tracer.to_json(), file_name=f"{name}.json", mime="application/json",
+                       key=f"{name}_json")
+    c2.download_button("Chrome trace", tracer.chrome_trace(), file_name=f"{name}.chrome.json",
+                       mime="application/json", help="chrome://tracing 또는 Perfetto에서 열 수 있습니다.",
+                       key=f"{name}_chrome")
+    if clearable and st.button("🧹 기록 지우기", use_container_width=True):
+        tracer.clear()
+        st.rerun()
+
+with st.sidebar.expander("⏱️ 성능 계측 (Profiling)"):
+    # 학습은 작업 워커 프로세스에서 돌기 때문에 trial/재학습/메타 모델 단계는 작업 계측(spans.json)에 있음
+    trace_job = tracked_job()
+    job_tracer = scheduler.store.trace(trace_job['job_id']) if trace_job is not None else None
+    view = "이 세션"
+    if job_tracer is not None:
+        view = st.radio("계측 대상", ["이 세션", f"학습 작업 {trace_job['job_id']}"], index=1, horizontal=True)
+    elif trace_job is not None and trace_job['status'] in jobs.ACTIVE_STATES:
+        st.caption(f"학습 작업 `{trace_job['job_id']}`의 단계별 계측은 작업이 끝나면 여기에 표시됩니다.")
+    if view == "이 세션":
+        trace_panel(st.session_state['tracer'], "atd_trace", clearable=True)
+    else:
+        trace_panel(job_tracer, f"atd_trace_{trace_job['job_id']}")
+    imports = lazy.import_times()
+    if imports:
+        st.markdown("**라이브러리 지연 로드** (서버 프로세스 기준, 처음 쓴 시점에 한 번)")
+        st.dataframe(pd.DataFrame(imports), hide_index=True, use_container_width=True)
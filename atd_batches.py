@@ -0,0 +1,44 @@
+import numpy as np
+import lightgbm as lgb
+import xgboost as xgb
+
+# ==========================================
+# Out-of-Core 배치 어댑터 (XGBoost DataIter / LightGBM Sequence)
+#  - 두 클래스 모두 라이브러리 기반 클래스를 상속하므로 이 모듈은 xgboost / lightgbm을 import함
+#    -> atd_outofcore는 atd_lazy로 행렬/Dataset을 만드는 시점에 이 모듈을 읽음
+# ==========================================
+
+
+class XGBBatchIter(xgb.DataIter):
+    # stream.batches(roles) -> QuantileDMatrix / ExtMemQuantileDMatrix 입력
+    def __init__(self, stream, roles, cache_prefix=None):
+        self.stream = stream
+        self.roles = roles
+        self._batches = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._batches is None:
+            self._batches = self.stream.batches(self.roles)
+        batch = next(self._batches, None)
+        if batch is None:
+            return False
+        X, y, _, _ = batch
+        input_data(data=X, label=y, feature_names=self.stream.features)
+        return True
+
+    def reset(self):
+        self._batches = None
+
+
+class RowSequence(lgb.Sequence):
+    # memmap 행 배열 -> lgb.Sequence (Dataset 생성 시 batch_size 행씩만 읽어 float64로 변환)
+    def __init__(self, rows, batch_size):
+        self.rows = rows
+        self.batch_size = batch_size
+
+    def __getitem__(self, idx):
+        return np.asarray(self.rows[idx], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.rows)
@@ -0,0 +1,258 @@
+import argparse
+import json
+import os
+import platform
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import atd_engine as engine
+from atd_trace import rss_bytes
+
+# ==========================================
+# ATD-RAM 성능 벤치마크
+#  - 합성 마스터 테이블: 샘플 ATD_RAM_Master.parquet의 스키마/컬럼별 값 분포를 시드 고정으로 재표본
+#      + 필터 컬럼(Weather_Type, Snow_Phase, NAT, STS), 연도 범위에 고르게 퍼진 RAM_Datetime
+#      + 타겟은 Physical_Min_Taxi / 혼잡도에 잡음을 더해 만들어 모델이 배울 신호를 둠
+#    10^4 ~ 10^7 행을 청크 단위로 parquet에 씀 (생성 중 메모리는 청크 크기만큼)
+#  - 단계별(load / filter / train / predict / shap / vif) 경과 시간, CPU 시간, 최대 RSS, 초당 행 수 측정
+#  - 결과 JSON + 이전 결과와 비교 (--compare)
+# ==========================================
+
+TEMPLATE = 'ATD_RAM_Master.parquet'
+SIZES = [10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+STAGES = ['load', 'filter', 'train', 'predict', 'shap', 'vif']
+CHUNK_ROWS = 1000000
+FILTER_VALUES = {
+    'Weather_Type': ['Clear', 'Rain', 'Snow', 'Fog'],
+    'Snow_Phase': ['None', 'Onset', 'Peak', 'Recovery'],
+    'NAT': ['KOR', 'FOREIGN'],
+    'STS': ['DEP', 'DLY'],
+}
+
+
+# ==========================================
+# 1. 합성 데이터
+# ==========================================
+class SyntheticMaster:
+    # 템플릿 컬럼별 값 분포를 기억해 두고 원하는 행 수만큼 재표본 (같은 시드 -> 같은 데이터)
+    def __init__(self, template=TEMPLATE, start_year=2016, n_years=10, seed=0):
+        sample = pd.read_parquet(template)
+        self.start_year = start_year
+        self.n_years = n_years
+        self.seed = seed
+        self.columns = list(dict.fromkeys(list(sample.columns) + list(FILTER_VALUES) + [engine.TARGET_COL]))
+        self.values = {c: sample[c].dropna().to_numpy() for c in sample.columns
+                       if c not in engine.ID_COLS + [engine.TARGET_COL] and pd.api.types.is_numeric_dtype(sample[c])}
+        self.carriers = sample['FLT'].str[:3].dropna().to_numpy() if 'FLT' in sample else np.array(['KAL'])
+
+    def chunk(self, n_rows, offset, total):
+        # 전체 total 행 중 offset부터 n_rows 행 (시각은 전체 구간에 고르게, 청크 순서대로 증가)
+        rng = np.random.default_rng([self.seed, offset])
+        start = pd.Timestamp(self.start_year, 1, 1).value
+        span = pd.Timestamp(self.start_year + self.n_years, 1, 1).value - start
+        lo, hi = start + span * offset // total, start + span * (offset + n_rows) // total
+        times = pd.to_datetime(np.sort(rng.integers(lo, hi, n_rows))).floor('min')
+
+        data = {
+            'Year': times.year.astype(np.int32),
+            'FLT': np.char.add(rng.choice(self.carriers, n_rows).astype(str),
+                               np.char.zfill(rng.integers(100, 9999, n_rows).astype(str), 4)),
+            'RAM_Datetime': times,
+        }
+        for col, values in self.values.items():
+            data[col] = values[rng.integers(0, len(values), n_rows)] if len(values) else np.zeros(n_rows)
+        if 'Hour' in data:
+            data['Hour'] = times.hour.astype(data['Hour'].dtype)
+        if 'DayOfWeek' in data:
+            data['DayOfWeek'] = times.dayofweek.astype(data['DayOfWeek'].dtype)
+        for col, choices in FILTER_VALUES.items():
+            data[col] = rng.choice(choices, n_rows)
+
+        base = data.get('Physical_Min_Taxi', np.full(n_rows, 10.0))
+        congestion = data.get('Dep_Traffic_Congestion', np.zeros(n_rows))
+        target = base + 0.2 * congestion + rng.gamma(2.0, 4.0, n_rows)
+        data[engine.TARGET_COL] = np.maximum(1, np.round(target)).astype(np.int64)
+        return pd.DataFrame(data)[self.columns]
+
+    def write(self, path, n_rows, chunk_rows=CHUNK_ROWS):
+        writer = None
+        try:
+            for offset in range(0, n_rows, chunk_rows):
+                table = pa.Table.from_pandas(self.chunk(min(chunk_rows, n_rows - offset), offset, n_rows),
+                                             preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+        return path
+
+
+# ==========================================
+# 2. 측정
+# ==========================================
+class StageTimer:
+    # with 블록 동안 경과/CPU 시간과 최대 RSS(샘플링 스레드) 측정
+    def __init__(self, interval=0.01):
+        self.interval = interval
+
+    def __enter__(self):
+        self.peak = self.start_rss = rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_bytes())
+
+    def __exit__(self, *exc):
+        self.wall = time.perf_counter() - self._wall
+        self.cpu = time.process_time() - self._cpu
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_bytes())
+        return False
+
+    def record(self, rows, size, stage):
+        return {
+            'size': int(size), 'stage': stage, 'rows': int(rows),
+            'wall_s': round(self.wall, 4), 'cpu_s': round(self.cpu, 4),
+            'peak_rss_mb': round(self.peak / 2 ** 20, 1),
+            'rss_delta_mb': round((self.peak - self.start_rss) / 2 ** 20, 1),
+            'rows_per_s': round(rows / self.wall, 1) if self.wall > 0 else None,
+        }
+
+
+# ==========================================
+# 3. 단계별 벤치마크
+# ==========================================
+def run_size(path, size, stages, trials=2, mode=engine.MODE_SINGLE, explain_rows=10000, compact=False):
+    # 한 데이터 크기에 대해 단계를 순서대로 실행 (앞 단계 결과를 다음 단계가 사용)
+    records = []
+    spec = engine.make_filter_spec(True, Weather_Type=FILTER_VALUES['Weather_Type'][:3])
+    df = current = artifact = predictor = None
+
+    def measure(stage, fn):
+        with StageTimer() as timer:
+            rows = fn()
+        records.append(timer.record(rows, size, stage))
+        print(f"  {stage:<8} {timer.wall:9.3f}s  {timer.peak / 2 ** 20:9.1f} MB  {rows:>10,} rows", flush=True)
+
+    def load():
+        nonlocal df, features
+        df, _ = engine.load_master(path, compact)
+        features = engine.trainable_features(df.columns)
+        return len(df)
+
+    def filt():
+        nonlocal current
+        current = engine.FilterEngine(df).filter(spec)
+        return len(df)
+
+    def train():
+        nonlocal artifact, predictor
+        from atd_explain import EnsemblePredictor
+        years = sorted(int(y) for y in current['Year'].unique())
+        result = engine.run_training(current, features, mode, trials, 0, train_years=years, filter_spec=spec)
+        artifact = result.artifact
+        predictor = EnsemblePredictor(artifact)
+        return result.metrics['Train_Rows']
+
+    def predict():
+        predictor.predict(current[features])
+        return len(current)
+
+    def shap():
+        X = current[features].iloc[:explain_rows]
+        predictor.contributions(X)
+        return len(X)
+
+    def vif():
+        from atd_collinearity import vif_table
+        vif_table(current[features])
+        return len(current)
+
+    features = None
+    steps = {'load': load, 'filter': filt, 'train': train, 'predict': predict, 'shap': shap, 'vif': vif}
+    for stage in STAGES:
+        if stage in stages:
+            measure(stage, steps[stage])
+    return records
+
+
+def environment():
+    import lightgbm
+    import xgboost
+    return {
+        'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+        'pandas': pd.__version__, 'numpy': np.__version__, 'pyarrow': pa.__version__,
+        'xgboost': xgboost.__version__, 'lightgbm': lightgbm.__version__,
+    }
+
+
+def compare(baseline, current):
+    # 같은 (크기, 단계) 끼리 경과 시간/최대 RSS 비율 (> 1 이면 느려짐/커짐)
+    key = ['size', 'stage']
+    old = pd.DataFrame(baseline['results']).set_index(key)
+    new = pd.DataFrame(current['results']).set_index(key)
+    joined = new[['wall_s', 'peak_rss_mb']].join(old[['wall_s', 'peak_rss_mb']], rsuffix='_base', how='inner')
+    joined['wall_ratio'] = (joined['wall_s'] / joined['wall_s_base']).round(2)
+    joined['rss_ratio'] = (joined['peak_rss_mb'] / joined['peak_rss_mb_base']).round(2)
+    return joined.reset_index()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ATD-RAM 학습/추론 벤치마크 (합성 RKSI 데이터)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES[:3], help="합성 데이터 행 수 (기본값: 10^4 10^5 10^6)")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--template', default=TEMPLATE, help="스키마/값 분포를 가져올 마스터 parquet")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--years', type=int, default=10, help="합성 데이터 기간 (년)")
+    parser.add_argument('--mode', choices=[engine.MODE_SINGLE, engine.MODE_STACKING], default=engine.MODE_SINGLE)
+    parser.add_argument('--trials', type=int, default=2)
+    parser.add_argument('--explain-rows', type=int, default=10000, help="SHAP 단계에 쓸 최대 행 수")
+    parser.add_argument('--compact', action='store_true')
+    parser.add_argument('--workdir', default='bench_data', help="합성 parquet 보관 폴더 (같은 크기/시드면 재사용)")
+    parser.add_argument('--out', default='bench_results.json')
+    parser.add_argument('--compare', help="비교할 이전 결과 JSON")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    synth = SyntheticMaster(args.template, n_years=args.years, seed=args.seed)
+    results = []
+    for size in args.sizes:
+        path = os.path.join(args.workdir, f"synthetic_{size}_s{args.seed}_y{args.years}.parquet")
+        if not os.path.exists(path):
+            with StageTimer() as timer:
+                synth.write(path, size)
+            results.append(timer.record(size, size, 'generate'))
+        print(f"[{size:,} rows] {path}", flush=True)
+        results.extend(run_size(path, size, args.stages, args.trials, args.mode, args.explain_rows, args.compact))
+
+    report = {
+        'created_at': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'environment': environment(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('out', 'compare')},
+        'results': results,
+    }
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"results -> {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print(compare(json.load(f), report).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
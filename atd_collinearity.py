@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+import atd_trace as trace
+
+# ==========================================
+# ATD-RAM 다중공선성(VIF) 엔진
+#  - 변수별 OLS 회귀(p번) 대신 상관행렬 역행렬의 대각 성분으로 모든 VIF를 한 번에 계산
+#      VIF_j = [R^-1]_jj = 1 / (1 - R_j^2)
+#  - 행 청크 단위로 Gram 행렬(X^T X)을 누적 -> 전체 학습 데이터도 청크 크기 메모리로 처리
+#  - 완전 공선성(상관행렬 특이)인 변수는 inf
+# ==========================================
+
+CHUNK_ROWS = 100000
+VIF_DANGER = 10.0
+
+
+class GramAccumulator:
+    # 청크별로 행 수 / 합 / X^T X 를 누적 (첫 청크 평균만큼 이동시켜 수치 안정성 확보)
+    def __init__(self, features):
+        self.features = list(features)
+        p = len(self.features)
+        self.n = 0
+        self.shift = None
+        self.total = np.zeros(p)
+        self.gram = np.zeros((p, p))
+
+    def update(self, chunk):
+        # 결측치나 무한대 값은 0으로 채움 (기존 VIF 검사기와 동일)
+        X = np.asarray(chunk, dtype=np.float64)
+        X = np.where(np.isfinite(X), X, 0.0)
+        if len(X) == 0:
+            return self
+        if self.shift is None:
+            self.shift = X.mean(axis=0)
+        X = X - self.shift
+        self.n += len(X)
+        self.total += X.sum(axis=0)
+        self.gram += X.T @ X
+        return self
+
+    def correlation(self):
+        mean = self.total / self.n
+        cov = (self.gram - self.n * np.outer(mean, mean)) / (self.n - 1)
+        std = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return cov / np.outer(std, std), std
+
+    def vif(self):
+        if self.n < 2:
+            return pd.Series(np.nan, index=self.features)
+        corr, std = self.correlation()
+        constant = std <= 1e-12 * np.maximum(1.0, np.abs(self.shift))
+        scores = np.full(len(self.features), np.inf)
+
+        # 상관행렬 고유분해: VIF_j = sum_k V_jk^2 / λ_k, λ_k ≈ 0 방향에 걸친 변수는 완전 공선성(inf)
+        keep = ~constant
+        if keep.any():
+            w, V = np.linalg.eigh(corr[np.ix_(keep, keep)])
+            null = w <= max(w.max(), 1.0) * len(w) * np.finfo(np.float64).eps * 1e3
+            vif = (V[:, ~null] ** 2 / w[~null]).sum(axis=1)
+            vif[(V[:, null] ** 2).sum(axis=1) > 1e-8] = np.inf
+            scores[keep] = vif
+        return pd.Series(scores, index=self.features)
+
+
+def iter_chunks(X, chunk_rows=CHUNK_ROWS):
+    for start in range(0, len(X), chunk_rows):
+        yield X.iloc[start:start + chunk_rows].to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def vif_scores(X, features=None, chunk_rows=CHUNK_ROWS):
+    # X: DataFrame 또는 청크(2차원 배열) 이터레이터 (이터레이터면 features 필수)
+    if isinstance(X, pd.DataFrame):
+        features = list(features or X.columns)
+        chunks = iter_chunks(X[features], chunk_rows)
+    else:
+        chunks = X
+    acc = GramAccumulator(features)
+    with trace.span('vif', features=len(features)) as span:
+        for chunk in chunks:
+            acc.update(chunk)
+        span.rows = acc.n
+        return acc.vif()
+
+
+def vif_table(X, features=None, chunk_rows=CHUNK_ROWS):
+    scores = vif_scores(X, features, chunk_rows)
+    table = pd.DataFrame({'Feature': scores.index, 'VIF_Score': scores.values})
+    return table.sort_values(by='VIF_Score', ascending=False).reset_index(drop=True)
@@ -0,0 +1,150 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import atd_geo as geo
+
+# ==========================================
+# ATD-RAM 지상 혼잡 피처 (슬라이딩 윈도우 집계)
+#  - RAM_Datetime 기준 N분 윈도우 안에 같은 구역(Category) / 같은 출발 활주로 / 공항 전체에서 RAM 한 출발편 수
+#      윈도우 = [t - N분, t] 안의 앞선 항공편 (같은 시각이면 입력 순서상 앞선 것만)
+#      -> 과거 정보만 쓰므로 실시간 서빙 / 증분 갱신 결과가 일괄 계산과 같음
+#  - (그룹, 시각) 합성 키를 정렬한 배열 하나에 윈도우마다 searchsorted 한 번 -> O(n log n), 항공편별 반복 없음
+#  - CongestionTracker: 새로 들어온 항공편만 최근 윈도우 이력과 합쳐 계산 (증분 갱신)
+# ==========================================
+
+WINDOWS_MIN = (15, 30, 60)
+TIME_COL = 'RAM_Datetime'
+# 구역 / 활주로 컬럼 후보 (앞에 있는 것부터 사용: 추출본 원본 값 -> 마스터의 인코딩 값)
+ZONE_COLS = ('Category', 'Apron_Enc')
+RUNWAY_COLS = (geo.RUNWAY_COL, 'Est_Target_RWY_Enc')
+SCOPES = {'Zone': ZONE_COLS, 'RWY': RUNWAY_COLS, 'Total': ()}
+
+
+def feature_names(windows=WINDOWS_MIN):
+    return [f"{scope}_Dep_{w}m" for scope in SCOPES for w in windows]
+
+
+def _seconds(times):
+    # datetime -> 초 단위 int64 (NaT는 None 처리용 마스크와 함께)
+    times = pd.to_datetime(pd.Series(times)).to_numpy(dtype='datetime64[s]')
+    return times.astype(np.int64), ~np.isnat(times)
+
+
+def rolling_counts(seconds, groups, windows=WINDOWS_MIN):
+    # seconds: 초 단위 시각, groups: 그룹 코드 (-1 = 모름)
+    # 반환: (n, 윈도우 수) float64, 같은 그룹에서 [t - w, t] 안에 있는 앞선 항공편 수 (그룹/시각이 없으면 NaN)
+    seconds = np.asarray(seconds, dtype=np.int64)
+    groups = np.asarray(groups, dtype=np.int64)
+    out = np.full((len(seconds), len(windows)), np.nan)
+    valid = groups >= 0
+    if not valid.any():
+        return out
+
+    t, g = seconds[valid], groups[valid]
+    # 그룹 사이 간격을 최대 윈도우보다 크게 둔 합성 키 -> 정렬 배열 하나로 모든 그룹을 처리
+    base = t.min()
+    span = int(t.max() - base) + max(windows) * 60 + 1
+    key = g * span + (t - base)
+    order = np.argsort(key, kind='stable')
+    key = key[order]
+    position = np.arange(len(key))  # 안정 정렬 -> 같은 시각은 입력 순서 유지
+    counts = np.empty((len(key), len(windows)))
+    for j, w in enumerate(windows):
+        counts[:, j] = position - np.searchsorted(key, key - w * 60, side='left')
+
+    rows = np.flatnonzero(valid)
+    out[rows[order]] = counts
+    return out
+
+
+def resolve_columns(columns):
+    # 범위별로 실제 사용할 그룹 컬럼 (없으면 None -> 해당 피처 생략)
+    columns = set(columns)
+    resolved = {}
+    for scope, candidates in SCOPES.items():
+        found = [c for c in candidates if c in columns]
+        if candidates and not found:
+            continue
+        resolved[scope] = found[0] if found else None
+    return resolved
+
+
+def _with_zone(df):
+    # 주기장 ID만 있는 추출본은 주기장 파일의 구역(Category)을 붙임
+    if 'Category' not in df.columns and geo.STAND_COL in df.columns:
+        zones = geo.load_stands().set_index(geo.STAND_COL)['Category']
+        df = df.assign(Category=df[geo.STAND_COL].astype(str).map(zones))
+    return df
+
+
+def congestion_features(df, windows=WINDOWS_MIN, history=None):
+    # df의 각 항공편에 대한 혼잡 피처 (df.index 기준 DataFrame)
+    # history: df보다 앞선 항공편 (윈도우 계산에만 쓰고 결과에는 포함하지 않음)
+    df = _with_zone(df)
+    frames = [df] if history is None or len(history) == 0 else [_with_zone(history), df]
+    resolved = resolve_columns(set.intersection(*(set(f.columns) for f in frames)))
+    keys = [TIME_COL] + [c for c in resolved.values() if c is not None]
+    combined = pd.concat([f[keys] for f in frames], ignore_index=True)
+
+    seconds, has_time = _seconds(combined[TIME_COL])
+    features = {}
+    for scope, col in resolved.items():
+        groups = pd.factorize(combined[col])[0] if col is not None else np.zeros(len(combined), dtype=np.int64)
+        counts = rolling_counts(seconds, np.where(has_time, groups, -1), windows)[len(combined) - len(df):]
+        for j, w in enumerate(windows):
+            features[f"{scope}_Dep_{w}m"] = counts[:, j]
+    return pd.DataFrame(features, index=df.index)
+
+
+def add_congestion_features(df, windows=WINDOWS_MIN, history=None, overwrite=True):
+    if TIME_COL not in df.columns:
+        return df
+    features = congestion_features(df, windows, history)
+    if not overwrite:
+        features = features[[c for c in features.columns if c not in df.columns]]
+    return df.assign(**{c: features[c] for c in features.columns})
+
+
+class CongestionTracker:
+    # 실시간/일일 추출본 증분 갱신: 최근 max(윈도우)분 이력만 들고 새 항공편 배치의 피처를 계산
+    #  - 이미 계산해 내보낸 항공편의 값은 고치지 않음 (윈도우가 과거 방향이라 새 항공편이 바꿀 일이 없음)
+    def __init__(self, windows=WINDOWS_MIN, history=None):
+        self.windows = tuple(windows)
+        self.history = None
+        if history is not None:
+            self._remember(history)
+
+    def _remember(self, flights):
+        flights = _with_zone(flights)
+        keep = [c for c in [TIME_COL, *ZONE_COLS, *RUNWAY_COLS] if c in flights.columns]
+        frames = [f for f in (self.history, flights[keep]) if f is not None and len(f)]
+        history = pd.concat(frames, ignore_index=True) if frames else flights[keep]
+        times = pd.to_datetime(history[TIME_COL])
+        cutoff = times.max() - pd.Timedelta(minutes=max(self.windows))
+        self.history = history[(times >= cutoff).to_numpy()].reset_index(drop=True)
+
+    def update(self, flights):
+        # 새 항공편 배치 -> 피처가 붙은 배치 (이력에 추가)
+        out = add_congestion_features(flights, self.windows, self.history)
+        self._remember(flights)
+        return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ATD-RAM 지상 혼잡 피처 계산")
+    parser.add_argument('--data', default='ATD_RAM_Master.parquet')
+    parser.add_argument('--windows', type=int, nargs='+', default=list(WINDOWS_MIN), help="윈도우 길이(분)")
+    parser.add_argument('--out', help="피처가 추가된 parquet 저장 경로 (기본값: 요약만 출력, 마스터 파일로 학습할 때 이 파일을 사용)")
+    args = parser.parse_args(argv)
+
+    df = add_congestion_features(pd.read_parquet(args.data), args.windows)
+    if args.out:
+        df.to_parquet(args.out, index=False)
+    else:
+        print(df[[c for c in feature_names(args.windows) if c in df.columns]].describe().round(1).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,1142 @@
+import argparse
+import contextvars
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import atd_lazy as lazy
+import atd_trace as trace
+
+warnings.filterwarnings('ignore')
+
+# 학습 라이브러리는 처음 쓸 때 import (앱 업로드 화면 / 데이터 적재 CLI는 읽지 않음, atd_lazy)
+xgb = lazy.module('xgboost')
+lgb = lazy.module('lightgbm')
+optuna = lazy.module('optuna')
+joblib = lazy.module('joblib')
+skmetrics = lazy.module('sklearn.metrics')
+sklinear = lazy.module('sklearn.linear_model')
+pruning = lazy.module('atd_pruning')
+
+# ==========================================
+# ATD-RAM 학습 엔진 (Streamlit 없이 단독 실행 가능)
+#  - API: train_from_parquet() / run_training()
+#  - CLI: python atd_engine.py --data ATD_RAM_Master.parquet --mode stacking ...
+# ==========================================
+
+TARGET_COL = 'Target_ATD_RAM'
+ID_COLS = ['Year', 'FLT', 'RAM_Datetime']
+FILTER_COLS = ['Weather_Type', 'Snow_Phase', 'NAT', 'STS']
+EXCLUDE_FROM_TRAIN = ID_COLS + [TARGET_COL] + FILTER_COLS
+
+# 학습 모드
+MODE_SINGLE = 'single'
+MODE_STACKING = 'stacking'
+
+# 평가(Test) 데이터 추출 방식
+SPLIT_AUTO = 'auto'            # 학습 데이터 내에서 마지막 10% 자동 분할
+SPLIT_HOLDOUT = 'holdout'      # 특정 연도를 통째로 평가(Test)에 배정
+SPLIT_IN_SAMPLE = 'in_sample'  # 선택한 연도 전체를 학습하고 자체 평가
+
+# Out-of-core 학습 (atd_outofcore)
+OOC_QUANTILE = 'quantile'  # 배치 스트리밍 -> 양자화 행렬만 메모리에 (QuantileDMatrix / LightGBM 바이너리 Dataset)
+OOC_EXTERNAL = 'external'  # XGBoost 양자화 페이지까지 디스크 캐시에 (ExtMemQuantileDMatrix)
+
+
+class TrainingError(Exception):
+    pass
+
+
+# ==========================================
+# 1. 데이터 로드 & 필터
+# ==========================================
+def compact_frame(df, category_ratio=0.5):
+    # 메모리 절약 모드: 반복이 많은 문자열 -> category, 나머지 문자열 -> Arrow 문자열,
+    # 정수 -> 가장 작은 정수형, 실수 -> float32, 타겟은 float64 유지
+    #  - XGBoost는 입력을 float32로 바꿔 쓰므로 결과 동일
+    #  - LightGBM은 float64 값으로 bin 경계를 잡으므로 경계 근처 값이 다른 bin에 들어가 결과가 조금 달라질 수 있음
+    #    (out-of-core LightGBM Dataset도 float32 행으로 만들므로 이 모드와 같은 조건)
+    columns = {}
+    for col in df.columns:
+        s = df[col]
+        if col == TARGET_COL or isinstance(s.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(s):
+            columns[col] = s
+        elif pd.api.types.is_integer_dtype(s):
+            columns[col] = pd.to_numeric(s, downcast='integer')
+        elif pd.api.types.is_float_dtype(s):
+            columns[col] = s.astype(np.float32)
+        elif pd.api.types.is_string_dtype(s):
+            if s.nunique() <= len(s) * category_ratio:
+                columns[col] = s.astype('category')
+            else:
+                columns[col] = s.astype(pd.StringDtype('pyarrow'))
+        else:
+            columns[col] = s
+    return pd.DataFrame(columns, index=df.index)
+
+
+def load_master(source, compact=False):
+    # source: 파일 경로 또는 업로드된 파일 객체
+    # 지상 혼잡 피처는 적재 단계에서만 계산 (atd_ingest.append_extract / python atd_congestion.py --out)
+    # -> 파일에 있는 컬럼 그대로 읽으므로 메모리 학습과 out-of-core 스트리밍의 변수 목록이 같음
+    with trace.span('load_master') as span:
+        df = pd.read_parquet(source)
+        if compact:
+            df = compact_frame(df)
+        span.rows = len(df)
+    available_features = [c for c in df.columns if c not in ID_COLS + [TARGET_COL]]
+    return df, available_features
+
+
+def trainable_features(columns):
+    # columns: DataFrame 또는 컬럼 이름 목록
+    return [c for c in columns if c not in EXCLUDE_FROM_TRAIN]
+
+
+def make_filter_spec(remove_outliers=True, **selections):
+    # selections: FILTER_COLS 이름을 키로 하는 선택값 목록 (비어 있으면 필터 미적용)
+    spec = {'remove_outliers': bool(remove_outliers)}
+    for col in FILTER_COLS:
+        spec[col] = list(selections.get(col) or [])
+    return spec
+
+
+def outlier_threshold(target):
+    # 3-Sigma 극단치 기준 (최소 240분)
+    target = np.asarray(target, dtype=np.float64)
+    return max(np.nanmean(target) + (3 * np.nanstd(target, ddof=1)), 240.0)
+
+
+class FilterEngine:
+    # 필터 엔진: 필터 컬럼을 한 번만 범주 코드로 바꿔두고, 필터 스펙별 결과 행 번호를 LRU 캐시
+    #  - 극단치 조건 + 범주 조건 + 연도 조건을 하나의 boolean 마스크로 계산 (중간 DataFrame 없음)
+    #  - 결과는 행 번호 배열 -> 전체 행이 남으면 원본 DataFrame을 그대로 돌려줌 (복사 없음)
+    def __init__(self, df, max_entries=32):
+        self.df = df
+        self.max_entries = max_entries
+        self.codes = {}
+        self.categories = {}
+        for col in FILTER_COLS + ['Year']:
+            if col in df.columns:
+                codes, uniques = pd.factorize(df[col])
+                self.codes[col] = codes
+                self.categories[col] = pd.Index(uniques)
+        self.threshold = outlier_threshold(df[TARGET_COL]) if TARGET_COL in df.columns else np.inf
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(spec, years=None):
+        return json.dumps([spec, sorted(int(y) for y in years or ())], sort_keys=True, default=str)
+
+    def _isin(self, col, values):
+        # 코드 -> 선택 여부 조회표 (마지막 칸 = 결측 코드 -1)
+        lookup = np.zeros(len(self.categories[col]) + 1, dtype=bool)
+        positions = self.categories[col].get_indexer(list(values))
+        lookup[positions[positions >= 0]] = True
+        return lookup[self.codes[col]]
+
+    def mask(self, spec, years=None):
+        mask = np.ones(len(self.df), dtype=bool)
+        if spec.get('remove_outliers') and TARGET_COL in self.df.columns:
+            mask &= self.df[TARGET_COL].to_numpy(dtype=np.float64, na_value=np.nan) <= self.threshold
+        for col in FILTER_COLS:
+            values = spec.get(col)
+            if values and col in self.codes:
+                mask &= self._isin(col, values)
+        if years and 'Year' in self.codes:
+            mask &= self._isin('Year', [int(y) for y in years])
+        return mask
+
+    def indices(self, spec, years=None):
+        key = self.key(spec, years)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        idx = np.flatnonzero(self.mask(spec, years))
+        idx.flags.writeable = False
+        with self._lock:
+            self._cache[key] = idx
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return idx
+
+    def filter(self, spec, years=None):
+        with trace.span('filter', rows=len(self.df)) as span:
+            idx = self.indices(spec, years)
+            span.attrs['kept'] = len(idx)
+            if len(idx) == len(self.df):
+                return self.df
+            return self.df.iloc[idx]
+
+
+def apply_filters(df, spec):
+    return FilterEngine(df, max_entries=1).filter(spec)
+
+
+def split_years(split_mode, train_years, test_years=()):
+    # 분할 방식에 실제로 쓰이는 연도 (데이터셋 읽기 시 Year 조건으로 내려보냄)
+    years = list(train_years) + (list(test_years) if split_mode == SPLIT_HOLDOUT else [])
+    return sorted({int(y) for y in years})
+
+
+def take_rows(frame, positions):
+    # 행 번호 배열로 선택 -> 연속 구간이면 슬라이스(복사 없는 뷰), 아니면 한 번만 take
+    if len(positions) and positions[-1] - positions[0] + 1 == len(positions):
+        return frame.iloc[positions[0]:positions[-1] + 1]
+    return frame.iloc[positions]
+
+
+def tail_split(positions, test_size=0.1):
+    # train_test_split(shuffle=False)와 같은 규칙: 마지막 ceil(n * test_size)개가 평가 구간
+    n_test = int(np.ceil(len(positions) * test_size))
+    return positions[:len(positions) - n_test], positions[len(positions) - n_test:]
+
+
+def split_by_year(df, features, split_mode, train_years, test_years=()):
+    # 행 번호 배열로 분할하고 마지막에 한 번만 선택 (연속 구간은 원본 데이터의 뷰)
+    X_all = df[features]
+    y_all = np.log1p(df[TARGET_COL])
+    year_col = df['Year'].astype(int)
+
+    if split_mode == SPLIT_AUTO:
+        selected = np.flatnonzero(year_col.isin(train_years))
+
+        if len(selected) < 100:
+            raise TrainingError("🚨 선택한 학습 연도에 데이터가 너무 적습니다. 조건을 완화해주세요!")
+
+        train_pos, test_pos = tail_split(selected)
+
+    elif split_mode == SPLIT_HOLDOUT:
+        train_pos = np.flatnonzero(year_col.isin(train_years))
+        test_pos = np.flatnonzero(year_col.isin(test_years))
+
+        if len(train_pos) < 50 or len(test_pos) == 0:
+            raise TrainingError("🚨 학습 또는 테스트 데이터가 비어있습니다. 연도를 다시 선택해주세요!")
+
+    elif split_mode == SPLIT_IN_SAMPLE:
+        train_pos = np.flatnonzero(year_col.isin(train_years))
+
+        if len(train_pos) < 50:
+            raise TrainingError("🚨 선택한 학습 연도에 데이터가 너무 적습니다!")
+
+        # 같은 행을 다시 평가하므로 복사 없이 그대로 공유
+        X_train_full, y_train_full = take_rows(X_all, train_pos), take_rows(y_all, train_pos)
+        return X_train_full, X_train_full, y_train_full, y_train_full
+
+    else:
+        raise TrainingError(f"🚨 알 수 없는 평가 방식입니다: {split_mode}")
+
+    return take_rows(X_all, train_pos), take_rows(X_all, test_pos), take_rows(y_all, train_pos), take_rows(y_all, test_pos)
+
+
+def feature_profile(X, max_choices=5):
+    # 입력 변수 스키마 (학습 시 한 번 계산해 모델과 함께 저장 -> 입력 폼/데이터 편집기/예측 서비스가 공통 사용)
+    #  kind: 'choice' (값 종류 max_choices개 이하 숫자, 예: 0/1 플래그) / 'number' (연속 숫자) / 'text' (문자형)
+    profile = {}
+    for col in X.columns:
+        s = X[col]
+        values = s.dropna()
+        entry = {'dtype': str(s.dtype), 'nullable': bool(len(values) < len(s))}
+        if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            unique = np.unique(values.to_numpy(dtype=np.float64))
+            entry['cardinality'] = int(len(unique))
+            if 0 < len(unique) <= max_choices:
+                entry['kind'] = 'choice'
+                entry['categories'] = [float(v) for v in unique]
+                entry['default'] = float(values.mode().iloc[0])
+            else:
+                lo, hi = (float(unique[0]), float(unique[-1])) if len(unique) else (0.0, 0.0)
+                entry['kind'] = 'number'
+                entry['min'], entry['max'] = lo, hi
+                entry['default'] = float(values.mean()) if len(values) else 0.0
+                entry['step'] = (hi - lo) / 100 if hi != lo else 0.1
+        else:
+            categories = values.unique().tolist()
+            entry['kind'] = 'text'
+            entry['cardinality'] = len(categories)
+            entry['categories'] = [str(v) for v in categories]
+            entry['default'] = str(values.mode().iloc[0]) if len(values) else None
+        profile[col] = entry
+    return profile
+
+
+# ==========================================
+# 2. 진행 상황 이벤트 & Optuna 콜백
+#  - progress: event(dict) 하나를 받는 함수 (Streamlit 화면, CLI 로그 등)
+# ==========================================
+def _emit(progress, **event):
+    if progress is not None:
+        progress(event)
+
+
+class OptunaPlateauCallback:
+    # on_stop: 정체 시 호출 (기본값은 study.stop, 병렬 모드에서는 워커들에게 중단 신호 전달)
+    def __init__(self, n_trials, early_stopping_rounds, model_name, progress=None, on_stop=None):
+        self.n_trials = n_trials
+        self.early_stopping_rounds = early_stopping_rounds
+        self.model_name = model_name
+        self.progress = progress
+        self.on_stop = on_stop
+        self.best_score = float('inf')
+        self.no_improvement_count = 0
+        self.finished = 0
+        self.stopped = False
+
+    def __call__(self, study, trial):
+        pruned = trial.state == optuna.trial.TrialState.PRUNED
+        if trial.value is None and not pruned:
+            return
+
+        # 가지치기(Pruned)된 trial은 개선 없음으로 취급
+        self.finished += 1
+        improved = not pruned and trial.value < self.best_score
+        if improved:
+            self.best_score = trial.value
+            self.no_improvement_count = 0
+        else:
+            self.no_improvement_count += 1
+
+        _emit(self.progress, type='trial', model=self.model_name, trial=self.finished,
+              n_trials=self.n_trials, best=self.best_score, stall=self.no_improvement_count,
+              patience=self.early_stopping_rounds, improved=improved, pruned=pruned)
+
+        if self.early_stopping_rounds > 0 and self.no_improvement_count >= self.early_stopping_rounds and not self.stopped:
+            self.stopped = True
+            _emit(self.progress, type='early_stop', model=self.model_name, patience=self.early_stopping_rounds)
+            (self.on_stop or (lambda s: s.stop()))(study)
+
+
+def print_progress(event):
+    # CLI용 진행 상황 출력
+    if event['type'] == 'trial':
+        flag = " (pruned)" if event.get('pruned') else (" *" if event['improved'] else "")
+        print(f"[{event['model']}] trial {event['trial']}/{event['n_trials']} | best MAE {event['best']:.4f} | stall {event['stall']}/{event['patience']}{flag}", flush=True)
+    elif event['type'] == 'early_stop':
+        print(f"[{event['model']}] early stop: no improvement for {event['patience']} trials", flush=True)
+    elif event['type'] in ('study_start', 'stage'):
+        print(event.get('message', ''), flush=True)
+
+
+# ==========================================
+# 3. 튜닝 모드 설정 (Pruning / 병렬 워커 / 공유 스토리지)
+# ==========================================
+PRUNER_NONE = 'none'
+PRUNER_MEDIAN = 'median'
+PRUNER_HYPERBAND = 'hyperband'
+
+MAX_ROUNDS = 1500  # 탐색 공간의 n_estimators 최대값 (Hyperband 자원 상한)
+
+# 튜닝 후 최종 모델 재학습 방식
+REFIT_FULL = 'full'                # best_params 그대로 전체 학습 데이터로 처음부터 재학습 (기존 방식)
+REFIT_BEST_ROUNDS = 'best_rounds'  # 튜닝 중 찾은 최적 부스팅 라운드 수로만 재학습
+REFIT_CONTINUE = 'continue'        # 튜닝된 부스터를 이어받아 검증 구간 데이터로 추가 학습
+
+
+class TuningConfig:
+    # pruner: 라운드별 검증 MAE를 보고 받아 가망 없는 trial을 중간에 끊음
+    # n_workers: 2 이상이면 프로세스 워커들이 하나의 스토리지를 공유하며 병렬 탐색
+    # storage: 저널 파일 경로 또는 RDB URL (예: sqlite:///optuna.db), 없으면 임시 저널 파일 사용
+    # round_early_stop: trial 내부의 eval_set 기준 조기 종료 라운드 (0=끄기)
+    # report_every: 중간 MAE 보고 주기 (라운드 수, 스토리지 쓰기 횟수를 줄이기 위함)
+    # refit: 최종 재학습 방식 (REFIT_*), 최적 라운드 수는 round_early_stop을 켜야 정확해짐
+    # cv_folds: 2 이상이면 단일 검증 구간 대신 시간 순 확장 윈도우 K-Fold로 채점하고 OOF 예측으로 메타 모델 학습
+    def __init__(self, pruner=PRUNER_NONE, n_workers=1, storage=None, round_early_stop=0, report_every=10,
+                 refit=REFIT_FULL, cv_folds=0):
+        self.pruner = pruner
+        self.refit = refit
+        self.cv_folds = int(cv_folds)
+        self.n_workers = max(1, int(n_workers))
+        self.storage = storage
+        self.round_early_stop = int(round_early_stop)
+        self.report_every = max(1, int(report_every))
+
+    @property
+    def reports_rounds(self):
+        return self.pruner != PRUNER_NONE or self.round_early_stop > 0
+
+
+def make_pruner(name, cv_folds=0):
+    # CV 모드에서는 부스팅 라운드 대신 fold 하나가 자원(step) 단위
+    if name == PRUNER_MEDIAN:
+        return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=1 if cv_folds > 1 else 100)
+    if name == PRUNER_HYPERBAND:
+        if cv_folds > 1:
+            return optuna.pruners.HyperbandPruner(min_resource=1, max_resource=cv_folds, reduction_factor=2)
+        return optuna.pruners.HyperbandPruner(min_resource=50, max_resource=MAX_ROUNDS, reduction_factor=3)
+    return optuna.pruners.NopPruner()
+
+
+def make_storage(spec):
+    if spec is None:
+        return None
+    if '://' in spec:
+        return spec
+    from optuna.storages.journal import JournalStorage, JournalFileBackend
+    return JournalStorage(JournalFileBackend(spec))
+
+
+def mae_minutes(y_true, y_pred):
+    # log1p 타겟을 분 단위로 되돌린 검증 MAE (Optuna 목적함수와 동일한 스케일)
+    return float(np.mean(np.abs(np.expm1(y_true) - np.expm1(y_pred))))
+
+
+def _lgb_mae_minutes(y_true, y_pred):
+    return 'mae_minutes', mae_minutes(y_true, y_pred), False
+
+
+# ==========================================
+# 4. 시계열 CV 엔진 (Expanding Window)
+#  - fold 인덱스는 한 번만 만들고, fold별 DMatrix / lgb.Dataset을 메모리에 올려
+#    모든 trial과 두 모델 계열이 재사용
+# ==========================================
+class TimeSeriesCV:
+    # order(RAM_Datetime 또는 Year) 기준으로 정렬 후 n_splits + 1개 블록으로 나눔
+    # fold k: 앞쪽 k + 1개 블록으로 학습 -> 바로 다음 블록으로 검증
+    def __init__(self, X, y, order, n_splits=4):
+        ordered = np.argsort(np.asarray(order), kind='stable')
+        blocks = np.array_split(ordered, n_splits + 1)
+        self.X = X
+        self.y = np.asarray(y, dtype=float)
+        self.n_splits = n_splits
+        self.folds = [(np.sort(np.concatenate(blocks[:k + 1])), np.sort(blocks[k + 1])) for k in range(n_splits)]
+        self.oof_index = np.concatenate([valid_idx for _, valid_idx in self.folds])
+        self._cache = {}
+
+    def __getstate__(self):
+        # 워커 프로세스에는 원본 데이터만 보내고, 학습 행렬은 각 워커에서 한 번씩 다시 만듦
+        state = self.__dict__.copy()
+        state['_cache'] = {}
+        return state
+
+    @property
+    def oof_target(self):
+        return self.y[self.oof_index]
+
+    def xgb_fold(self, k):
+        key = ('XGBoost', k)
+        if key not in self._cache:
+            train_idx, valid_idx = self.folds[k]
+            self._cache[key] = (xgb.DMatrix(self.X.iloc[train_idx], label=self.y[train_idx]),
+                                xgb.DMatrix(self.X.iloc[valid_idx], label=self.y[valid_idx]))
+        return self._cache[key]
+
+    def lgb_fold(self, k):
+        key = ('LightGBM', k)
+        if key not in self._cache:
+            train_idx, valid_idx = self.folds[k]
+            X_valid = self.X.iloc[valid_idx]
+            dtrain = lgb.Dataset(self.X.iloc[train_idx], label=self.y[train_idx], free_raw_data=False, params={'verbose': -1})
+            dvalid = lgb.Dataset(X_valid, label=self.y[valid_idx], reference=dtrain, free_raw_data=False)
+            self._cache[key] = (dtrain.construct(), dvalid.construct(), X_valid)
+        return self._cache[key]
+
+
+def _xgb_native_mae(predt, dmat):
+    return 'mae_minutes', mae_minutes(dmat.get_label(), predt)
+
+
+def _lgb_native_mae(preds, eval_data):
+    return 'mae_minutes', mae_minutes(eval_data.get_label(), preds), False
+
+
+def xgb_native_params(params, n_jobs=-1):
+    # 탐색 공간(sklearn 이름) -> xgb.train 파라미터 (라운드 수 n_estimators는 따로 전달)
+    native = {'eta': params['learning_rate'], 'max_depth': params['max_depth'],
+              'objective': 'reg:squarederror', 'seed': 42}
+    if n_jobs > 0:
+        native['nthread'] = n_jobs
+    return native
+
+
+def lgb_native_params(params, n_jobs=-1):
+    return {'learning_rate': params['learning_rate'], 'max_depth': params['max_depth'],
+            'num_leaves': params['num_leaves'], 'objective': 'regression', 'seed': 42,
+            'num_threads': max(n_jobs, 0), 'metric': 'None', 'verbose': -1}
+
+
+def _train_fold(model_name, cv, k, params, tuning, n_jobs=-1):
+    # 캐시된 fold 행렬로 네이티브 API 학습 -> (검증 예측, 사용한 라운드 수)
+    rounds = params['n_estimators']
+    early_stop = tuning.round_early_stop or None
+
+    if model_name == 'XGBoost':
+        dtrain, dvalid = cv.xgb_fold(k)
+        booster = xgb.train(xgb_native_params(params, n_jobs), dtrain, rounds, evals=[(dvalid, 'valid')] if early_stop else (),
+                            custom_metric=_xgb_native_mae if early_stop else None,
+                            early_stopping_rounds=early_stop, verbose_eval=False)
+        best_rounds = booster.best_iteration + 1 if early_stop else rounds
+        return booster.predict(dvalid, iteration_range=(0, best_rounds)), best_rounds
+
+    dtrain, dvalid, X_valid = cv.lgb_fold(k)
+    native = lgb_native_params(params, n_jobs)
+    callbacks = [lgb.early_stopping(early_stop, verbose=False)] if early_stop else []
+    booster = lgb.train(native, dtrain, rounds, valid_sets=[dvalid] if early_stop else None,
+                        feval=_lgb_native_mae if early_stop else None, callbacks=callbacks)
+    best_rounds = booster.best_iteration or rounds
+    return booster.predict(X_valid, num_iteration=best_rounds), best_rounds
+
+
+def cv_predict(model_name, cv, params, tuning, n_jobs=-1, trial=None):
+    # fold 순서대로 학습/예측해 OOF 예측을 채움 (trial이 있으면 fold마다 누적 MAE를 보고해 가지치기)
+    oof = np.empty(len(cv.oof_index))
+    maes = []
+    pos = 0
+    best_rounds = params['n_estimators']
+    for k, (_, valid_idx) in enumerate(cv.folds):
+        pred, best_rounds = _train_fold(model_name, cv, k, params, tuning, n_jobs)
+        oof[pos:pos + len(pred)] = pred
+        pos += len(pred)
+        maes.append(mae_minutes(cv.y[valid_idx], pred))
+        if trial is not None and tuning.pruner != PRUNER_NONE:
+            pruning.report_round(trial, k, float(np.mean(maes)))
+    # 최적 라운드 수는 학습 구간이 가장 긴 마지막 fold 기준
+    return oof, float(np.mean(maes)), best_rounds
+
+
+# ==========================================
+# 5. 베이스 모델 목적함수 & 튜닝
+#  - data: (X_train, y_train, X_valid, y_valid) 또는 TimeSeriesCV
+# ==========================================
+def suggest_xgb_params(trial):
+    return {
+        'n_estimators': trial.suggest_int('n_estimators', 500, MAX_ROUNDS, step=500),
+        'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.05, log=True),
+        'max_depth': trial.suggest_int('max_depth', 4, 8),
+    }
+
+
+def suggest_lgb_params(trial):
+    return {
+        'n_estimators': trial.suggest_int('n_estimators', 500, MAX_ROUNDS, step=500),
+        'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.05, log=True),
+        'max_depth': trial.suggest_int('max_depth', 4, 10),
+        'num_leaves': trial.suggest_int('num_leaves', 15, 63),
+    }
+
+
+SEARCH_SPACES = {'XGBoost': suggest_xgb_params, 'LightGBM': suggest_lgb_params}
+
+
+def _keep_if_best(trial, trial_dir, score, save, ext, attr='booster_path'):
+    # 지금까지의 최고 trial보다 좋을 때만 결과물(부스터, OOF 예측)을 파일로 저장
+    if trial_dir is None:
+        return
+    try:
+        best = trial.study.best_value
+    except ValueError:
+        best = float('inf')
+    if score < best:
+        path = os.path.join(trial_dir, f"trial_{trial.number}{ext}")
+        save(path)
+        trial.set_user_attr(attr, path)
+
+
+def xgb_objective(trial, data, tuning, n_jobs=-1, trial_dir=None):
+    X_train, y_train, X_valid, y_valid = data
+    params = dict(suggest_xgb_params(trial), objective='reg:squarederror', random_state=42, n_jobs=n_jobs)
+    if tuning.reports_rounds:
+        params['eval_metric'] = mae_minutes
+    if tuning.pruner != PRUNER_NONE:
+        params['callbacks'] = [pruning.XGBPruningCallback(trial, tuning.report_every)]
+    if tuning.round_early_stop > 0:
+        params['early_stopping_rounds'] = tuning.round_early_stop
+
+    model = xgb.XGBRegressor(**params)
+    model.fit(X_train, y_train, eval_set=[(X_valid, y_valid)], verbose=False)
+    best_rounds = int(model.best_iteration) + 1 if tuning.round_early_stop > 0 else params['n_estimators']
+    trial.set_user_attr('best_iteration', best_rounds)
+
+    score = skmetrics.mean_absolute_error(np.expm1(y_valid), np.expm1(model.predict(X_valid)))
+    if tuning.refit == REFIT_CONTINUE:
+        _keep_if_best(trial, trial_dir, score, lambda path: model.get_booster()[:best_rounds].save_model(path), '.ubj')
+    return score
+
+
+def lgb_objective(trial, data, tuning, n_jobs=-1, trial_dir=None):
+    X_train, y_train, X_valid, y_valid = data
+    params = dict(suggest_lgb_params(trial), objective='regression', random_state=42, n_jobs=n_jobs, verbose=-1)
+    fit_kwargs = {}
+    callbacks = []
+    if tuning.reports_rounds:
+        params['metric'] = 'None'
+        fit_kwargs['eval_metric'] = _lgb_mae_minutes
+    if tuning.pruner != PRUNER_NONE:
+        callbacks.append(pruning.LGBPruningCallback(trial, tuning.report_every))
+    if tuning.round_early_stop > 0:
+        callbacks.append(lgb.early_stopping(tuning.round_early_stop, verbose=False))
+
+    model = lgb.LGBMRegressor(**params)
+    model.fit(X_train, y_train, eval_set=[(X_valid, y_valid)], callbacks=callbacks, **fit_kwargs)
+    best_rounds = int(model.best_iteration_ or params['n_estimators'])
+    trial.set_user_attr('best_iteration', best_rounds)
+
+    score = skmetrics.mean_absolute_error(np.expm1(y_valid), np.expm1(model.predict(X_valid)))
+    if tuning.refit == REFIT_CONTINUE:
+        _keep_if_best(trial, trial_dir, score, lambda path: model.booster_.save_model(path, num_iteration=best_rounds), '.txt')
+    return score
+
+
+def cv_objective(model_name, trial, cv, tuning, n_jobs=-1, trial_dir=None):
+    params = SEARCH_SPACES[model_name](trial)
+    oof, score, best_rounds = cv_predict(model_name, cv, params, tuning, n_jobs, trial)
+    trial.set_user_attr('best_iteration', best_rounds)
+    _keep_if_best(trial, trial_dir, score, lambda path: np.save(path, oof), '.npy', attr='oof_path')
+    return score
+
+
+OBJECTIVES = {'XGBoost': xgb_objective, 'LightGBM': lgb_objective}
+FINISHED_STATES = ('COMPLETE', 'PRUNED')  # optuna.trial.TrialState 이름
+
+
+def _stop_if_requested(study, trial):
+    # 부모 프로세스가 정체 조기 종료를 요청하면 워커도 탐색을 멈춤
+    if study.user_attrs.get('stop_requested'):
+        study.stop()
+
+
+def _objective_for(model_name, data):
+    if isinstance(data, TimeSeriesCV):
+        return lambda trial, cv, tuning, n_jobs, trial_dir: cv_objective(model_name, trial, cv, tuning, n_jobs, trial_dir)
+    return OBJECTIVES[model_name]
+
+
+def _study_worker(model_name, study_name, storage_spec, tuning, data, trials, n_jobs, trial_dir=None):
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = optuna.load_study(study_name=study_name, storage=make_storage(storage_spec),
+                              pruner=make_pruner(tuning.pruner, tuning.cv_folds))
+    objective = _objective_for(model_name, data)
+    study.optimize(lambda t: objective(t, data, tuning, n_jobs, trial_dir), n_trials=trials, callbacks=[_stop_if_requested])
+
+
+def tune(model_name, data, trials, early_stop_rounds, progress=None, tuning=None, n_jobs=-1):
+    tuning = tuning or TuningConfig()
+    objective = _objective_for(model_name, data)
+    # trial 결과물(이어 학습용 부스터, OOF 예측) 임시 보관 폴더
+    keeps_files = tuning.refit == REFIT_CONTINUE or isinstance(data, TimeSeriesCV)
+    trial_dir = tempfile.mkdtemp(prefix='atd_trials_') if keeps_files else None
+    _emit(progress, type='study_start', model=model_name, n_trials=trials, message=f"[{model_name}] Optuna 튜닝 시작")
+
+    if tuning.n_workers == 1:
+        study = optuna.create_study(direction='minimize', pruner=make_pruner(tuning.pruner, tuning.cv_folds),
+                                    storage=make_storage(tuning.storage),
+                                    study_name=f"{model_name}-{uuid.uuid4().hex[:8]}" if tuning.storage else None)
+        if trial_dir:
+            study.set_user_attr('trial_dir', trial_dir)
+        callback = OptunaPlateauCallback(trials, early_stop_rounds, model_name, progress)
+
+        def run_trial(t):
+            with trace.span(f"{model_name} trial", rows=_train_rows(data), trial=t.number):
+                return objective(t, data, tuning, n_jobs, trial_dir)
+
+        study.optimize(run_trial, n_trials=trials, callbacks=[callback])
+        return study
+
+    # 병렬 모드: 워커 프로세스들이 같은 스토리지에 trial을 기록하고, 부모는 스토리지를 폴링해 진행 상황을 집계
+    journal_dir = None if tuning.storage else tempfile.mkdtemp(prefix='atd_optuna_')
+    storage_spec = tuning.storage or os.path.join(journal_dir, 'journal.log')
+    study_name = f"{model_name}-{uuid.uuid4().hex[:8]}"
+    study = optuna.create_study(direction='minimize', storage=make_storage(storage_spec), study_name=study_name)
+    if trial_dir:
+        study.set_user_attr('trial_dir', trial_dir)
+    callback = OptunaPlateauCallback(trials, early_stop_rounds, model_name, progress,
+                                     on_stop=lambda s: s.set_user_attr('stop_requested', True))
+    threads = max(1, available_cores() // tuning.n_workers) if n_jobs == -1 else max(1, n_jobs // tuning.n_workers)
+
+    seen = set()
+    pool = ProcessPoolExecutor(tuning.n_workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        # 전체 trial 예산을 워커별로 정확히 나눠 배정
+        budgets = [trials // tuning.n_workers + (i < trials % tuning.n_workers) for i in range(tuning.n_workers)]
+        futures = [pool.submit(_study_worker, model_name, study_name, storage_spec, tuning, data, budget, threads, trial_dir)
+                   for budget in budgets if budget > 0]
+        finished_states = [optuna.trial.TrialState[name] for name in FINISHED_STATES]
+        while True:
+            all_done = all(f.done() for f in futures)
+            finished = study.get_trials(deepcopy=False, states=finished_states)
+            for trial in sorted(finished, key=lambda t: t.datetime_complete):
+                if trial.number not in seen:
+                    seen.add(trial.number)
+                    # 워커 프로세스에서 끝난 trial은 시작/종료 시각으로만 계측 기록
+                    trace.record(f"{model_name} trial", trial.datetime_start, trial.datetime_complete,
+                                 rows=_train_rows(data), trial=trial.number)
+                    callback(study, trial)
+            if all_done:
+                break
+            time.sleep(0.5)
+        for f in futures:
+            f.result()
+    except BaseException:
+        # 진행 콜백이 중단을 요청하면 (학습 작업 취소 등) 워커들은 진행 중인 trial까지만 하고 멈춤
+        # -> 남은 trial 예산을 기다리지 않고 바로 빠져나감
+        study.set_user_attr('stop_requested', True)
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+
+    if journal_dir:
+        # 임시 저널은 메모리 study로 옮기고 정리
+        in_memory = optuna.create_study(direction='minimize')
+        in_memory.add_trials(study.get_trials(deepcopy=False))
+        for key, value in study.user_attrs.items():
+            in_memory.set_user_attr(key, value)
+        shutil.rmtree(journal_dir, ignore_errors=True)
+        study = in_memory
+    return study
+
+
+def _train_rows(data):
+    return len(data.X) if isinstance(data, TimeSeriesCV) else len(data[0])
+
+
+def fit_xgb(best_params, X, y, n_jobs=-1):
+    model = xgb.XGBRegressor(**best_params, objective='reg:squarederror', random_state=42, n_jobs=n_jobs)
+    model.fit(X, y)
+    return model
+
+
+def fit_lgb(best_params, X, y, n_jobs=-1):
+    model = lgb.LGBMRegressor(**best_params, objective='regression', random_state=42, n_jobs=n_jobs, verbose=-1)
+    model.fit(X, y)
+    return model
+
+
+def continue_xgb(best_params, booster_path, X, y, extra_rounds, n_jobs=-1):
+    params = dict(best_params, n_estimators=extra_rounds)
+    model = xgb.XGBRegressor(**params, objective='reg:squarederror', random_state=42, n_jobs=n_jobs)
+    model.fit(X, y, xgb_model=booster_path)
+    return model
+
+
+def continue_lgb(best_params, booster_path, X, y, extra_rounds, n_jobs=-1):
+    params = dict(best_params, n_estimators=extra_rounds)
+    model = lgb.LGBMRegressor(**params, objective='regression', random_state=42, n_jobs=n_jobs, verbose=-1)
+    model.fit(X, y, init_model=booster_path)
+    return model
+
+
+REFITS = {'XGBoost': fit_xgb, 'LightGBM': fit_lgb}
+CONTINUES = {'XGBoost': continue_xgb, 'LightGBM': continue_lgb}
+
+
+def refit_best(model_name, study, data, X_full, y_full, refit=REFIT_FULL, n_jobs=-1):
+    params = dict(study.best_params)
+    attrs = study.best_trial.user_attrs
+
+    if refit == REFIT_CONTINUE and 'booster_path' in attrs:
+        # 학습 구간으로 튜닝된 부스터에 검증 구간 행만큼의 라운드를 이어서 학습 (데이터 비율만큼 추가)
+        X_train, _, X_valid, y_valid = data
+        extra_rounds = max(1, round(attrs['best_iteration'] * len(X_valid) / len(X_train)))
+        return CONTINUES[model_name](params, attrs['booster_path'], X_valid, y_valid, extra_rounds, n_jobs)
+
+    if refit in (REFIT_BEST_ROUNDS, REFIT_CONTINUE) and 'best_iteration' in attrs:
+        params['n_estimators'] = attrs['best_iteration']
+    return REFITS[model_name](params, X_full, y_full, n_jobs)
+
+
+def available_cores():
+    # 이 프로세스가 쓸 수 있는 코어 수 (학습 작업 큐 워커처럼 CPU affinity로 코어 일부만 받은 경우 그 범위)
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def partition_cores(n_parts):
+    total = available_cores()
+    return [max(1, total // n_parts + (i < total % n_parts)) for i in range(n_parts)]
+
+
+def fit_leg(model_name, data, X_full, y_full, trials, early_stop_rounds, progress=None, tuning=None, n_jobs=-1):
+    # 베이스 모델 한 갈래: 튜닝 -> 전체 학습 데이터로 재학습 -> (model, OOF 예측 또는 None)
+    tuning = tuning or TuningConfig()
+    with trace.span(f"tune {model_name}", rows=_train_rows(data), trials=trials):
+        study = tune(model_name, data, trials, early_stop_rounds, progress, tuning, n_jobs)
+    with trace.span(f"refit {model_name}", rows=len(X_full), refit=tuning.refit):
+        model = refit_best(model_name, study, data, X_full, y_full, tuning.refit, n_jobs)
+
+    oof = None
+    if isinstance(data, TimeSeriesCV):
+        oof_path = study.best_trial.user_attrs.get('oof_path')
+        if oof_path:
+            oof = np.load(oof_path)
+        else:
+            oof, _, _ = cv_predict(model_name, data, study.best_params, tuning, n_jobs)
+
+    # trial 결과물 임시 폴더 정리
+    if study.user_attrs.get('trial_dir'):
+        shutil.rmtree(study.user_attrs['trial_dir'], ignore_errors=True)
+    return model, oof
+
+
+class _LegStopped(Exception):
+    # 스태킹 갈래 중단 신호 (run_stacking_legs 안에서만 쓰임)
+    pass
+
+
+def run_stacking_legs(fit, progress=None):
+    # XGBoost / LightGBM 두 갈래를 코어를 나눠 동시에 실행 (부스터 학습은 GIL을 놓으므로 스레드로 충분)
+    #  - fit(model_name, leg_progress, n_jobs) -> 갈래 결과, REFITS 순서(XGBoost, LightGBM)로 반환
+    #    (메모리 학습: fit_stacking_legs / out-of-core 학습: atd_outofcore.train_out_of_core)
+    # 진행 이벤트는 큐에 모았다가 호출한 스레드에서 전달 (Streamlit 위젯은 스크립트 스레드에서만 갱신 가능)
+    # 호출한 쪽의 progress가 예외를 내면 (학습 작업 취소 등) 중단 플래그를 세움
+    # -> 각 갈래는 다음 trial 이벤트에서 멈춤 (study.optimize 밖으로 나가 남은 trial / 재학습을 건너뜀)
+    events = queue.Queue()
+    stop = threading.Event()
+    names = list(REFITS)
+
+    def leg_progress(event):
+        if stop.is_set():
+            raise _LegStopped()
+        if progress is not None:
+            events.put(event)
+
+    pool = ThreadPoolExecutor(len(names))
+    try:
+        # 갈래마다 컨텍스트 사본에서 실행 -> 활성 Tracer / 부모 구간이 스레드로 이어짐
+        futures = [pool.submit(contextvars.copy_context().run, fit, name, leg_progress, jobs)
+                   for name, jobs in zip(names, partition_cores(len(names)))]
+        while True:
+            all_done = all(f.done() for f in futures)
+            try:
+                while True:
+                    _emit(progress, **events.get(timeout=0.2))
+            except queue.Empty:
+                pass
+            if all_done:
+                break
+    except BaseException:
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+    return [f.result() for f in futures]
+
+
+def fit_stacking_legs(data, X_full, y_full, trials, early_stop_rounds, progress=None, tuning=None):
+    def fit(model_name, leg_progress, n_jobs):
+        return fit_leg(model_name, data, X_full, y_full, trials, early_stop_rounds, leg_progress, tuning, n_jobs)
+
+    (xgb_best, xgb_oof), (lgb_best, lgb_oof) = run_stacking_legs(fit, progress)
+    return xgb_best, lgb_best, xgb_oof, lgb_oof
+
+
+# ==========================================
+# 6. 모델 아티팩트 (예측 파이프라인 + 학습 설정 일체)
+# ==========================================
+class ModelArtifact:
+    # data_hash / config: 모델 레지스트리에서 버전 키(데이터 + 학습 설정 해시)를 만들 때 사용
+    def __init__(self, xgb_model, meta_model, features, mode, model_name, lgb_model=None,
+                 filter_spec=None, split_mode=SPLIT_AUTO, train_years=(), test_years=(), metrics=None,
+                 data_hash=None, config=None, schema=None):
+        self.xgb_model = xgb_model
+        self.lgb_model = lgb_model
+        self.meta_model = meta_model
+        self.features = list(features)
+        self.mode = mode
+        self.model_name = model_name
+        self.filter_spec = filter_spec or make_filter_spec(remove_outliers=False)
+        self.split_mode = split_mode
+        self.train_years = [int(y) for y in train_years]
+        self.test_years = [int(y) for y in test_years]
+        self.metrics = metrics or {}
+        self.data_hash = data_hash
+        self.config = config or {}
+        self.schema = schema  # 입력 변수 스키마 (feature_profile)
+        self.model_id = None  # 레지스트리 등록 후 채워짐
+
+    def predict_log(self, X):
+        X = X[self.features]
+        xgb_pred = self.xgb_model.predict(X)
+        if self.meta_model is None:
+            return xgb_pred
+        lgb_pred = self.lgb_model.predict(X)
+        return self.meta_model.predict(pd.DataFrame({'XGB': xgb_pred, 'LGBM': lgb_pred}))
+
+    def predict(self, X):
+        # 분 단위 예측값 ('물리적 최소 지상 이동시간' 이하로는 예측하지 않음)
+        preds = np.expm1(self.predict_log(X))
+        if 'Physical_Min_Taxi' in X.columns:
+            preds = np.maximum(preds, X['Physical_Min_Taxi'].values)
+        return preds
+
+    def predict_log_matrix(self, X):
+        # self.features 순서로 정렬된 2차원 배열을 DataFrame 생성 없이 한 번에 예측 (부스터당 한 번 호출, 로그 공간)
+        X = np.asarray(X, dtype=np.float64)
+        xgb_pred = self.xgb_model.get_booster().inplace_predict(X)
+        if self.meta_model is None:
+            return xgb_pred
+        lgb_booster = getattr(self.lgb_model, 'booster_', self.lgb_model)
+        lgb_pred = lgb_booster.predict(X)
+        coef = self.meta_model.coef_
+        return self.meta_model.intercept_ + coef[0] * xgb_pred + coef[1] * lgb_pred
+
+    def predict_matrix(self, X):
+        # 분 단위 예측 (실시간 서빙용) + Physical_Min_Taxi 하한
+        X = np.asarray(X, dtype=np.float64)
+        preds = np.expm1(self.predict_log_matrix(X))
+        if 'Physical_Min_Taxi' in self.features:
+            preds = np.fmax(preds, X[:, self.features.index('Physical_Min_Taxi')])
+        return preds
+
+    def save(self, path):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
+
+
+class TrainingResult:
+    def __init__(self, artifact, metrics, results_df, y_test, y_pred, X_test):
+        self.artifact = artifact
+        self.metrics = metrics
+        self.results_df = results_df
+        self.y_test = y_test
+        self.y_pred = y_pred
+        self.X_test = X_test
+
+
+def dataset_fingerprint(df):
+    # 학습에 사용한 데이터 내용 해시 (값과 행 순서가 같으면 같은 해시)
+    return hashlib.sha1(pd.util.hash_pandas_object(df, index=False).values.tobytes()).hexdigest()
+
+
+def yearly_report(results_df):
+    summary_list = []
+    for year in sorted(results_df['Year'].unique()):
+        y_sub = results_df[results_df['Year'] == year]
+        summary_list.append({
+            'Year': f"{int(year)}",
+            'Count': f"{len(y_sub):,} rows",
+            'MAE (Min)': round(skmetrics.mean_absolute_error(y_sub['Actual'], y_sub['Pred']), 2),
+            'RMSE (Min)': round(np.sqrt(skmetrics.mean_squared_error(y_sub['Actual'], y_sub['Pred'])), 2),
+            'R2 Score': round(skmetrics.r2_score(y_sub['Actual'], y_sub['Pred']), 4)
+        })
+    return pd.DataFrame(summary_list)
+
+
+# ==========================================
+# 7. 학습 파이프라인
+# ==========================================
+def run_training(df, features, mode=MODE_SINGLE, trials=30, early_stop_rounds=10, split_mode=SPLIT_AUTO,
+                 train_years=(), test_years=(), progress=None, filter_spec=None, tuning=None):
+    with trace.span('run_training', rows=len(df), mode=mode, trials=trials):
+        return _run_training(df, features, mode, trials, early_stop_rounds, split_mode,
+                             train_years, test_years, progress, filter_spec, tuning)
+
+
+def _run_training(df, features, mode, trials, early_stop_rounds, split_mode, train_years, test_years,
+                  progress, filter_spec, tuning):
+    started = time.perf_counter()
+    tuning = tuning or TuningConfig()
+    with trace.span('split', rows=len(df), split_mode=split_mode):
+        X_train_full, X_test, y_train_full, y_test = split_by_year(df, features, split_mode, train_years, test_years)
+        if tuning.cv_folds > 1:
+            # 시간 순 확장 윈도우 CV: 모든 trial이 같은 fold 행렬을 재사용하고 메타 모델은 OOF 예측으로 학습
+            order_col = 'RAM_Datetime' if 'RAM_Datetime' in df.columns else 'Year'
+            data = TimeSeriesCV(X_train_full, y_train_full, df.loc[X_train_full.index, order_col].values, tuning.cv_folds)
+        else:
+            train_pos, valid_pos = tail_split(np.arange(len(X_train_full)))
+            data = (take_rows(X_train_full, train_pos), take_rows(y_train_full, train_pos),
+                    take_rows(X_train_full, valid_pos), take_rows(y_train_full, valid_pos))
+
+    lgb_best = None
+    meta_model = None
+    final_model_name = "XGBoost (Single)"
+
+    if mode != MODE_STACKING:
+        xgb_best, _ = fit_leg("XGBoost", data, X_train_full, y_train_full, trials, early_stop_rounds, progress, tuning)
+
+    else:
+        # 두 베이스 모델을 동시에 학습한 뒤 메타 모델 적합
+        xgb_best, lgb_best, xgb_oof, lgb_oof = fit_stacking_legs(data, X_train_full, y_train_full, trials, early_stop_rounds, progress, tuning)
+
+        _emit(progress, type='stage', stage='meta', message="🎉 메타 모델(Stacking) 가중치 조율 중...")
+        meta_model = sklinear.LinearRegression(positive=True)
+        with trace.span('meta fit') as span:
+            if isinstance(data, TimeSeriesCV):
+                meta_model.fit(pd.DataFrame({'XGB': xgb_oof, 'LGBM': lgb_oof}), data.oof_target)
+                span.rows = len(xgb_oof)
+            else:
+                _, _, X_valid, y_valid = data
+                meta_model.fit(pd.DataFrame({'XGB': xgb_best.predict(X_valid), 'LGBM': lgb_best.predict(X_valid)}), y_valid)
+                span.rows = len(X_valid)
+        final_model_name = "Stacking (Ensemble)"
+
+    config = {'trials': int(trials), 'early_stop_rounds': int(early_stop_rounds), 'tuning': vars(tuning)}
+    artifact = ModelArtifact(xgb_best, meta_model, features, mode, final_model_name, lgb_model=lgb_best,
+                             filter_spec=filter_spec, split_mode=split_mode,
+                             train_years=train_years, test_years=test_years,
+                             data_hash=dataset_fingerprint(df), config=config,
+                             schema=feature_profile(X_train_full))
+
+    elapsed = time.perf_counter() - started
+    metrics, results_df, y_test_real, final_preds = evaluate(artifact, df, X_test, y_test)
+    metrics.update({
+        'Train_Rows': int(len(X_train_full)),
+        'Train_Seconds': round(elapsed, 3),
+        'Rows_Per_Sec': round(len(X_train_full) / elapsed, 1) if elapsed > 0 else None,
+    })
+
+    artifact.metrics = metrics
+    return TrainingResult(artifact, metrics, results_df, y_test_real, final_preds, X_test)
+
+
+def evaluate(artifact, df, X_test, y_test):
+    with trace.span('predict', rows=len(X_test)):
+        final_preds = artifact.predict(X_test)
+    y_test_real = np.expm1(y_test).values
+    metrics, results_df = score_predictions(artifact, df.loc[X_test.index, 'Year'].values, y_test_real, final_preds)
+    return metrics, results_df, y_test_real, final_preds
+
+
+def score_predictions(artifact, years, y_true, y_pred):
+    # 분 단위 실제값/예측값 -> (성능 지표, 연도별 리포트용 DataFrame)
+    # 🌟 연도별 성능 리포트용 DataFrame 생성
+    results_df = pd.DataFrame({
+        'Year': years,
+        'Actual': y_true,
+        'Pred': y_pred
+    })
+
+    metrics = {
+        'Model': artifact.model_name,
+        'RMSE': float(np.sqrt(skmetrics.mean_squared_error(y_true, y_pred))),
+        'MAE': float(skmetrics.mean_absolute_error(y_true, y_pred)),
+        'R2': float(skmetrics.r2_score(y_true, y_pred)),
+        'Test_Rows': int(len(y_true)),
+        'Yearly': yearly_report(results_df).to_dict(orient='records')
+    }
+
+    if artifact.meta_model is not None:
+        metrics['XGB_W'] = float(artifact.meta_model.coef_[0])
+        metrics['LGB_W'] = float(artifact.meta_model.coef_[1])
+
+    return metrics, results_df
+
+
+def evaluate_artifact(artifact, current_df):
+    # 저장된 모델을 학습 당시의 필터/연도 분할 그대로 현재 데이터에 적용해 재평가
+    # current_df: artifact.filter_spec이 이미 적용된 데이터 (FrameSource/DatasetSource.read)
+    _, X_test, _, y_test = split_by_year(current_df, artifact.features, artifact.split_mode,
+                                         artifact.train_years, artifact.test_years)
+    metrics, results_df, y_test_real, final_preds = evaluate(artifact, current_df, X_test, y_test)
+    return TrainingResult(artifact, dict(artifact.metrics, **metrics), results_df, y_test_real, final_preds, X_test)
+
+
+def train_from_parquet(path, filter_spec=None, split_mode=SPLIT_AUTO, train_years=None, test_years=(),
+                       features=None, mode=MODE_SINGLE, trials=30, early_stop_rounds=10, progress=None, tuning=None,
+                       compact=False, out_of_core=None):
+    # path: 마스터 parquet 파일 또는 atd_ingest 파티션 데이터셋 폴더 (필터/연도/컬럼을 읽기 단계에서 적용)
+    # out_of_core: 'quantile' / 'external' 이면 전체를 메모리에 올리지 않고 배치 스트리밍으로 학습 (atd_outofcore)
+    if out_of_core:
+        from atd_outofcore import train_out_of_core
+        return train_out_of_core(path, filter_spec, split_mode, train_years, test_years, features, mode, trials,
+                                 early_stop_rounds, progress, tuning, external_memory=out_of_core == OOC_EXTERNAL)
+
+    from atd_ingest import DatasetSource, FrameSource
+    source = DatasetSource(path, compact) if os.path.isdir(path) else FrameSource(load_master(path, compact)[0])
+    filter_spec = filter_spec or make_filter_spec()
+
+    if train_years is None:
+        train_years = sorted(int(y) for y in source.distinct('Year'))
+    if features is None:
+        features = trainable_features(source.columns)
+    with trace.span('read', source=type(source).__name__) as span:
+        current_df = source.read(filter_spec, columns=features, years=split_years(split_mode, train_years, test_years))
+        span.rows = len(current_df)
+
+    return run_training(current_df, features, mode, trials, early_stop_rounds, split_mode,
+                        train_years, test_years, progress, filter_spec, tuning)
+
+
+# ==========================================
+# 8. CLI (배치 재학습용)
+# ==========================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ATD-RAM 예측 모델 학습 엔진 (Headless)")
+    parser.add_argument('--data', required=True, help="ATD_RAM_Master.parquet 경로 또는 atd_ingest 파티션 데이터셋 폴더")
+    parser.add_argument('--mode', choices=[MODE_SINGLE, MODE_STACKING], default=MODE_SINGLE)
+    parser.add_argument('--split', choices=[SPLIT_AUTO, SPLIT_HOLDOUT, SPLIT_IN_SAMPLE], default=SPLIT_AUTO)
+    parser.add_argument('--train-years', type=int, nargs='*', default=None, help="기본값: 전체 연도")
+    parser.add_argument('--test-years', type=int, nargs='*', default=[], help="--split holdout 일 때 평가 연도")
+    parser.add_argument('--features', nargs='*', default=None, help="기본값: 학습 가능한 전체 변수")
+    parser.add_argument('--trials', type=int, default=30)
+    parser.add_argument('--early-stop', type=int, default=10, help="Optuna 정체 허용 횟수 (0=끄기)")
+    parser.add_argument('--pruner', choices=[PRUNER_NONE, PRUNER_MEDIAN, PRUNER_HYPERBAND], default=PRUNER_NONE)
+    parser.add_argument('--workers', type=int, default=1, help="병렬 Optuna 워커 프로세스 수")
+    parser.add_argument('--storage', help="공유 Optuna 스토리지 (저널 파일 경로 또는 sqlite:///... URL)")
+    parser.add_argument('--round-early-stop', type=int, default=0, help="trial 내부 eval_set 조기 종료 라운드 (0=끄기)")
+    parser.add_argument('--refit', choices=[REFIT_FULL, REFIT_BEST_ROUNDS, REFIT_CONTINUE], default=REFIT_FULL,
+                        help="최종 재학습 방식 (best_rounds/continue는 --round-early-stop과 함께 사용 권장)")
+    parser.add_argument('--cv-folds', type=int, default=0, help="시간 순 확장 윈도우 CV fold 수 (0=단일 검증 구간)")
+    parser.add_argument('--filter-spec', help="필터 스펙 JSON 파일 (지정 시 아래 필터 옵션 무시)")
+    parser.add_argument('--keep-outliers', action='store_true', help="3-Sigma 극단치를 제외하지 않음")
+    parser.add_argument('--weather', nargs='*', default=[])
+    parser.add_argument('--snow-phase', nargs='*', default=[])
+    parser.add_argument('--nat', nargs='*', default=[])
+    parser.add_argument('--sts', nargs='*', default=[])
+    parser.add_argument('--out', help="모델 아티팩트 저장 경로 (.joblib)")
+    parser.add_argument('--compact', action='store_true', help="메모리 절약 모드 (category/Arrow 문자열, float32/작은 정수형 -> LightGBM 결과는 조금 달라질 수 있음)")
+    parser.add_argument('--report', help="성능 리포트 저장 경로 (.json)")
+    parser.add_argument('--register', action='store_true', help="학습된 모델을 모델 레지스트리에 등록")
+    parser.add_argument('--registry', default=None, help="모델 레지스트리 폴더 (기본값: $ATD_MODEL_REGISTRY 또는 ./model_registry)")
+    parser.add_argument('--out-of-core', choices=[OOC_QUANTILE, OOC_EXTERNAL],
+                        help="전체 데이터를 메모리에 올리지 않고 parquet 배치를 스트리밍해 학습 (--cv-folds/--workers 미지원)")
+    parser.add_argument('--trace', help="단계별 계측 결과 저장 경로 (Chrome trace JSON, chrome://tracing / Perfetto)")
+    args = parser.parse_args(argv)
+
+    if args.filter_spec:
+        with open(args.filter_spec, encoding='utf-8') as f:
+            filter_spec = json.load(f)
+    else:
+        filter_spec = make_filter_spec(not args.keep_outliers, Weather_Type=args.weather,
+                                       Snow_Phase=args.snow_phase, NAT=args.nat, STS=args.sts)
+
+    tuning = TuningConfig(args.pruner, args.workers, args.storage, args.round_early_stop, refit=args.refit,
+                          cv_folds=args.cv_folds)
+
+    tracer = trace.Tracer() if args.trace else None
+    try:
+        with trace.activate(tracer):
+            result = train_from_parquet(args.data, filter_spec, args.split, args.train_years, args.test_years,
+                                        args.features, args.mode, args.trials, args.early_stop, print_progress, tuning,
+                                        args.compact, args.out_of_core)
+    except TrainingError as e:
+        parser.exit(1, f"{e}\n")
+    finally:
+        if tracer is not None:
+            with open(args.trace, 'w', encoding='utf-8') as f:
+                f.write(tracer.chrome_trace())
+
+    if args.out:
+        result.artifact.save(args.out)
+    if args.register:
+        from atd_registry import ModelRegistry
+        model_id = ModelRegistry(args.registry).register(result.artifact)
+        print(f"registered model: {model_id}", flush=True)
+    report = json.dumps(result.metrics, ensure_ascii=False, indent=2)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            f.write(report)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
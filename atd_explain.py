@@ -0,0 +1,202 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import atd_lazy as lazy
+import atd_trace as trace
+from atd_engine import partition_cores
+
+xgb = lazy.module('xgboost')
+
+# ==========================================
+# ATD-RAM 설명(SHAP) 엔진
+#  - shap.TreeExplainer 대신 부스터 내장 트리 SHAP 사용
+#      XGBoost : Booster.predict(pred_contribs=True)
+#      LightGBM: Booster.predict(pred_contrib=True)
+#  - 평가 데이터 전체를 행 배치로 나눠 스레드 병렬 계산 -> float32 배열로 보관
+#  - 스태킹 모드는 두 베이스 모델의 기여도를 메타 가중치로 합성해 앙상블 전체를 설명 (EnsemblePredictor)
+#  - 모델 ID(+평가 데이터 해시) 기준 LRU 캐시: 요약/벌떼/개별 항공편 그림은 모두 캐시에서 그림
+#      요약(평균 |SHAP|)은 전체 행, 벌떼 그림은 고정 시드로 뽑은 PLOT_ROWS개 행만 그림 (점 수에 비례해 느려짐)
+# ==========================================
+
+BATCH_ROWS = 20000
+PLOT_ROWS = 10000
+
+
+class Contributions:
+    # 한 모델의 기여도 (로그 공간): values (n, f), base (n,) / 예측값 = values.sum(1) + base
+    def __init__(self, name, values, base, data, features, index=None):
+        self.name = name
+        self.values = values
+        self.base = base
+        self.data = data
+        self.features = list(features)
+        self.index = index if index is not None else pd.RangeIndex(len(values))
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def predictions(self):
+        return self.values.sum(axis=1, dtype=np.float64) + self.base
+
+    def importance(self):
+        # 변수별 평균 |SHAP| (큰 순서)
+        return pd.Series(np.abs(self.values).mean(axis=0), index=self.features).sort_values(ascending=False)
+
+    def sample_rows(self, max_rows=PLOT_ROWS, seed=0):
+        # 그림용 행 번호 (고정 시드 -> 다시 그려도 같은 점, 원래 순서 유지)
+        if len(self) <= max_rows:
+            return slice(None)
+        return np.sort(np.random.default_rng(seed).choice(len(self), max_rows, replace=False))
+
+    def to_shap(self, rows=slice(None)):
+        import shap
+        return shap.Explanation(values=self.values[rows], base_values=self.base[rows], data=self.data[rows],
+                                feature_names=self.features)
+
+
+def _batched(predict_fn, X, n_out, batch_rows=BATCH_ROWS, n_workers=None):
+    # 행 배치를 워커 스레드에 나눠 계산하고 미리 잡아둔 float32 배열에 바로 채움
+    # predict_fn(part, worker, n_threads): 부스터 호출은 GIL을 풀어주므로 스레드로 충분
+    out = np.empty((len(X), n_out), dtype=np.float32)
+    starts = list(range(0, len(X), batch_rows))
+    n_workers = max(1, min(len(starts), n_workers or os.cpu_count() or 1))
+    threads = partition_cores(n_workers)
+
+    def work(worker):
+        for start in starts[worker::n_workers]:
+            out[start:start + batch_rows] = predict_fn(X[start:start + batch_rows], worker, threads[worker])
+
+    with ThreadPoolExecutor(n_workers) as pool:
+        list(pool.map(work, range(n_workers)))
+    return out
+
+
+def xgb_contributions(model, X, batch_rows=BATCH_ROWS, n_workers=None):
+    # 워커마다 부스터 사본을 두고 스레드 수를 나눠 설정 (같은 부스터에 set_param 경합 방지)
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    boosters = {}
+
+    def predict(part, worker, n_threads):
+        if worker not in boosters:
+            boosters[worker] = booster.copy()
+            boosters[worker].set_param({'nthread': n_threads})
+        return boosters[worker].predict(xgb.DMatrix(part), pred_contribs=True, validate_features=False)
+
+    return _batched(predict, X, X.shape[1] + 1, batch_rows, n_workers)
+
+
+def lgb_contributions(model, X, batch_rows=BATCH_ROWS, n_workers=None):
+    booster = getattr(model, 'booster_', model)
+
+    def predict(part, worker, n_threads):
+        return booster.predict(part, pred_contrib=True, num_threads=n_threads)
+
+    return _batched(predict, X, X.shape[1] + 1, batch_rows, n_workers)
+
+
+class EnsemblePredictor:
+    # 배포되는 파이프라인 전체를 하나의 예측기로: XGBoost 단일 또는 XGBoost + LightGBM + 양수 선형 메타 가중치
+    #  - predict / predict_log: 부스터당 한 번의 배치 호출
+    #  - contributions: 두 베이스 모델의 트리 SHAP을 메타 가중치로 합성
+    #      앙상블 기여도 = w_xgb * SHAP_xgb + w_lgb * SHAP_lgb,  기준값 = 절편 + w_xgb * base_xgb + w_lgb * base_lgb
+    #    (로그 공간 값이므로 Physical_Min_Taxi 하한 적용 전 예측을 정확히 분해함)
+    def __init__(self, artifact):
+        self.artifact = artifact
+        self.features = artifact.features
+        self.name = artifact.model_name
+        self.legs = [('XGBoost', xgb_contributions, artifact.xgb_model)]
+        if artifact.meta_model is not None:
+            self.legs.append(('LightGBM', lgb_contributions, artifact.lgb_model))
+            self.weights = np.asarray(artifact.meta_model.coef_, dtype=np.float64)
+            self.intercept = float(artifact.meta_model.intercept_)
+        else:
+            self.weights = np.ones(1)
+            self.intercept = 0.0
+
+    def matrix(self, X):
+        # DataFrame(변수 이름 기준) 또는 이미 정렬된 2차원 배열 -> float64 배열
+        if isinstance(X, pd.DataFrame):
+            X = X[self.features].to_numpy(dtype=np.float64, na_value=np.nan)
+        return np.ascontiguousarray(np.asarray(X, dtype=np.float64).reshape(-1, len(self.features)))
+
+    def predict_log(self, X):
+        return self.artifact.predict_log_matrix(self.matrix(X))
+
+    def predict(self, X):
+        with trace.span('predict', rows=len(X)):
+            return self.artifact.predict_matrix(self.matrix(X))
+
+    def contributions(self, X, batch_rows=BATCH_ROWS, n_workers=None):
+        # {앙상블: Contributions, 'XGBoost': ..., 'LightGBM': ...} (단일 모드는 XGBoost 하나)
+        index = X.index if isinstance(X, pd.DataFrame) else None
+        data = self.matrix(X)
+        results = OrderedDict()
+        for name, contributions, model in self.legs:
+            with trace.span(f"shap {name}", rows=len(data)):
+                raw = contributions(model, data, batch_rows, n_workers)
+            results[name] = Contributions(name, raw[:, :-1], raw[:, -1], data, self.features, index)
+
+        if len(self.legs) > 1:
+            legs = list(results.values())
+            values = sum(np.float32(w) * leg.values for w, leg in zip(self.weights, legs))
+            base = self.intercept + sum(w * leg.base.astype(np.float64) for w, leg in zip(self.weights, legs))
+            ensemble = Contributions(self.name, values, base, data, self.features, index)
+            results = OrderedDict([(self.name, ensemble)] + list(results.items()))
+        return results
+
+
+class ContributionCache:
+    # 모델(+평가 데이터)별 기여도 LRU 캐시 -> 재실행/인덱스 변경 시 재계산 없음
+    def __init__(self, max_models=4):
+        self.max_models = max_models
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, artifact, X):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        results = EnsemblePredictor(artifact).contributions(X)
+        with self._lock:
+            self._cache[key] = results
+            while len(self._cache) > self.max_models:
+                self._cache.popitem(last=False)
+        return results
+
+
+# ==========================================
+# 그림 (캐시된 기여도 -> matplotlib Figure)
+# ==========================================
+def summary_figure(contrib, max_display=20):
+    import matplotlib.pyplot as plt
+    import shap
+    fig = plt.figure(figsize=(8, 6))
+    shap.plots.bar(contrib.to_shap(), max_display=max_display, show=False)
+    plt.title("Overall Feature Importance", fontsize=12)
+    return fig
+
+
+def beeswarm_figure(contrib, max_display=20, max_rows=PLOT_ROWS):
+    import matplotlib.pyplot as plt
+    import shap
+    fig = plt.figure(figsize=(8, 6))
+    shap.plots.beeswarm(contrib.to_shap(contrib.sample_rows(max_rows)), max_display=max_display, show=False)
+    plt.title("Impact on Delay (+: Increase, -: Decrease)", fontsize=12)
+    return fig
+
+
+def waterfall_figure(contrib, row, max_display=12):
+    import matplotlib.pyplot as plt
+    import shap
+    fig = plt.figure(figsize=(10, 5))
+    shap.plots.waterfall(contrib.to_shap(row), max_display=max_display, show=False)
+    plt.title(f"Why was Flight #{row} delayed?", fontsize=12)
+    return fig
@@ -0,0 +1,180 @@
+import argparse
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+
+import atd_lazy as lazy
+
+neighbors = lazy.module('sklearn.neighbors')
+
+# ==========================================
+# RKSI 공간 인덱스 (주기장 / 활주로 시단)
+#  - 주기장 좌표(rksi_stands_zoned.csv) + 활주로 시단 좌표를 BallTree(haversine)로 색인
+#  - 주기장 x 활주로 전 조합의 직선(haversine) 거리 / 지상 이동 경로 거리 행렬을 한 번에 계산해 캐시
+#      경로 거리: 유도로 그래프(atd_taxiway, 유도로 파일이 있을 때)의 최단 경로 거리
+#               없으면 유도로가 활주로와 평행/직각으로 놓인 점을 이용해 활주로 축 기준 좌표계의 맨해튼 거리로 근사
+#  - enrich(): 항공편 배치에 (주기장, 출발 활주로) 기준 거리 / 최소 지상 이동시간(Physical_Min_Taxi) 추가
+# ==========================================
+
+STANDS_CSV = 'rksi_stands_zoned.csv'
+TAXIWAY_FILE = os.environ.get('ATD_TAXIWAY_GRAPH', 'rksi_taxiways.geojson')  # 유도로 중심선 (atd_taxiway)
+EARTH_RADIUS_M = 6371008.8
+TAXI_SPEED_KT = 25.0  # 방해 없는 직선 유도로 주행 속도 가정
+STAND_COL = 'Stand_ID'
+RUNWAY_COL = 'Dep_RWY'
+
+# 활주로 시단 좌표 (인천공항 4활주로 시스템 반영)
+# L/R은 방향(Left/Right), 숫자는 방위각입니다.
+RUNWAY_ENDS = {
+    # [제3, 4 활주로 / 서쪽]
+    '33L': (37.4541, 126.4608), '15R': (37.4816, 126.4363), # 서로 반대편
+    '33R': (37.4563, 126.4647), '15L': (37.4838, 126.4402), # 서로 반대편
+
+    # [제1, 2 활주로 / 동쪽]
+    '34L': (37.4411, 126.4377), '16R': (37.4680, 126.4130), # 서로 반대편
+    '34R': (37.4433, 126.4416), '16L': (37.4700, 126.4170)  # 서로 반대편
+}
+RUNWAY_PAIRS = [('33L', '15R'), ('33R', '15L'), ('34L', '16R'), ('34R', '16L')]
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    # 대권 거리 (m), 배열 브로드캐스팅 지원
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def load_stands(path=STANDS_CSV):
+    stands = pd.read_csv(path, dtype={STAND_COL: str})
+    return stands.dropna(subset=['Lat', 'Lon']).drop_duplicates(STAND_COL).reset_index(drop=True)
+
+
+class AirportGeometry:
+    def __init__(self, stands, runways=None, graph=None):
+        runways = runways or RUNWAY_ENDS
+        self.stands = stands
+        self.graph = graph
+        self.stand_ids = pd.Index(stands[STAND_COL].astype(str))
+        self.runway_names = pd.Index(list(runways))
+        self.stand_latlon = stands[['Lat', 'Lon']].to_numpy(dtype=np.float64)
+        self.runway_latlon = np.array([runways[name] for name in self.runway_names], dtype=np.float64)
+
+        self.stand_tree = neighbors.BallTree(np.radians(self.stand_latlon), metric='haversine')
+        self.runway_tree = neighbors.BallTree(np.radians(self.runway_latlon), metric='haversine')
+
+        # 주기장 x 활주로 거리 행렬 (한 번의 브로드캐스팅 계산)
+        s, r = self.stand_latlon[:, None, :], self.runway_latlon[None, :, :]
+        self.direct_m = haversine_m(s[..., 0], s[..., 1], r[..., 0], r[..., 1]).astype(np.float32)
+        su, sv = self.runway_frame(self.stand_latlon)
+        ru, rv = self.runway_frame(self.runway_latlon)
+        self.taxi_m = (np.abs(su[:, None] - ru[None, :]) + np.abs(sv[:, None] - rv[None, :])).astype(np.float32)
+        if graph is not None:
+            # 유도로 그래프 최단 경로로 교체 (그래프에서 도달 불가한 조합만 근사값 유지)
+            route = graph.route_m[graph.stand_ids.get_indexer(self.stand_ids)][:, graph.runway_names.get_indexer(self.runway_names)]
+            self.taxi_m = np.where(np.isnan(route), self.taxi_m, route).astype(np.float32)
+
+    @functools.cached_property
+    def _frame(self):
+        # 공항 중심 기준 평면 좌표(m) + 활주로 축 방향(33 -> 15 시단 방향의 평균)
+        lat0, lon0 = self.runway_latlon.mean(axis=0)
+        scale = np.array([np.radians(1) * EARTH_RADIUS_M, np.radians(1) * EARTH_RADIUS_M * np.cos(np.radians(lat0))])
+        ends = {name: i for i, name in enumerate(self.runway_names)}
+        axis = np.zeros(2)
+        for low, high in RUNWAY_PAIRS:
+            if low in ends and high in ends:
+                d = (self.runway_latlon[ends[high]] - self.runway_latlon[ends[low]]) * scale
+                axis += d / np.linalg.norm(d)
+        if not axis.any():
+            axis = np.array([1.0, 0.0])
+        return np.array([lat0, lon0]), scale, axis / np.linalg.norm(axis)
+
+    def runway_frame(self, latlon):
+        # 위경도 -> (활주로 축 방향 거리 u, 직각 방향 거리 v) [m]
+        origin, scale, axis = self._frame
+        xy = (np.asarray(latlon, dtype=np.float64) - origin) * scale
+        return xy @ axis, xy @ np.array([-axis[1], axis[0]])
+
+    def nearest_stand(self, lat, lon, k=1):
+        # 임의 좌표(예: 실시간 항공기 위치) -> 가장 가까운 주기장 ID / 거리(m)
+        points = np.radians(np.column_stack([np.atleast_1d(lat), np.atleast_1d(lon)]))
+        dist, idx = self.stand_tree.query(points, k=k)
+        return self.stand_ids.to_numpy()[idx], dist * EARTH_RADIUS_M
+
+    def nearest_runway(self, lat, lon):
+        points = np.radians(np.column_stack([np.atleast_1d(lat), np.atleast_1d(lon)]))
+        dist, idx = self.runway_tree.query(points, k=1)
+        return self.runway_names.to_numpy()[idx[:, 0]], dist[:, 0] * EARTH_RADIUS_M
+
+    def lookup(self, stand_ids, runways):
+        # (주기장, 활주로) 배열 -> 행렬 인덱스 (없는 값은 -1)
+        stand_idx = self.stand_ids.get_indexer(pd.Index(np.asarray(stand_ids)).astype(str))
+        runway_idx = self.runway_names.get_indexer(pd.Index(np.asarray(runways)).astype(str))
+        return stand_idx, runway_idx
+
+    def distances(self, stand_ids, runways):
+        # 배치 조회: (직선 거리, 경로 거리) [m], 모르는 주기장/활주로는 NaN
+        stand_idx, runway_idx = self.lookup(stand_ids, runways)
+        valid = (stand_idx >= 0) & (runway_idx >= 0)
+        direct = np.full(len(stand_idx), np.nan)
+        taxi = np.full(len(stand_idx), np.nan)
+        direct[valid] = self.direct_m[stand_idx[valid], runway_idx[valid]]
+        taxi[valid] = self.taxi_m[stand_idx[valid], runway_idx[valid]]
+        return direct, taxi
+
+    def min_taxi_minutes(self, taxi_m, speed_kt=TAXI_SPEED_KT):
+        return taxi_m / (speed_kt * 1852.0 / 60.0)
+
+    def enrich(self, flights, stand_col=STAND_COL, runway_col=RUNWAY_COL, overwrite=False):
+        # 항공편 배치에 거리 피처 추가 (Physical_Min_Taxi / Taxiway_*_Used는 이미 있으면 유지)
+        direct, taxi = self.distances(flights[stand_col], flights[runway_col])
+        out = flights.assign(Stand_RWY_Direct_Dist=direct, Stand_RWY_Taxi_Dist=taxi)
+        if overwrite or 'Physical_Min_Taxi' not in flights.columns:
+            out['Physical_Min_Taxi'] = self.min_taxi_minutes(taxi)
+        if self.graph is not None:
+            # 최단 경로가 지나는 유도로 플래그 (경로 혼잡 피처의 기반)
+            _, masks = self.graph.route(flights[stand_col], flights[runway_col])
+            flags = self.graph.taxiway_flags(masks)
+            flags.index = out.index
+            new = [c for c in flags.columns if overwrite or c not in out.columns]
+            out[new] = flags[new]
+        return out
+
+    def matrix_frame(self, which='taxi'):
+        values = self.taxi_m if which == 'taxi' else self.direct_m
+        return pd.DataFrame(values, index=self.stand_ids, columns=self.runway_names)
+
+
+@functools.lru_cache(maxsize=4)
+def _geometry(path, mtime, graph_key):
+    import atd_taxiway as taxiway
+    graph = taxiway.load_graph(graph_key[0], path) if graph_key else None
+    return AirportGeometry(load_stands(path), graph=graph)
+
+
+def load_geometry(path=STANDS_CSV, graph_path=None):
+    # 주기장 / 유도로 파일이 바뀌지 않는 한 같은 인덱스/거리 행렬 재사용 (유도로 파일이 없으면 atd_taxiway를 읽지 않음)
+    graph_path = graph_path or TAXIWAY_FILE
+    graph_key = (os.path.abspath(graph_path), os.path.getmtime(graph_path)) if os.path.exists(graph_path) else None
+    return _geometry(os.path.abspath(path), os.path.getmtime(path), graph_key)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RKSI 주기장-활주로 거리 행렬")
+    parser.add_argument('--stands', default=STANDS_CSV)
+    parser.add_argument('--graph', help="유도로 중심선 GeoJSON (기본값: $ATD_TAXIWAY_GRAPH 또는 ./rksi_taxiways.geojson)")
+    parser.add_argument('--which', choices=['taxi', 'direct'], default='taxi')
+    parser.add_argument('--out', help="거리 행렬 CSV 저장 경로 (기본값: 요약만 출력)")
+    args = parser.parse_args(argv)
+
+    geometry = load_geometry(args.stands, args.graph)
+    table = geometry.matrix_frame(args.which)
+    if args.out:
+        table.to_csv(args.out)
+    else:
+        print(table.describe().round(0).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+import argparse
+import hashlib
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+import atd_geo as geo
+import atd_trace as trace
+from atd_congestion import WINDOWS_MIN, add_congestion_features, feature_names
+from atd_engine import FILTER_COLS, ID_COLS, TARGET_COL, FilterEngine, compact_frame, outlier_threshold
+
+# ==========================================
+# ATD-RAM 증분 데이터 적재 레이어
+#  - 로컬 파티션 Parquet 데이터셋 (<root>/Year=2025/Month=1/part-0.parquet)
+#  - 일일 RAM/ATD 추출본은 해당 (Year, Month) 파티션만 다시 써서 추가 (FLT + RAM_Datetime 기준 중복 제거)
+#  - 추출본에 Stand_ID / Dep_RWY 가 있으면 적재 시점에 주기장-활주로 거리 / Physical_Min_Taxi 추가 (atd_geo)
+#  - 다시 쓰는 월 파티션의 지상 혼잡 피처는 직전 윈도우 이력까지 포함해 재계산 (atd_congestion)
+#    바로 다음 달 파티션도 앞쪽 윈도우 구간이 새 항공편을 반영하도록 다시 계산 (과거 월 보충 적재)
+#  - 컬럼은 저장된 스키마 + 추출본 컬럼의 합집합 (추출본에 없는 컬럼은 결측, 새 컬럼이 있으면 전체 파티션을 다시 씀)
+#  - 읽을 때 사이드바 필터(Weather_Type, Snow_Phase, NAT, STS, Year)와 필요한 컬럼만 pyarrow로 내려보냄
+# ==========================================
+
+DEFAULT_ROOT = os.environ.get('ATD_DATASET', 'atd_dataset')
+PARTITION_COLS = ['Year', 'Month']
+KEY_COLS = ['FLT', 'RAM_Datetime']
+REQUIRED_COLS = ID_COLS + [TARGET_COL]
+
+
+def read_extract(source):
+    # 추출본: parquet(경로 또는 업로드 파일 객체) 또는 csv
+    if isinstance(source, str) and source.lower().endswith('.csv'):
+        df = pd.read_csv(source, parse_dates=['RAM_Datetime'])
+    else:
+        df = pd.read_parquet(source)
+    missing = [c for c in REQUIRED_COLS if c not in df.columns]
+    if missing:
+        raise KeyError(f"extract is missing required columns: {missing}")
+    df['Month'] = df['RAM_Datetime'].dt.month.astype('int32')
+    df['Year'] = df['Year'].astype('int32')
+    if geo.STAND_COL in df.columns and geo.RUNWAY_COL in df.columns:
+        # 주기장/출발 활주로가 있는 추출본은 적재 시점에 거리 피처 계산 (캐시된 주기장 x 활주로 행렬 조회)
+        df = geo.load_geometry().enrich(df)
+    return df
+
+
+def open_dataset(root=DEFAULT_ROOT):
+    return ds.dataset(root, format='parquet', partitioning='hive')
+
+
+def dataset_exists(root=DEFAULT_ROOT):
+    return os.path.isdir(root) and any(name.startswith('Year=') for name in os.listdir(root))
+
+
+def _partition_expression(partitions):
+    expr = None
+    for year, month in partitions:
+        e = (pc.field('Year') == int(year)) & (pc.field('Month') == int(month))
+        expr = e if expr is None else expr | e
+    return expr
+
+
+def append_extract(source, root=DEFAULT_ROOT):
+    # 추출본이 걸치는 월 파티션만 읽어서 합치고 다시 씀 -> 나머지 과거 데이터는 건드리지 않음
+    new_df = read_extract(source)
+    partitions = new_df[PARTITION_COLS].drop_duplicates().itertuples(index=False)
+    partitions = [tuple(p) for p in partitions]
+
+    combined = new_df
+    existing_rows = 0
+    missing_columns = []
+    if dataset_exists(root):
+        dataset = open_dataset(root)
+        stored_names = dataset.schema.names
+        if not set(feature_names()) | set(new_df.columns) <= set(stored_names):
+            # 혼잡 피처 도입 전에 만든 데이터셋 / 추출본에 새 컬럼: 전체 파티션을 한 번 다시 써서 스키마를 맞춤
+            stored = DatasetSource(root).partitions()[PARTITION_COLS].itertuples(index=False)
+            partitions = sorted(set(partitions) | set(map(tuple, stored)))
+        # 저장된 컬럼이 먼저, 추출본에만 있는 컬럼은 뒤에 (추출본에 없는 저장 컬럼은 새 행에서 결측)
+        columns = list(stored_names) + [c for c in new_df.columns if c not in stored_names]
+        missing_columns = [c for c in stored_names if c not in new_df.columns and c not in feature_names()]
+        existing = dataset.to_table(filter=_partition_expression(partitions)).to_pandas()
+        existing_rows = len(existing)
+        combined = new_df.reindex(columns=columns)
+        if existing_rows:
+            combined = pd.concat([existing.reindex(columns=columns), combined], ignore_index=True)
+            combined = combined.drop_duplicates(KEY_COLS, keep='last')
+    combined = combined.sort_values('RAM_Datetime', kind='stable')
+    combined = add_congestion_features(combined, history=_history_before(root, combined['RAM_Datetime'].min()))
+    _write_partitions(combined, root)
+    refreshed = _refresh_following(root, partitions)
+    return {'rows_in_extract': len(new_df), 'rows_added': len(combined) - existing_rows,
+            'partitions': sorted(partitions), 'refreshed': refreshed, 'missing_columns': missing_columns}
+
+
+def _write_partitions(df, root):
+    # df가 걸치는 (Year, Month) 파티션만 통째로 교체
+    ds.write_dataset(pa.Table.from_pandas(df, preserve_index=False), root, format='parquet',
+                     partitioning=PARTITION_COLS, partitioning_flavor='hive',
+                     existing_data_behavior='delete_matching', basename_template='part-{i}.parquet')
+
+
+def _refresh_following(root, partitions):
+    # 다시 쓴 월의 바로 다음 달 파티션 (이번에 다시 쓰지 않은 것만)
+    #  -> 월 초 윈도우 구간이 보충 적재된 앞 달 항공편을 세도록 혼잡 피처 재계산 (피처는 과거 방향이라 그 다음 달은 영향 없음)
+    rewritten = {(int(y), int(m)) for y, m in partitions}
+    following = sorted({(y + m // 12, m % 12 + 1) for y, m in rewritten} - rewritten)
+    dataset = open_dataset(root)
+    refreshed = []
+    for year, month in following:
+        part = dataset.to_table(filter=_partition_expression([(year, month)])).to_pandas()
+        if part.empty:
+            continue
+        part = part.sort_values('RAM_Datetime', kind='stable')
+        part = add_congestion_features(part, history=_history_before(root, part['RAM_Datetime'].min()))
+        _write_partitions(part, root)
+        refreshed.append((year, month))
+    return refreshed
+
+
+def _history_before(root, start, minutes=max(WINDOWS_MIN)):
+    # 다시 쓰는 파티션 바로 앞 윈도우 구간의 항공편 (월 경계의 혼잡 피처가 끊기지 않도록)
+    if not dataset_exists(root) or pd.isna(start):
+        return None
+    dataset = open_dataset(root)
+    lower = pa.scalar(start - pd.Timedelta(minutes=minutes), type=dataset.schema.field('RAM_Datetime').type)
+    upper = pa.scalar(start, type=dataset.schema.field('RAM_Datetime').type)
+    expr = (pc.field('RAM_Datetime') >= lower) & (pc.field('RAM_Datetime') < upper)
+    return dataset.to_table(filter=expr).to_pandas().sort_values('RAM_Datetime', kind='stable')
+
+
+def filter_expression(filter_spec=None, years=None, names=None):
+    # 필터 스펙 -> pyarrow 조건식 (3-Sigma 극단치 조건은 전체 분포가 필요하므로 별도 처리)
+    expr = None
+    for col in FILTER_COLS:
+        values = (filter_spec or {}).get(col)
+        if values and (names is None or col in names):
+            e = pc.field(col).isin(values)
+            expr = e if expr is None else expr & e
+    if years:
+        e = pc.field('Year').isin([int(y) for y in years])
+        expr = e if expr is None else expr & e
+    return expr
+
+
+def _with_key_columns(columns):
+    # 식별/타겟 컬럼은 요청 컬럼과 상관없이 항상 포함 (연도 분할, 평가 리포트에 필요)
+    return list(dict.fromkeys(ID_COLS + [TARGET_COL] + list(columns)))
+
+
+# ==========================================
+# 데이터 소스: 업로드된 DataFrame / 로컬 파티션 데이터셋을 같은 인터페이스로 사용
+# ==========================================
+class FrameSource:
+    version = None
+
+    def __init__(self, df):
+        if 'RAM_Datetime' in df.columns and not df['RAM_Datetime'].is_monotonic_increasing:
+            # DatasetSource.read와 같은 시간 순서 (자동 분할은 마지막 10%를 평가에 씀 -> 파일 순서가 아니라 최근 구간)
+            df = df.sort_values('RAM_Datetime', kind='stable', ignore_index=True)
+        self.df = df
+        self.filters = FilterEngine(df)
+
+    @property
+    def columns(self):
+        return list(self.df.columns)
+
+    @property
+    def num_rows(self):
+        return len(self.df)
+
+    def distinct(self, col):
+        if col in self.filters.categories:
+            return self.filters.categories[col].tolist()
+        return self.df[col].dropna().unique().tolist()
+
+    def read(self, filter_spec, columns=None, years=None):
+        df = self.filters.filter(filter_spec, years)
+        return df if columns is None else df[_with_key_columns(columns)]
+
+
+class DatasetSource:
+    def __init__(self, root=DEFAULT_ROOT, compact=False):
+        self.root = root
+        self.compact = compact
+        self.dataset = open_dataset(root)
+
+    @property
+    def version(self):
+        # 파티션 파일 목록/크기/수정 시각 해시 (추출본이 추가되면 바뀜 -> 캐시 무효화 키)
+        h = hashlib.sha1()
+        for path in sorted(self.dataset.files):
+            stat = os.stat(path)
+            h.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+        return h.hexdigest()
+
+    @property
+    def columns(self):
+        return [c for c in self.dataset.schema.names if c != 'Month']
+
+    @property
+    def num_rows(self):
+        return self.dataset.count_rows()
+
+    def distinct(self, col):
+        values = pc.unique(self.dataset.to_table(columns=[col]).column(col)).drop_null()
+        return values.to_pylist()
+
+    def partitions(self):
+        table = self.dataset.to_table(columns=PARTITION_COLS)
+        return table.group_by(PARTITION_COLS).aggregate([([], 'count_all')]).to_pandas() \
+            .rename(columns={'count_all': 'Rows'}).sort_values(PARTITION_COLS, ignore_index=True)
+
+    def read(self, filter_spec, columns=None, years=None):
+        expr = filter_expression(filter_spec, years, self.dataset.schema.names)
+        if filter_spec.get('remove_outliers'):
+            # 극단치 기준은 기존과 같이 필터 적용 전 전체 타겟 분포로 계산 (타겟 컬럼만 읽음)
+            target = self.dataset.to_table(columns=[TARGET_COL]).column(TARGET_COL).to_numpy()
+            e = pc.field(TARGET_COL) <= outlier_threshold(target)
+            expr = e if expr is None else expr & e
+
+        if columns is not None:
+            columns = _with_key_columns(columns)
+            missing = [c for c in columns if c not in self.dataset.schema.names]
+            if missing:
+                raise KeyError(f"columns not in dataset: {missing}")
+        with trace.span('dataset read') as span:
+            table = self.dataset.to_table(columns=columns, filter=expr)
+            if 'RAM_Datetime' in table.column_names:
+                # 시간 순서 보장 (자동 분할은 마지막 10%를 평가에 씀)
+                table = table.sort_by('RAM_Datetime')
+            df = table.to_pandas().drop(columns=['Month'], errors='ignore')
+            span.rows = len(df)
+            return compact_frame(df) if self.compact else df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ATD-RAM 증분 데이터 적재")
+    parser.add_argument('--root', default=DEFAULT_ROOT, help="파티션 데이터셋 폴더 (기본값: $ATD_DATASET 또는 ./atd_dataset)")
+    sub = parser.add_subparsers(dest='command', required=True)
+    append = sub.add_parser('append', help="일일 추출본(또는 마스터 파일)을 데이터셋에 추가")
+    append.add_argument('files', nargs='+')
+    sub.add_parser('info', help="파티션별 행 수")
+    args = parser.parse_args(argv)
+
+    if args.command == 'append':
+        for path in args.files:
+            summary = append_extract(path, args.root)
+            print(f"{path}: +{summary['rows_added']:,} rows ({summary['rows_in_extract']:,} in extract), "
+                  f"{len(summary['partitions'])} partitions rewritten, "
+                  f"{len(summary['refreshed'])} following partitions refreshed", flush=True)
+            if summary['missing_columns']:
+                print(f"  warning: extract lacks stored columns (left empty): {summary['missing_columns']}", flush=True)
+    else:
+        if not dataset_exists(args.root):
+            parser.exit(1, f"no dataset at {args.root}\n")
+        print(DatasetSource(args.root).partitions().to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,429 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# ==========================================
+# ATD-RAM 학습 작업 큐 (한 대의 랩 서버를 여러 사용자가 공유)
+#  - 작업 = <root>/<job_id>/
+#      job.json     : 상태(queued/running/done/failed/cancelled), 학습 설정, 결과 모델 ID, 오류
+#                     (갱신은 job.lock 파일 잠금 + 임시 파일 os.replace)
+#      events.jsonl : 학습 엔진 진행 이벤트 (progress 콜백 -> 한 줄씩 추가, 화면은 처음부터 다시 그림)
+#      data.parquet : 업로드 파일로 학습할 때의 필터링된 학습 데이터 (작업이 끝나면 삭제)
+#      trace.json   : 작업 단계별 계측 (Chrome trace)
+#      spans.json   : 같은 계측의 구간 목록 (Tracer.to_json -> 앱 성능 계측 패널에서 atd_trace.load로 읽음)
+#  - 상태가 디스크에 있으므로 페이지를 새로고침해도, 다른 세션에서 봐도 같은 작업이 보임
+#  - JobScheduler: 디스패처 스레드가 대기 작업을 먼저 온 순서대로 워커 슬롯에 배정
+#      워커 = spawn 프로세스 (작업마다 새 프로세스 -> 끝나면 메모리 반환), 슬롯마다 겹치지 않는 코어(CPU affinity)
+#  - 완료된 모델은 모델 레지스트리에 등록하고 작업에는 모델 ID만 남김
+# ==========================================
+
+DEFAULT_ROOT = os.environ.get('ATD_JOBS', 'atd_jobs')
+DEFAULT_WORKERS = int(os.environ.get('ATD_JOB_WORKERS', '1'))
+POLL_SECONDS = 1.0
+
+log = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+# 학습 데이터 출처
+SOURCE_FRAME = 'frame'  # 제출 시 넘긴 DataFrame (data.parquet으로 저장)
+SOURCE_PATH = 'path'    # 마스터 parquet / 파티션 데이터셋 경로 (워커가 직접 읽음, 필터/연도 pushdown)
+SOURCE_STORE = 'store'  # 공유 데이터셋 저장소의 Arrow 파일 (atd_store, 워커가 memory map으로 읽음)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+@contextmanager
+def _file_lock(path):
+    # 프로세스 간 배타 잠금 (스케줄러 프로세스와 워커 프로세스가 같은 job.json을 고침)
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class JobStore:
+    def __init__(self, root=None):
+        self.root = root or DEFAULT_ROOT
+        self._lock = threading.Lock()
+
+    def _dir(self, job_id):
+        return os.path.join(self.root, job_id)
+
+    def _path(self, job_id, name):
+        return os.path.join(self._dir(job_id), name)
+
+    def create(self, spec, data=None, label=None):
+        # spec: 학습 설정 (JSON), data: SOURCE_FRAME일 때의 학습 데이터
+        job_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        os.makedirs(self._dir(job_id))
+        if data is not None:
+            data.to_parquet(self._path(job_id, 'data.parquet'))
+        job = {'job_id': job_id, 'status': QUEUED, 'label': label or spec.get('mode', ''),
+               'created_at': time.strftime('%Y-%m-%d %H:%M:%S'), 'spec': spec}
+        self._write(job_id, job)
+        return job_id
+
+    def _write(self, job_id, job):
+        tmp = self._path(job_id, f".job.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp, self._path(job_id, 'job.json'))
+
+    def get(self, job_id):
+        with open(self._path(job_id, 'job.json'), encoding='utf-8') as f:
+            return json.load(f)
+
+    def update(self, job_id, **fields):
+        # 읽기-수정-쓰기 전체를 작업별 파일 잠금 안에서 (다른 프로세스가 쓴 필드를 덮어쓰지 않도록)
+        with self._lock, _file_lock(self._path(job_id, 'job.lock')):
+            job = self.get(job_id)
+            job.update(fields)
+            self._write(job_id, job)
+            return job
+
+    def list(self):
+        # 최근 작업이 앞에 오도록
+        if not os.path.isdir(self.root):
+            return []
+        jobs = []
+        for name in os.listdir(self.root):
+            if os.path.exists(self._path(name, 'job.json')):
+                try:
+                    jobs.append(self.get(name))
+                except ValueError as e:
+                    # 손상된 job.json (직접 고친 파일 등) -> 목록/배정에서 빼고 나머지 작업은 계속
+                    log.warning("skipping job %s: unreadable job.json (%s)", name, e)
+        return sorted(jobs, key=lambda j: j['job_id'], reverse=True)
+
+    def claim(self, job_id):
+        # 여러 서버 프로세스가 같은 폴더를 볼 때 한 곳만 실행하도록 (원자적 파일 생성, 내용 = 가져간 프로세스 pid)
+        try:
+            fd = os.open(self._path(job_id, 'claim'), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        try:
+            os.write(fd, str(os.getpid()).encode())
+        finally:
+            os.close(fd)
+        return True
+
+    def claim_stale(self, job_id, grace=5.0):
+        # 가져간 프로세스가 이미 없는 claim 파일인지 (pid가 비었거나 읽을 수 없으면 생성 직후가 아닐 때만 버려진 것으로 봄)
+        path = self._path(job_id, 'claim')
+        try:
+            with open(path, encoding='utf-8') as f:
+                text = f.read().strip()
+            age = time.time() - os.path.getmtime(path)
+        except FileNotFoundError:
+            return False
+        if text.isdigit():
+            return not _pid_alive(int(text))
+        return age > grace
+
+    def release_claim(self, job_id):
+        try:
+            os.remove(self._path(job_id, 'claim'))
+        except FileNotFoundError:
+            pass
+
+    def append_event(self, job_id, event):
+        with open(self._path(job_id, 'events.jsonl'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(event, ensure_ascii=False, default=float) + '\n')
+
+    def events(self, job_id):
+        path = self._path(job_id, 'events.jsonl')
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.endswith('\n')]
+
+    def trace(self, job_id):
+        # 작업 프로세스가 남긴 계측 -> Tracer (작업이 끝나기 전에는 None)
+        import atd_trace as trace
+        path = self._path(job_id, 'spans.json')
+        return trace.load(path) if os.path.exists(path) else None
+
+    def request_cancel(self, job_id):
+        open(self._path(job_id, 'cancel'), 'w').close()
+
+    def cancel_requested(self, job_id):
+        return os.path.exists(self._path(job_id, 'cancel'))
+
+    def delete(self, job_id):
+        shutil.rmtree(self._dir(job_id), ignore_errors=True)
+
+
+def progress_fraction(events):
+    # 진행 이벤트 -> 0~1 (모델별 trial 진행률의 평균, 스태킹은 두 모델)
+    done = {}
+    for event in events:
+        if event['type'] == 'study_start':
+            done[event['model']] = 0.0
+        elif event['type'] == 'trial':
+            done[event['model']] = min(event['trial'] / event['n_trials'], 1.0)
+        elif event['type'] == 'early_stop':
+            done[event['model']] = 1.0
+    return sum(done.values()) / len(done) if done else 0.0
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except (OSError, TypeError):
+        return False
+
+
+# ==========================================
+# 워커 프로세스 (작업 하나)
+# ==========================================
+def run_job(root, job_id, cores=None, registry_root=None):
+    # 코어 제한을 먼저 걸고 나서 학습 라이브러리를 import (OpenMP는 로드 시점의 affinity로 스레드 수를 정함)
+    if cores and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+    import atd_engine as engine
+    import atd_trace as trace
+    from atd_registry import ModelRegistry
+
+    store = JobStore(root)
+    spec = store.get(job_id)['spec']
+    store.update(job_id, status=RUNNING, started_at=time.strftime('%Y-%m-%d %H:%M:%S'), pid=os.getpid(),
+                 cores=engine.available_cores())
+
+    def progress(event):
+        store.append_event(job_id, event)
+        if store.cancel_requested(job_id):
+            raise JobCancelled()
+
+    tracer = trace.Tracer()
+    started = time.perf_counter()
+    try:
+        with trace.activate(tracer):
+            tuning = engine.TuningConfig(**spec['tuning'])
+            source = spec['source']
+            if source['kind'] == SOURCE_PATH:
+                result = engine.train_from_parquet(source['path'], spec['filter_spec'], spec['split_mode'],
+                                                   spec['train_years'], spec['test_years'], spec['features'],
+                                                   spec['mode'], spec['trials'], spec['early_stop_rounds'], progress,
+                                                   tuning, source.get('compact', False), source.get('out_of_core'))
+            else:
+                if source['kind'] == SOURCE_STORE:
+                    # 앱 세션들과 같은 Arrow 파일을 매핑 -> 필터/연도/변수만 골라 학습 데이터 구성
+                    from atd_ingest import FrameSource
+                    from atd_store import DatasetStore
+                    frames = FrameSource(DatasetStore(source['root']).frame(source['digest'], source['compact']))
+                    df = frames.read(spec['filter_spec'], spec['features'],
+                                     engine.split_years(spec['split_mode'], spec['train_years'], spec['test_years']))
+                else:
+                    df = pd.read_parquet(store._path(job_id, 'data.parquet'))
+                result = engine.run_training(df, spec['features'], spec['mode'], spec['trials'],
+                                             spec['early_stop_rounds'], spec['split_mode'], spec['train_years'],
+                                             spec['test_years'], progress, spec['filter_spec'], tuning)
+            model_id = ModelRegistry(registry_root).register(result.artifact)
+        status = DONE
+        store.update(job_id, status=DONE, model_id=model_id, model_name=result.metrics['Model'],
+                     mae=result.metrics['MAE'])
+    except JobCancelled:
+        status = CANCELLED
+        store.update(job_id, status=CANCELLED)
+    except Exception as e:
+        status = FAILED
+        message = str(e) if isinstance(e, engine.TrainingError) else f"{type(e).__name__}: {e}"
+        store.update(job_id, status=FAILED, error=message)
+    finally:
+        store.update(job_id, finished_at=time.strftime('%Y-%m-%d %H:%M:%S'),
+                     elapsed_s=round(time.perf_counter() - started, 1))
+        with open(store._path(job_id, 'trace.json'), 'w', encoding='utf-8') as f:
+            f.write(tracer.chrome_trace())
+        with open(store._path(job_id, 'spans.json'), 'w', encoding='utf-8') as f:
+            f.write(tracer.to_json())
+        data_path = store._path(job_id, 'data.parquet')
+        if os.path.exists(data_path):
+            os.remove(data_path)
+    return status
+
+
+# ==========================================
+# 스케줄러 (서버 프로세스당 하나, 모든 세션이 공유)
+# ==========================================
+def core_slots(n_workers):
+    # 사용 가능한 코어를 워커 슬롯 수만큼 겹치지 않게 나눔 (코어가 더 적으면 돌려 씀)
+    try:
+        cores = sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return [None] * n_workers
+    if len(cores) < n_workers:
+        return [[cores[i % len(cores)]] for i in range(n_workers)]
+    return [cores[i::n_workers] for i in range(n_workers)]
+
+
+class JobScheduler:
+    def __init__(self, root=None, n_workers=None, registry_root=None):
+        self.store = JobStore(root)
+        self.n_workers = max(1, int(n_workers or DEFAULT_WORKERS))
+        self.registry_root = registry_root
+        self.slots = core_slots(self.n_workers)
+        self._running = {}  # 슬롯 번호 -> (job_id, future)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._pool = self._new_pool()
+        os.makedirs(self.store.root, exist_ok=True)
+        self._recover()
+        self._thread = threading.Thread(target=self._dispatch_loop, daemon=True, name='atd-job-dispatcher')
+        self._thread.start()
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(self.n_workers, mp_context=multiprocessing.get_context('spawn'), max_tasks_per_child=1)
+
+    def _recover(self):
+        # 서버가 재시작돼 실행 프로세스가 사라진 작업은 실패로 정리 (대기 작업은 그대로 이어서 실행)
+        for job in self.store.list():
+            if job['status'] == RUNNING and not _pid_alive(job.get('pid')):
+                self.store.update(job['job_id'], status=FAILED, error="작업 프로세스가 중단되었습니다 (서버 재시작).")
+            elif job['status'] == QUEUED and self.store.claim_stale(job['job_id']):
+                # claim 직후 (워커가 running으로 바꾸기 전) 서버가 죽은 작업 -> claim을 풀어 다시 배정되게
+                self.store.release_claim(job['job_id'])
+
+    def submit(self, spec, data=None, label=None):
+        job_id = self.store.create(spec, data, label)
+        self._wake.set()
+        return job_id
+
+    def cancel(self, job_id):
+        # 대기 작업은 바로 취소, 실행 중인 작업은 다음 진행 이벤트(trial 종료)에서 멈춤
+        job = self.store.get(job_id)
+        if job['status'] == QUEUED and self.store.claim(job_id):
+            self.store.update(job_id, status=CANCELLED, finished_at=time.strftime('%Y-%m-%d %H:%M:%S'))
+        elif job['status'] in ACTIVE_STATES:
+            self.store.request_cancel(job_id)
+
+    def queue_position(self, job_id):
+        queued = sorted(j['job_id'] for j in self.store.list() if j['status'] == QUEUED)
+        return queued.index(job_id) + 1 if job_id in queued else None
+
+    def _reap(self):
+        for slot, (job_id, future) in list(self._running.items()):
+            if not future.done():
+                continue
+            del self._running[slot]
+            error = future.exception()
+            if error is not None:
+                # 워커 프로세스가 비정상 종료 (메모리 부족 등) -> 작업 실패 처리, 풀을 새로 만듦
+                self.store.update(job_id, status=FAILED, error=f"{type(error).__name__}: {error}",
+                                  finished_at=time.strftime('%Y-%m-%d %H:%M:%S'))
+                if isinstance(error, BrokenProcessPool):
+                    self._pool.shutdown(wait=False, cancel_futures=True)
+                    self._pool = self._new_pool()
+
+    def _dispatch(self):
+        free = [slot for slot in range(self.n_workers) if slot not in self._running]
+        if not free:
+            return
+        queued = sorted((j for j in self.store.list() if j['status'] == QUEUED), key=lambda j: j['job_id'])
+        for job in queued:
+            if not free:
+                break
+            if not self.store.claim(job['job_id']):
+                continue
+            slot = free.pop(0)
+            future = self._pool.submit(run_job, self.store.root, job['job_id'], self.slots[slot], self.registry_root)
+            self._running[slot] = (job['job_id'], future)
+
+    def _dispatch_loop(self):
+        while not self._stop.is_set():
+            try:
+                self._reap()
+                self._dispatch()
+            except OSError:
+                pass  # 작업 폴더를 다른 프로세스가 지우는 중 -> 다음 주기에 다시
+            except Exception:
+                # 작업 하나의 잘못된 설정 때문에 디스패처가 죽으면 대기 작업이 영원히 queued로 남음
+                log.exception("job dispatcher error")
+            self._wake.wait(POLL_SECONDS)
+            self._wake.clear()
+
+    def idle(self):
+        return not self._running and not any(j['status'] == QUEUED for j in self.store.list())
+
+    def shutdown(self, wait=True):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._pool.shutdown(wait=wait)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ATD-RAM 학습 작업 큐")
+    parser.add_argument('--root', default=None, help="작업 폴더 (기본값: $ATD_JOBS 또는 ./atd_jobs)")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help="작업 목록")
+    show = sub.add_parser('show', help="작업 상태 + 진행 이벤트")
+    show.add_argument('job_id')
+    cancel = sub.add_parser('cancel', help="작업 취소")
+    cancel.add_argument('job_id')
+    serve = sub.add_parser('serve', help="대기 작업을 모두 처리할 때까지 실행 (앱 없이 전용 학습 서버로 사용)")
+    serve.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    serve.add_argument('--registry', default=None, help="모델 레지스트리 폴더")
+    args = parser.parse_args(argv)
+
+    store = JobStore(args.root)
+    if args.command == 'list':
+        for job in store.list():
+            progress = 1.0 if job['status'] == DONE else progress_fraction(store.events(job['job_id']))
+            print(f"{job['job_id']}  {job['status']:<9} {progress:5.0%}  {job['label']}  {job.get('model_id') or job.get('error') or ''}")
+    elif args.command == 'show':
+        print(json.dumps(store.get(args.job_id), ensure_ascii=False, indent=2))
+        for event in store.events(args.job_id):
+            print(json.dumps(event, ensure_ascii=False))
+    elif args.command == 'cancel':
+        job = store.get(args.job_id)
+        if job['status'] == QUEUED and store.claim(args.job_id):
+            store.update(args.job_id, status=CANCELLED)
+        elif job['status'] == RUNNING:
+            store.request_cancel(args.job_id)
+    else:
+        scheduler = JobScheduler(args.root, args.workers, args.registry)
+        try:
+            while not scheduler.idle():
+                time.sleep(POLL_SECONDS)
+        finally:
+            scheduler.shutdown()
+
+
+if __name__ == '__main__':
+    main()
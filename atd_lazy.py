@@ -0,0 +1,83 @@
+import argparse
+import importlib
+import sys
+import threading
+import time
+import types
+
+import atd_trace as trace
+
+# ==========================================
+# 무거운 라이브러리 지연 import
+#  - module('xgboost') -> 모듈 대리 객체: 첫 속성 접근(xgb.train, xgb.DMatrix ...) 때 실제로 import
+#    업로드 화면은 학습/그래프 라이브러리를 쓰지 않으므로 콜드 스타트에 import 비용이 없음
+#    탭/학습 모드마다 실제로 쓰는 라이브러리만 그 시점에 로드 (단일 모드는 LightGBM을 읽지 않음)
+#  - 실제 import 시간은 모듈별로 기록 (앱 계측 패널 / python atd_lazy.py) + 활성 Tracer에 'import <모듈>' 구간
+# ==========================================
+
+_times = {}
+_modules = {}
+_lock = threading.RLock()
+
+
+def load(name):
+    # _modules에는 import가 끝난 모듈만 들어감 (스태킹 모드처럼 두 스레드가 동시에 처음 쓰면
+    # 한쪽이 sys.modules의 초기화 중인 모듈을 받아 가지 않도록 잠금 안에서 import)
+    module = _modules.get(name)
+    if module is not None:
+        return module
+    with _lock:
+        if name not in _modules:
+            if name in sys.modules:
+                # 다른 라이브러리가 이미 import함 (예: xgboost -> sklearn) -> 기록할 시간 없음
+                _modules[name] = importlib.import_module(name)
+            else:
+                started = time.perf_counter()
+                with trace.span(f'import {name}'):
+                    _modules[name] = importlib.import_module(name)
+                _times[name] = {'module': name, 'import_s': round(time.perf_counter() - started, 4),
+                                'loaded_at': time.strftime('%Y-%m-%d %H:%M:%S')}
+        return _modules[name]
+
+
+class LazyModule(types.ModuleType):
+    def __getattr__(self, attr):
+        if attr.startswith('__') and attr != '__version__':
+            # copy/pickle/inspect 등이 특수 속성을 조회하는 것만으로 import되지 않도록
+            raise AttributeError(attr)
+        # 로드 후에는 딕셔너리 조회 한 번 (실제 모듈 속성을 복사해 두면 종료 시 모듈 정리 순서가 꼬임)
+        return getattr(load(self.__name__), attr)
+
+    def __dir__(self):
+        return dir(load(self.__name__))
+
+
+def module(name):
+    return LazyModule(name)
+
+
+def import_times():
+    # 이 프로세스에서 지연 import된 모듈과 걸린 시간 (로드 순서대로)
+    return list(_times.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ATD-RAM 모듈별 import 시간 측정 (콜드 프로세스)")
+    parser.add_argument('modules', nargs='*', default=['atd_engine', 'atd_ingest', 'atd_registry', 'atd_explain'],
+                        help="먼저 import할 앱 모듈 (기본값: 앱 시작 시 읽는 모듈)")
+    parser.add_argument('--use', nargs='*', default=['xgboost', 'lightgbm', 'optuna', 'sklearn.metrics'],
+                        help="이어서 지연 로드할 라이브러리")
+    args = parser.parse_args(argv)
+
+    for name in args.modules:
+        started = time.perf_counter()
+        importlib.import_module(name)
+        print(f"{name:<24} {time.perf_counter() - started:8.3f}s  (app module)")
+    for name in args.use:
+        load(name)
+    for row in import_times():
+        print(f"{row['module']:<24} {row['import_s']:8.3f}s  (lazy)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,588 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+import atd_lazy as lazy
+import atd_trace as trace
+from atd_engine import (
+    MODE_SINGLE, MODE_STACKING, PRUNER_NONE, REFIT_BEST_ROUNDS, REFIT_CONTINUE, SPLIT_AUTO, SPLIT_HOLDOUT,
+    SPLIT_IN_SAMPLE, TARGET_COL, ModelArtifact, OptunaPlateauCallback, TrainingError, TrainingResult, TuningConfig,
+    _emit, _lgb_native_mae, _xgb_native_mae, feature_profile, lgb_native_params, mae_minutes, make_filter_spec,
+    make_pruner, make_storage, outlier_threshold, run_stacking_legs, score_predictions, split_years,
+    suggest_lgb_params, suggest_xgb_params, trainable_features, xgb_native_params,
+)
+from atd_ingest import filter_expression, open_dataset
+
+# 학습 라이브러리 / 라이브러리 클래스를 상속하는 어댑터 모듈은 처음 쓸 때 import (atd_lazy)
+xgb = lazy.module('xgboost')
+lgb = lazy.module('lightgbm')
+optuna = lazy.module('optuna')
+sklinear = lazy.module('sklearn.linear_model')
+pruning = lazy.module('atd_pruning')
+batches = lazy.module('atd_batches')
+
+# ==========================================
+# ATD-RAM Out-of-Core 학습 (전체 이력이 메모리에 다 올라가지 않을 때)
+#  - 마스터 parquet / 파티션 데이터셋을 배치 단위로 스트리밍 (필터/연도 조건은 읽기 단계에서 pyarrow로 적용)
+#  - 분할(학습/검증/평가)은 Year + RAM_Datetime 두 컬럼만 읽어 행마다 역할 비트(1바이트)로 한 번 계산
+#      -> 이후 모든 패스는 배치를 읽으면서 역할 비트로 바로 걸러냄 (run_training과 같은 시간 순 분할 규칙)
+#  - XGBoost: DataIter -> QuantileDMatrix (양자화된 값만 메모리에) 또는 ExtMemQuantileDMatrix (페이지를 디스크 캐시에)
+#  - LightGBM: 학습+검증 행을 float32 memmap에 한 번 흘려 Sequence로 Dataset을 만들고 바이너리로 저장
+#      -> 같은 데이터/필터/분할이면 다음 학습부터 바이너리만 읽음, 학습/검증은 subset으로 나눔
+#  - 평가: 평가 행을 배치로 예측하며 지표 계산 (X_test는 앞쪽 SAMPLE_ROWS 행만 보관)
+#  - 캐시(<cache_dir>/<fingerprint>)는 최근 사용 순 LRU로 용량 한도까지 정리 (evict_cache)
+# ==========================================
+
+BATCH_ROWS = 262144
+SAMPLE_ROWS = 100000
+CACHE_DIR = os.environ.get('ATD_OOC_CACHE', 'ooc_cache')
+CACHE_MAX_GB = float(os.environ.get('ATD_OOC_CACHE_MAX_GB', 8))
+EXTMEM_PREFIX = 'xgb_extmem_'
+EXTMEM_STALE_S = 24 * 3600  # 이보다 오래된 외부 메모리 임시 폴더는 중단된 학습의 잔여물로 보고 삭제
+TIME_COL = 'RAM_Datetime'
+
+# 행 역할 비트 (IN_SAMPLE / 겹치는 HOLDOUT 연도는 한 행이 여러 역할을 가짐)
+ROLE_TRAIN = 1
+ROLE_VALID = 2
+ROLE_TEST = 4
+ROLE_FULL = ROLE_TRAIN | ROLE_VALID
+
+# 한 번 만든 LightGBM 바이너리와 학습 파라미터가 어긋나지 않도록 Dataset 파라미터는 고정
+LGB_DATASET_PARAMS = {'max_bin': 255, 'verbose': -1}
+
+
+def _is_numeric(arrow_type):
+    return pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type) or pa.types.is_boolean(arrow_type)
+
+
+class ParquetStream:
+    # 필터/연도 조건이 걸린 parquet 배치 스트림 + 행별 역할 비트
+    #  - 같은 조건의 스캔은 매번 같은 순서로 같은 행을 돌려주므로 역할 배열을 스트림 위치로 바로 대응
+    def __init__(self, path, features=None, filter_spec=None, split_mode=SPLIT_AUTO, train_years=None, test_years=(),
+                 batch_rows=BATCH_ROWS):
+        self.path = path
+        self.dataset = open_dataset(path) if os.path.isdir(path) else ds.dataset(path, format='parquet')
+        names = self.dataset.schema.names
+        self.features = list(features) if features is not None else \
+            [c for c in trainable_features(names) if c != 'Month']
+        missing = [c for c in self.features + [TARGET_COL, 'Year'] if c not in names]
+        if missing:
+            raise KeyError(f"columns not in dataset: {missing}")
+        text = [c for c in self.features if not _is_numeric(self.dataset.schema.field(c).type)]
+        if text:
+            raise TrainingError(f"🚨 out-of-core 학습은 숫자형 변수만 지원합니다: {text}")
+
+        self.filter_spec = filter_spec or make_filter_spec()
+        self.split_mode = split_mode
+        if train_years is None:
+            train_years = sorted(int(y) for y in self._distinct('Year'))
+        self.train_years = [int(y) for y in train_years]
+        self.test_years = [int(y) for y in test_years]
+        self.batch_rows = int(batch_rows)
+        self.files = self._file_state()
+
+        expr = filter_expression(self.filter_spec, split_years(split_mode, self.train_years, self.test_years), names)
+        if self.filter_spec.get('remove_outliers'):
+            # 극단치 기준은 run_training과 같이 필터 전 전체 타겟 분포 (타겟 컬럼만 읽음)
+            target = self.dataset.to_table(columns=[TARGET_COL]).column(TARGET_COL).to_numpy()
+            e = pc.field(TARGET_COL) <= outlier_threshold(target)
+            expr = e if expr is None else expr & e
+        self.expr = expr
+        self.role = self._plan()
+
+    def _distinct(self, col):
+        return pc.unique(self.dataset.to_table(columns=[col]).column(col)).drop_null().to_pylist()
+
+    def _file_state(self):
+        # 파일 목록/크기/수정 시각 (fingerprint + 패스마다 데이터셋이 바뀌지 않았는지 확인)
+        state = []
+        for path in sorted(self.dataset.files):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                raise TrainingError("🚨 학습 중 데이터셋이 바뀌었습니다. 다시 시도해주세요!") from None
+            state.append(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}")
+        return state
+
+    def _scan(self, columns):
+        # 역할 배열은 스트림 위치로 행을 대응시키므로
+        #  - 패스마다 파일이 계획 시점과 같은지 확인 (적재 중인 파티션을 읽으면 행이 어긋남)
+        #  - 단일 스레드 스캔 -> 배치 순서가 항상 같음
+        if self._file_state() != self.files:
+            raise TrainingError("🚨 학습 중 데이터셋이 바뀌었습니다. 다시 시도해주세요!")
+        return self.dataset.to_batches(columns=columns, filter=self.expr, batch_size=self.batch_rows,
+                                       use_threads=False)
+
+    # ---- 분할 계획 ----
+    def _plan(self):
+        with trace.span('ooc plan', split_mode=self.split_mode) as span:
+            columns = ['Year'] + ([TIME_COL] if TIME_COL in self.dataset.schema.names else [])
+            schema = pa.schema([self.dataset.schema.field(c) for c in columns])
+            table = pa.Table.from_batches(list(self._scan(columns)), schema=schema)
+            span.rows = table.num_rows
+            years = table.column('Year').to_numpy(zero_copy_only=False).astype(np.int64)
+            if TIME_COL in columns:
+                times = table.column(TIME_COL).cast(pa.timestamp('ns')).to_numpy(zero_copy_only=False).astype(np.int64)
+                order = np.argsort(times, kind='stable')
+            else:
+                order = np.arange(len(years))
+            del table
+
+            role = np.zeros(len(years), dtype=np.int8)
+            in_train = np.isin(years, self.train_years)
+            if self.split_mode == SPLIT_AUTO:
+                if in_train.sum() < 100:
+                    raise TrainingError("🚨 선택한 학습 연도에 데이터가 너무 적습니다. 조건을 완화해주세요!")
+                test = self._tail(order, in_train)
+                train_full = in_train & ~test
+            elif self.split_mode == SPLIT_HOLDOUT:
+                test = np.isin(years, self.test_years)
+                train_full = in_train
+                if train_full.sum() < 50 or not test.any():
+                    raise TrainingError("🚨 학습 또는 테스트 데이터가 비어있습니다. 연도를 다시 선택해주세요!")
+            elif self.split_mode == SPLIT_IN_SAMPLE:
+                if in_train.sum() < 50:
+                    raise TrainingError("🚨 선택한 학습 연도에 데이터가 너무 적습니다!")
+                test = train_full = in_train
+            else:
+                raise TrainingError(f"🚨 알 수 없는 평가 방식입니다: {self.split_mode}")
+
+            valid = self._tail(order, train_full)
+            role[train_full & ~valid] |= ROLE_TRAIN
+            role[valid] |= ROLE_VALID
+            role[test] |= ROLE_TEST
+            return role
+
+    @staticmethod
+    def _tail(order, mask, size=0.1):
+        # mask 행 중 시간 순 마지막 ceil(n * size)개 (tail_split과 같은 규칙)
+        positions = order[mask[order]]
+        n_tail = int(np.ceil(len(positions) * size))
+        out = np.zeros(len(mask), dtype=bool)
+        out[positions[len(positions) - n_tail:]] = True
+        return out
+
+    def count(self, roles):
+        return int(np.count_nonzero(self.role & roles))
+
+    @property
+    def fingerprint(self):
+        # 파일 목록/크기/수정 시각 + 조건식 + 변수 + 분할 해시 (LightGBM 바이너리 캐시 키, 모델 레지스트리 data_hash)
+        h = hashlib.sha1()
+        for state in self.files:
+            h.update(state.encode('utf-8'))
+        h.update(json.dumps([str(self.expr), self.features, self.split_mode, self.train_years, self.test_years],
+                            ensure_ascii=False).encode('utf-8'))
+        return h.hexdigest()
+
+    # ---- 배치 읽기 ----
+    def _matrix(self, batch):
+        X = np.empty((batch.num_rows, len(self.features)), dtype=np.float32)
+        for j, col in enumerate(self.features):
+            X[:, j] = batch.column(col).cast(pa.float32()).to_numpy(zero_copy_only=False)
+        return X
+
+    def batches(self, roles):
+        # roles 비트에 해당하는 행만 -> (X float32, y log1p, Year, 역할 비트) 배치
+        offset = 0
+        for batch in self._scan(self.features + [TARGET_COL, 'Year']):
+            role = self.role[offset:offset + batch.num_rows]
+            offset += batch.num_rows
+            keep = (role & roles) != 0
+            if not keep.any():
+                continue
+            if not keep.all():
+                batch = batch.filter(pa.array(keep))
+                role = role[keep]
+            y = np.log1p(batch.column(TARGET_COL).to_numpy(zero_copy_only=False).astype(np.float64))
+            years = batch.column('Year').to_numpy(zero_copy_only=False)
+            yield self._matrix(batch), y, years, role
+        if offset != len(self.role):
+            raise TrainingError("🚨 학습 중 데이터셋이 바뀌었습니다. 다시 시도해주세요!")
+
+    def sample(self, roles, n_rows=SAMPLE_ROWS):
+        # 앞쪽 n_rows 행 (원래 dtype 그대로의 DataFrame, 스키마 계산/X_test 표본용)
+        frames, taken, offset = [], 0, 0
+        for batch in self._scan(self.features):
+            keep = (self.role[offset:offset + batch.num_rows] & roles) != 0
+            offset += batch.num_rows
+            if keep.any():
+                frames.append(batch.filter(pa.array(keep)).slice(0, n_rows - taken).to_pandas())
+                taken += len(frames[-1])
+            if taken >= n_rows:
+                break
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=self.features)
+
+
+# ==========================================
+# 1. XGBoost: DataIter -> QuantileDMatrix / ExtMemQuantileDMatrix
+# ==========================================
+def xgb_matrix(stream, roles, ref=None, cache_dir=None, n_jobs=-1):
+    # cache_dir가 있으면 외부 메모리(페이지를 디스크에), 없으면 양자화 행렬을 메모리에
+    kwargs = {'ref': ref}
+    if n_jobs > 0:
+        kwargs['nthread'] = n_jobs
+    if cache_dir is not None:
+        prefix = os.path.join(cache_dir, f"xgb_{roles}")
+        return xgb.ExtMemQuantileDMatrix(batches.XGBBatchIter(stream, roles, prefix), **kwargs)
+    return xgb.QuantileDMatrix(batches.XGBBatchIter(stream, roles), **kwargs)
+
+
+# ==========================================
+# 2. LightGBM: 바이너리 Dataset (한 번 만들어 디스크에 저장)
+# ==========================================
+class LGBBinaryCache:
+    # <cache_dir>/lgb_full.bin      학습+검증 행 LightGBM 바이너리 Dataset
+    #             lgb_valid_X.f32   검증 행 원본 값 (float32 memmap, 점수/메타 모델 예측용)
+    #             lgb_y.npy, lgb_valid_idx.npy
+    def __init__(self, stream, cache_dir):
+        self.stream = stream
+        self.cache_dir = cache_dir
+        self.bin_path = os.path.join(cache_dir, 'lgb_full.bin')
+        self.valid_path = os.path.join(cache_dir, 'lgb_valid_X.f32')
+        self.y_path = os.path.join(cache_dir, 'lgb_y.npy')
+        self.valid_idx_path = os.path.join(cache_dir, 'lgb_valid_idx.npy')
+
+    def build(self):
+        # 학습+검증 행을 한 번 스트리밍: 전체 행은 임시 memmap -> Sequence -> 바이너리, 검증 행은 따로 보관
+        os.makedirs(self.cache_dir, exist_ok=True)
+        n_full, n_valid, p = self.stream.count(ROLE_FULL), self.stream.count(ROLE_VALID), len(self.stream.features)
+        rows_path = os.path.join(self.cache_dir, 'lgb_rows.f32')
+        rows = np.memmap(rows_path, dtype=np.float32, mode='w+', shape=(n_full, p))
+        valid_rows = np.memmap(self.valid_path, dtype=np.float32, mode='w+', shape=(n_valid, p))
+        y = np.empty(n_full, dtype=np.float64)
+        valid_idx = np.empty(n_valid, dtype=np.int64)
+        pos = vpos = 0
+        try:
+            for X, y_batch, _, role in self.stream.batches(ROLE_FULL):
+                is_valid = (role & ROLE_VALID) != 0
+                rows[pos:pos + len(X)] = X
+                y[pos:pos + len(X)] = y_batch
+                k = int(is_valid.sum())
+                valid_rows[vpos:vpos + k] = X[is_valid]
+                valid_idx[vpos:vpos + k] = pos + np.flatnonzero(is_valid)
+                pos += len(X)
+                vpos += k
+            valid_rows.flush()
+            np.save(self.y_path, y)
+            np.save(self.valid_idx_path, valid_idx)
+            dataset = lgb.Dataset(batches.RowSequence(rows, BATCH_ROWS), label=y,
+                                  feature_name=self.stream.features,
+                                  params=LGB_DATASET_PARAMS, free_raw_data=True)
+            dataset.construct().save_binary(self.bin_path)  # 마지막에 저장 -> 바이너리가 있으면 캐시 완성
+        finally:
+            del rows
+            os.remove(rows_path)
+
+    def load(self):
+        # -> (학습+검증 Dataset, 학습 subset, 검증 subset, 검증 X memmap, 검증 y)
+        if not os.path.exists(self.bin_path):
+            self.build()
+        y = np.load(self.y_path)
+        valid_idx = np.load(self.valid_idx_path)
+        train_idx = np.setdiff1d(np.arange(len(y)), valid_idx)
+        full = lgb.Dataset(self.bin_path, params=LGB_DATASET_PARAMS).construct()
+        X_valid = np.memmap(self.valid_path, dtype=np.float32, mode='r', shape=(len(valid_idx), len(self.stream.features)))
+        return full, full.subset(train_idx.tolist()), full.subset(valid_idx.tolist()), X_valid, y[valid_idx]
+
+
+# ==========================================
+# 3. 튜닝 & 재학습 (trial마다 같은 행렬 재사용)
+# ==========================================
+class OutOfCoreTrainer:
+    def __init__(self, stream, tuning=None, external_memory=False, cache_dir=CACHE_DIR, n_jobs=-1, progress=None):
+        self.stream = stream
+        self.tuning = tuning or TuningConfig()
+        self.external_memory = external_memory
+        self.cache_dir = os.path.join(cache_dir, stream.fingerprint[:16])
+        self.n_jobs = n_jobs
+        self.progress = progress
+        self.n_train = stream.count(ROLE_TRAIN)
+        self.n_valid = stream.count(ROLE_VALID)
+        self.best = {}  # 모델 -> (점수, 최적 trial 부스터) / REFIT_CONTINUE용
+        self._xgb = None
+        self._lgb = None
+        self._tmp = None
+        _touch(self.cache_dir)
+
+    def close(self):
+        # 외부 메모리 페이지 캐시는 학습마다 새로 만들므로 정리 (LightGBM 바이너리는 남김)
+        # 행렬을 먼저 놓아야 XGBoost가 자기 페이지 파일을 지운 뒤 폴더를 삭제함
+        tmp, self._tmp = self._tmp, None
+        self._xgb = self._lgb = None
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+        _touch(self.cache_dir)
+
+    def xgb_data(self):
+        # (학습, 검증) 양자화 행렬 -> 검증 행렬은 학습 행렬의 분위수 경계를 공유
+        if self._xgb is None:
+            if self.external_memory:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                self._tmp = tempfile.mkdtemp(prefix=EXTMEM_PREFIX, dir=self.cache_dir)
+            _emit(self.progress, type='stage', stage='matrix', message="💾 XGBoost 학습 행렬(QuantileDMatrix) 생성 중...")
+            with trace.span('ooc xgb matrix', rows=self.n_train + self.n_valid, external=self.external_memory):
+                dtrain = xgb_matrix(self.stream, ROLE_TRAIN, cache_dir=self._tmp, n_jobs=self.n_jobs)
+                dvalid = xgb_matrix(self.stream, ROLE_VALID, ref=dtrain, cache_dir=self._tmp, n_jobs=self.n_jobs)
+            self._xgb = (dtrain, dvalid, dvalid.get_label())
+        return self._xgb
+
+    def lgb_data(self):
+        if self._lgb is None:
+            cache = LGBBinaryCache(self.stream, self.cache_dir)
+            hit = os.path.exists(cache.bin_path)
+            _emit(self.progress, type='stage', stage='matrix',
+                  message="💾 LightGBM 바이너리 Dataset " + ("재사용" if hit else "생성 중..."))
+            with trace.span('ooc lgb dataset', rows=self.n_train + self.n_valid, cached=hit):
+                self._lgb = cache.load()
+        return self._lgb
+
+    def _keep(self, model_name, score, booster):
+        if self.tuning.refit == REFIT_CONTINUE and score < self.best.get(model_name, (float('inf'),))[0]:
+            self.best[model_name] = (score, booster)
+
+    def xgb_objective(self, trial):
+        dtrain, dvalid, y_valid = self.xgb_data()
+        params = suggest_xgb_params(trial)
+        reports = self.tuning.reports_rounds
+        early_stop = self.tuning.round_early_stop or None
+        callbacks = []
+        if self.tuning.pruner != PRUNER_NONE:
+            callbacks.append(pruning.XGBPruningCallback(trial, self.tuning.report_every))
+        booster = xgb.train(xgb_native_params(params, self.n_jobs), dtrain, params['n_estimators'],
+                            evals=[(dvalid, 'validation_0')] if reports else (),
+                            custom_metric=_xgb_native_mae if reports else None,
+                            early_stopping_rounds=early_stop, callbacks=callbacks, verbose_eval=False)
+        best_rounds = booster.best_iteration + 1 if early_stop else params['n_estimators']
+        trial.set_user_attr('best_iteration', best_rounds)
+        score = mae_minutes(y_valid, booster.predict(dvalid, iteration_range=(0, best_rounds)))
+        self._keep('XGBoost', score, booster[:best_rounds])
+        return score
+
+    def lgb_objective(self, trial):
+        _, dtrain, dvalid, X_valid, y_valid = self.lgb_data()
+        params = suggest_lgb_params(trial)
+        reports = self.tuning.reports_rounds
+        callbacks = []
+        if self.tuning.pruner != PRUNER_NONE:
+            callbacks.append(pruning.LGBPruningCallback(trial, self.tuning.report_every))
+        if self.tuning.round_early_stop > 0:
+            callbacks.append(lgb.early_stopping(self.tuning.round_early_stop, verbose=False))
+        booster = lgb.train(lgb_native_params(params, self.n_jobs), dtrain, params['n_estimators'],
+                            valid_sets=[dvalid] if reports else None, feval=_lgb_native_mae if reports else None,
+                            callbacks=callbacks)
+        best_rounds = booster.best_iteration or params['n_estimators']
+        trial.set_user_attr('best_iteration', best_rounds)
+        score = mae_minutes(y_valid, booster.predict(X_valid, num_iteration=best_rounds))
+        self._keep('LightGBM', score, booster)
+        return score
+
+    def tune(self, model_name, trials, early_stop_rounds):
+        # 행렬을 프로세스 사이에 넘길 수 없으므로 병렬 워커 없이 한 프로세스에서 탐색 (공유 스토리지는 사용 가능)
+        objective = self.xgb_objective if model_name == 'XGBoost' else self.lgb_objective
+        _emit(self.progress, type='study_start', model=model_name, n_trials=trials,
+              message=f"[{model_name}] Optuna 튜닝 시작 (out-of-core)")
+        study = optuna.create_study(direction='minimize', pruner=make_pruner(self.tuning.pruner),
+                                    storage=make_storage(self.tuning.storage),
+                                    study_name=f"{model_name}-{uuid.uuid4().hex[:8]}" if self.tuning.storage else None)
+        callback = OptunaPlateauCallback(trials, early_stop_rounds, model_name, self.progress)
+
+        def run_trial(t):
+            with trace.span(f"{model_name} trial", rows=self.n_train, trial=t.number):
+                return objective(t)
+
+        study.optimize(run_trial, n_trials=trials, callbacks=[callback])
+        return study
+
+    def refit(self, model_name, study):
+        # engine.refit_best와 같은 규칙 (REFIT_CONTINUE는 최적 trial 부스터에 검증 구간 라운드를 이어서 학습)
+        params = dict(study.best_params)
+        attrs = study.best_trial.user_attrs
+        rounds = params['n_estimators']
+        refit = self.tuning.refit
+        if refit in (REFIT_BEST_ROUNDS, REFIT_CONTINUE) and 'best_iteration' in attrs:
+            rounds = attrs['best_iteration']
+        extra = max(1, round(attrs.get('best_iteration', rounds) * self.n_valid / max(self.n_train, 1)))
+        init = self.best.get(model_name, (None, None))[1] if refit == REFIT_CONTINUE else None
+
+        if model_name == 'XGBoost':
+            native = xgb_native_params(params, self.n_jobs)
+            if init is not None:
+                booster = xgb.train(native, self.xgb_data()[1], extra, xgb_model=init)
+            else:
+                dfull = xgb_matrix(self.stream, ROLE_FULL, cache_dir=self._tmp, n_jobs=self.n_jobs)
+                booster = xgb.train(native, dfull, rounds)
+            model = xgb.XGBRegressor()
+            model.load_model(bytearray(booster.save_raw('ubj')))
+            return model
+
+        full, _, _, X_valid, y_valid = self.lgb_data()
+        native = lgb_native_params(params, self.n_jobs)
+        if init is not None:
+            # 이어 학습은 시작 점수 계산에 원본 값이 필요 -> 검증 memmap으로 같은 구간 경계의 Dataset 생성
+            dvalid = lgb.Dataset(X_valid, label=y_valid, reference=full, params=LGB_DATASET_PARAMS, free_raw_data=False)
+            return lgb.train(native, dvalid, extra, init_model=init)
+        return lgb.train(native, full, rounds)
+
+    def fit_leg(self, model_name, trials, early_stop_rounds):
+        with trace.span(f"tune {model_name}", rows=self.n_train, trials=trials):
+            study = self.tune(model_name, trials, early_stop_rounds)
+        with trace.span(f"refit {model_name}", rows=self.n_train + self.n_valid, refit=self.tuning.refit):
+            return self.refit(model_name, study)
+
+    def meta_inputs(self, xgb_model, lgb_model):
+        # 검증 행의 두 베이스 모델 예측 (메타 모델 입력) -> LightGBM 캐시의 검증 memmap을 함께 사용
+        _, _, _, X_valid, y_valid = self.lgb_data()
+        preds = pd.DataFrame({'XGB': xgb_model.get_booster().inplace_predict(X_valid),
+                              'LGBM': lgb_model.predict(X_valid)})
+        return preds, y_valid
+
+
+# ==========================================
+# 4. 캐시 정리 (<cache_dir>/<fingerprint> 폴더 단위 LRU)
+# ==========================================
+def _touch(path):
+    # 폴더 mtime = 최근 사용 시각 (atd_store와 같은 규칙)
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _dir_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+def cache_entries(cache_dir=CACHE_DIR):
+    # -> [(최근 사용 시각, 폴더, 바이트, 사용 중 여부)] 오래된 순
+    #  - 외부 메모리 임시 폴더가 있으면 다른 학습이 쓰는 중 (EXTMEM_STALE_S보다 오래된 것은 잔여물로 보고 삭제)
+    rows = []
+    if not os.path.isdir(cache_dir):
+        return rows
+    now = time.time()
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        try:
+            last_used = os.path.getmtime(path)  # 잔여물 삭제로 mtime이 바뀌기 전에 읽음
+            busy = False
+            for sub in os.listdir(path):
+                if not sub.startswith(EXTMEM_PREFIX):
+                    continue
+                tmp = os.path.join(path, sub)
+                if now - os.path.getmtime(tmp) > EXTMEM_STALE_S:
+                    shutil.rmtree(tmp, ignore_errors=True)
+                else:
+                    busy = True
+        except OSError:
+            continue  # 파일이거나 다른 프로세스가 방금 삭제
+        rows.append((last_used, path, _dir_bytes(path), busy))
+    return sorted(rows)
+
+
+def evict_cache(cache_dir=CACHE_DIR, max_bytes=None, keep=None):
+    # 오래 안 쓴 폴더부터 삭제해 용량 한도 이하로 (keep: 방금 쓴 폴더 / 사용 중인 폴더는 한도를 넘어도 남김)
+    max_bytes = int(CACHE_MAX_GB * 2 ** 30 if max_bytes is None else max_bytes)
+    entries = cache_entries(cache_dir)
+    total = sum(size for _, _, size, _ in entries)
+    removed = []
+    for _, path, size, busy in entries:
+        if total <= max_bytes:
+            break
+        if busy or (keep is not None and os.path.abspath(path) == os.path.abspath(keep)):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed.append(path)
+    return removed
+
+
+# ==========================================
+# 5. 파이프라인 (run_training의 out-of-core 버전)
+# ==========================================
+def evaluate_stream(artifact, stream):
+    # 평가 행을 배치로 예측 -> (지표, 연도별 리포트 DataFrame, 실제값, 예측값)
+    years, actual, preds = [], [], []
+    with trace.span('predict', rows=stream.count(ROLE_TEST)):
+        for X, y, year, _ in stream.batches(ROLE_TEST):
+            preds.append(artifact.predict_matrix(X))
+            actual.append(np.expm1(y))
+            years.append(year)
+    y_true, y_pred = np.concatenate(actual), np.concatenate(preds)
+    metrics, results_df = score_predictions(artifact, np.concatenate(years), y_true, y_pred)
+    return metrics, results_df, y_true, y_pred
+
+
+def train_out_of_core(path, filter_spec=None, split_mode=SPLIT_AUTO, train_years=None, test_years=(),
+                      features=None, mode=MODE_SINGLE, trials=30, early_stop_rounds=10, progress=None, tuning=None,
+                      external_memory=False, batch_rows=BATCH_ROWS, cache_dir=CACHE_DIR):
+    # path: 마스터 parquet 파일 또는 atd_ingest 파티션 데이터셋 폴더
+    # 반환: TrainingResult (X_test는 평가 행 앞쪽 SAMPLE_ROWS 행, 지표/예측값은 평가 행 전체)
+    tuning = tuning or TuningConfig()
+    if tuning.cv_folds > 1:
+        raise TrainingError("🚨 out-of-core 학습은 시간 순 CV(cv_folds)를 지원하지 않습니다.")
+    started = time.perf_counter()
+    filter_spec = filter_spec or make_filter_spec()
+    stream = ParquetStream(path, features, filter_spec, split_mode, train_years, test_years, batch_rows)
+
+    with trace.span('run_training', rows=len(stream.role), mode=mode, trials=trials, out_of_core=True):
+        trainers = []
+
+        def fit(model_name, leg_progress=progress, n_jobs=-1):
+            # 갈래마다 트레이너 하나 (진행 이벤트 / 코어 수가 갈래별, 행렬과 캐시 파일은 갈래끼리 겹치지 않음)
+            trainer = OutOfCoreTrainer(stream, tuning, external_memory, cache_dir, n_jobs, leg_progress)
+            trainers.append(trainer)
+            return trainer, trainer.fit_leg(model_name, trials, early_stop_rounds)
+
+        try:
+            lgb_best = meta_model = None
+            final_model_name = "XGBoost (Single)"
+            if mode != MODE_STACKING:
+                _, xgb_best = fit('XGBoost')
+            else:
+                # 두 베이스 모델을 동시에 학습 (메모리 학습과 같은 갈래 실행 / 취소 처리)
+                (_, xgb_best), (lgb_trainer, lgb_best) = run_stacking_legs(fit, progress)
+                _emit(progress, type='stage', stage='meta', message="🎉 메타 모델(Stacking) 가중치 조율 중...")
+                with trace.span('meta fit', rows=lgb_trainer.n_valid):
+                    meta_X, meta_y = lgb_trainer.meta_inputs(xgb_best, lgb_best)
+                    meta_model = sklinear.LinearRegression(positive=True).fit(meta_X, meta_y)
+                final_model_name = "Stacking (Ensemble)"
+        finally:
+            for trainer in trainers:
+                trainer.close()
+            evict_cache(cache_dir, keep=os.path.join(cache_dir, stream.fingerprint[:16]))
+
+        config = {'trials': int(trials), 'early_stop_rounds': int(early_stop_rounds), 'tuning': vars(tuning),
+                  'out_of_core': {'external_memory': bool(external_memory), 'batch_rows': stream.batch_rows}}
+        artifact = ModelArtifact(xgb_best, meta_model, stream.features, mode, final_model_name, lgb_model=lgb_best,
+                                 filter_spec=filter_spec, split_mode=split_mode,
+                                 train_years=stream.train_years, test_years=stream.test_years,
+                                 data_hash=stream.fingerprint, config=config,
+                                 schema=feature_profile(stream.sample(ROLE_FULL)))
+
+        elapsed = time.perf_counter() - started
+        metrics, results_df, y_test_real, final_preds = evaluate_stream(artifact, stream)
+        n_train_full = stream.count(ROLE_FULL)
+        metrics.update({
+            'Train_Rows': n_train_full,
+            'Train_Seconds': round(elapsed, 3),
+            'Rows_Per_Sec': round(n_train_full / elapsed, 1) if elapsed > 0 else None,
+        })
+        artifact.metrics = metrics
+        return TrainingResult(artifact, metrics, results_df, y_test_real, final_preds, stream.sample(ROLE_TEST))
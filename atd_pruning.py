@@ -0,0 +1,43 @@
+import optuna
+import xgboost as xgb
+
+# ==========================================
+# Optuna 라운드 단위 가지치기 콜백 (XGBoost / LightGBM)
+#  - trial 도중 검증 MAE(분)를 report_every 라운드마다 보고 -> pruner가 가망 없다고 보면 TrialPruned
+#  - XGBoost 콜백은 xgboost 기반 클래스를 상속하므로 이 모듈은 xgboost를 import함
+#    -> atd_engine / atd_outofcore는 atd_lazy로 가지치기를 쓰는 시점에 이 모듈을 읽음
+# ==========================================
+
+
+def report_round(trial, step, value):
+    trial.report(value, step)
+    if trial.should_prune():
+        raise optuna.TrialPruned(f"pruned at step {step}")
+
+
+class XGBPruningCallback(xgb.callback.TrainingCallback):
+    def __init__(self, trial, report_every):
+        super().__init__()
+        self.trial = trial
+        self.report_every = report_every
+
+    def after_iteration(self, model, epoch, evals_log):
+        if (epoch + 1) % self.report_every == 0:
+            report_round(self.trial, epoch, evals_log['validation_0']['mae_minutes'][-1])
+        return False
+
+
+class LGBPruningCallback:
+    order = 30
+    before_iteration = False
+
+    def __init__(self, trial, report_every):
+        self.trial = trial
+        self.report_every = report_every
+
+    def __call__(self, env):
+        if (env.iteration + 1) % self.report_every:
+            return
+        for _, metric, value, _ in env.evaluation_result_list:
+            if metric == 'mae_minutes':
+                report_round(self.trial, env.iteration, value)
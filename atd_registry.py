@@ -0,0 +1,164 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+import atd_lazy as lazy
+from atd_engine import ModelArtifact
+
+# LightGBM은 스태킹 모델을 불러올 때만 import
+joblib = lazy.module('joblib')
+lgb = lazy.module('lightgbm')
+xgb = lazy.module('xgboost')
+
+# ==========================================
+# ATD-RAM 모델 레지스트리 (로컬 폴더)
+#  - 모델 ID = 학습 데이터 해시 + 학습 설정 해시 + 등록마다 고유한 접미사
+#      (같은 데이터/설정으로 다시 학습해도, 동시에 등록해도 기존 모델을 덮어쓰지 않음)
+#  - <root>/<model_id>/
+#      manifest.json  : 변수 목록/입력 스키마, 필터 스펙, 학습/평가 연도, 성능 지표 등
+#      xgb.ubj        : XGBoost 부스터 (네이티브 바이너리)
+#      lgb.txt        : LightGBM 부스터 (네이티브 포맷, 스태킹 모드만)
+#      meta.joblib    : 스태킹 메타 모델 (스태킹 모드만)
+# ==========================================
+
+DEFAULT_ROOT = os.environ.get('ATD_MODEL_REGISTRY', 'model_registry')
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+ID_ATTEMPTS = 5
+
+
+def model_key(artifact):
+    config = {
+        'features': artifact.features,
+        'mode': artifact.mode,
+        'filter_spec': artifact.filter_spec,
+        'split_mode': artifact.split_mode,
+        'train_years': artifact.train_years,
+        'test_years': artifact.test_years,
+        'config': artifact.config,
+    }
+    payload = json.dumps(config, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(f"{artifact.data_hash}:{payload}".encode('utf-8')).hexdigest()[:16]
+
+
+class ModelRegistry:
+    def __init__(self, root=None):
+        self.root = root or DEFAULT_ROOT
+
+    def _dir(self, model_id):
+        return os.path.join(self.root, model_id)
+
+    def register(self, artifact):
+        key = model_key(artifact)
+        # 임시 폴더에 다 쓴 뒤 한 번에 이름을 바꿈 (읽는 쪽은 완성된 모델 폴더만 봄)
+        tmp_dir = self._dir(f".{key}-{uuid.uuid4().hex}.tmp")
+        os.makedirs(tmp_dir)
+
+        artifact.xgb_model.save_model(os.path.join(tmp_dir, 'xgb.ubj'))
+        if artifact.lgb_model is not None:
+            booster = getattr(artifact.lgb_model, 'booster_', artifact.lgb_model)
+            booster.save_model(os.path.join(tmp_dir, 'lgb.txt'))
+        if artifact.meta_model is not None:
+            joblib.dump(artifact.meta_model, os.path.join(tmp_dir, 'meta.joblib'))
+
+        manifest = {
+            'model_id': None,
+            'model_key': key,
+            'format_version': FORMAT_VERSION,
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'model_name': artifact.model_name,
+            'mode': artifact.mode,
+            'features': artifact.features,
+            'filter_spec': artifact.filter_spec,
+            'split_mode': artifact.split_mode,
+            'train_years': artifact.train_years,
+            'test_years': artifact.test_years,
+            'data_hash': artifact.data_hash,
+            'config': artifact.config,
+            'metrics': artifact.metrics,
+            'schema': getattr(artifact, 'schema', None),
+        }
+        for _ in range(ID_ATTEMPTS):
+            model_id = f"{key}-{uuid.uuid4().hex[:6]}"
+            manifest['model_id'] = model_id
+            with open(os.path.join(tmp_dir, MANIFEST), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2, default=str)
+            try:
+                # 같은 ID 폴더가 이미 있으면 (비어 있지 않으므로) 이름 바꾸기가 실패 -> 새 접미사로 다시
+                os.rename(tmp_dir, self._dir(model_id))
+                break
+            except OSError:
+                if not os.path.isdir(self._dir(model_id)):
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+                    raise
+        else:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise FileExistsError(f"could not allocate a unique model id for {key}")
+        artifact.model_id = model_id
+        return model_id
+
+    def manifest(self, model_id):
+        with open(os.path.join(self._dir(model_id), MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+
+    def list(self):
+        # 최신 모델이 앞에 오도록 정렬된 manifest 목록
+        if not os.path.isdir(self.root):
+            return []
+        manifests = []
+        for name in os.listdir(self.root):
+            if not name.startswith('.') and os.path.exists(os.path.join(self._dir(name), MANIFEST)):
+                manifests.append(self.manifest(name))
+        return sorted(manifests, key=lambda m: m['created_at'], reverse=True)
+
+    def load(self, model_id):
+        manifest = self.manifest(model_id)
+        model_dir = self._dir(model_id)
+
+        xgb_model = xgb.XGBRegressor()
+        xgb_model.load_model(os.path.join(model_dir, 'xgb.ubj'))
+        lgb_path = os.path.join(model_dir, 'lgb.txt')
+        lgb_model = lgb.Booster(model_file=lgb_path) if os.path.exists(lgb_path) else None
+        meta_path = os.path.join(model_dir, 'meta.joblib')
+        meta_model = joblib.load(meta_path) if os.path.exists(meta_path) else None
+
+        artifact = ModelArtifact(xgb_model, meta_model, manifest['features'], manifest['mode'], manifest['model_name'],
+                                 lgb_model=lgb_model, filter_spec=manifest['filter_spec'],
+                                 split_mode=manifest['split_mode'], train_years=manifest['train_years'],
+                                 test_years=manifest['test_years'], metrics=manifest['metrics'],
+                                 data_hash=manifest['data_hash'], config=manifest['config'],
+                                 schema=manifest.get('schema'))
+        artifact.model_id = model_id
+        return artifact
+
+    def delete(self, model_id):
+        shutil.rmtree(self._dir(model_id), ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ATD-RAM 모델 레지스트리")
+    parser.add_argument('--registry', default=None, help="레지스트리 폴더 (기본값: $ATD_MODEL_REGISTRY 또는 ./model_registry)")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help="등록된 모델 목록")
+    show = sub.add_parser('show', help="모델 manifest 출력")
+    show.add_argument('model_id')
+    delete = sub.add_parser('delete', help="모델 삭제")
+    delete.add_argument('model_id')
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.registry)
+    if args.command == 'list':
+        for m in registry.list():
+            print(f"{m['model_id']}  {m['created_at']}  {m['model_name']:<22} MAE {m['metrics'].get('MAE', float('nan')):.2f}  train {m['train_years']}")
+    elif args.command == 'show':
+        print(json.dumps(registry.manifest(args.model_id), ensure_ascii=False, indent=2))
+    else:
+        registry.delete(args.model_id)
+
+
+if __name__ == '__main__':
+    main()
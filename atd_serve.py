@@ -0,0 +1,255 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import numpy as np
+
+from atd_engine import ID_COLS
+from atd_registry import ModelRegistry
+
+# ==========================================
+# ATD-RAM 실시간 예측 서비스 (asyncio HTTP 서버)
+#  - 레지스트리 모델을 한 번만 로드
+#  - 동시에 들어온 요청들을 마이크로 배치로 묶어 부스터당 한 번의 inplace_predict로 처리
+#  - 스태킹 파이프라인 + Physical_Min_Taxi 하한 적용 (ModelArtifact.predict_matrix)
+#
+#  POST /predict  {"flights": [{feature: value, ...}, ...]}  또는 {"flight": {...}}
+#  GET  /model    모델 정보 (변수 목록, 입력 스키마, 성능 지표)
+#  GET  /health
+# ==========================================
+
+MAX_BODY_BYTES = 32 * 1024 * 1024
+
+log = logging.getLogger(__name__)
+
+
+class RequestError(Exception):
+    pass
+
+
+def _flight_list(payload):
+    if isinstance(payload, dict) and 'flights' in payload:
+        flights = payload['flights']
+    elif isinstance(payload, dict) and 'flight' in payload:
+        flights = [payload['flight']]
+    elif isinstance(payload, dict):
+        flights = [payload]
+    else:
+        flights = payload
+    if not isinstance(flights, list) or not all(isinstance(f, dict) for f in flights):
+        raise RequestError("flights must be a list of objects")
+    return flights
+
+
+class InputContract:
+    # 모델 입력 스키마(feature_profile) 기반 요청 검증 + 파싱
+    #  - 스키마가 있으면 모르는 변수 이름(식별 컬럼 제외)과 선택형 변수의 허용되지 않은 값은 400
+    #  - 없는 변수는 NaN (결측 처리), 스키마가 없는 예전 모델은 변수 이름만 사용
+    def __init__(self, features, schema=None):
+        self.features = list(features)
+        self.schema = schema or {}
+        self.index = {name: j for j, name in enumerate(self.features)}
+        self.choices = [(j, name, np.asarray(self.schema[name]['categories'], dtype=np.float64))
+                        for j, name in enumerate(self.features) if self.schema.get(name, {}).get('kind') == 'choice']
+
+    def parse(self, payload):
+        # JSON 항공편 목록 -> 피처 순서대로 정렬된 float 배열
+        flights = _flight_list(payload)
+        X = np.full((len(flights), len(self.features)), np.nan)
+        for i, flight in enumerate(flights):
+            for key, value in flight.items():
+                j = self.index.get(key)
+                if j is None:
+                    if self.schema and key not in ID_COLS:
+                        raise RequestError(f"flight {i}: unknown feature '{key}'")
+                    continue
+                try:
+                    X[i, j] = math.nan if value is None else float(value)
+                except (TypeError, ValueError):
+                    raise RequestError(f"flight {i}: non-numeric value for '{key}': {value!r}")
+
+        for j, name, categories in self.choices:
+            column = X[:, j]
+            bad = ~np.isnan(column) & ~np.isin(column, categories)
+            if bad.any():
+                i = int(np.flatnonzero(bad)[0])
+                raise RequestError(f"flight {i}: '{name}' must be one of {categories.tolist()}, got {column[i]}")
+        return X
+
+
+class MicroBatcher:
+    # max_wait_ms 동안 모인 요청(최대 max_batch 행)을 하나의 행렬로 합쳐 예측
+    def __init__(self, predict_fn, max_batch=2048, max_wait_ms=5.0):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(1)
+        self.stats = {'requests': 0, 'rows': 0, 'batches': 0}
+
+    async def submit(self, X):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((X, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            n_rows = len(pending[0][0])
+            deadline = loop.time() + self.max_wait
+            while n_rows < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                n_rows += len(item[0])
+
+            X = np.vstack([x for x, _ in pending])
+            try:
+                preds = await loop.run_in_executor(self.executor, self.predict_fn, X)
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.stats['requests'] += len(pending)
+            self.stats['rows'] += len(X)
+            self.stats['batches'] += 1
+            start = 0
+            for x, future in pending:
+                if not future.done():
+                    future.set_result(preds[start:start + len(x)])
+                start += len(x)
+
+
+class PredictionService:
+    def __init__(self, artifact, max_batch=2048, max_wait_ms=5.0):
+        self.artifact = artifact
+        self.contract = InputContract(artifact.features, getattr(artifact, 'schema', None))
+        self.batcher = MicroBatcher(artifact.predict_matrix, max_batch, max_wait_ms)
+
+    async def predict(self, payload):
+        X = self.contract.parse(payload)
+        if len(X) == 0:
+            return []
+        return (await self.batcher.submit(X)).tolist()
+
+    def model_info(self):
+        return {
+            'model_id': self.artifact.model_id,
+            'model_name': self.artifact.model_name,
+            'features': self.artifact.features,
+            'schema': self.contract.schema,
+            'metrics': {k: v for k, v in self.artifact.metrics.items() if k != 'Yearly'},
+        }
+
+    async def handle(self, method, path, body):
+        # 예상하지 못한 예외(모델 예측 실패 등)도 연결을 끊지 않고 500 응답으로 돌려줌
+        try:
+            return await self._route(method, path, body)
+        except Exception as e:
+            log.exception("request failed: %s %s", method, path)
+            return 500, {'error': f"internal error: {type(e).__name__}"}
+
+    async def _route(self, method, path, body):
+        if method == 'GET' and path == '/health':
+            return 200, {'status': 'ok', **self.batcher.stats}
+        if method == 'GET' and path == '/model':
+            return 200, self.model_info()
+        if method == 'POST' and path == '/predict':
+            started = time.perf_counter()
+            try:
+                preds = await self.predict(json.loads(body or b'null'))
+            except (RequestError, json.JSONDecodeError) as e:
+                return 400, {'error': str(e)}
+            return 200, {'model_id': self.artifact.model_id, 'predictions': preds,
+                         'latency_ms': round((time.perf_counter() - started) * 1000, 3)}
+        return 404, {'error': f"unknown route {method} {path}"}
+
+    async def serve_connection(self, reader, writer):
+        # HTTP/1.1 keep-alive 연결 하나에서 요청을 순서대로 처리
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    status, response = 413, {'error': "request body too large"}
+                    body = None
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, response = await self.handle(method.upper(), path.split('?', 1)[0], body)
+
+                data = json.dumps(response, ensure_ascii=False).encode('utf-8')
+                keep_alive = headers.get('connection', '').lower() != 'close' and body is not None
+                writer.write(f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                             f"Content-Type: application/json; charset=utf-8\r\n"
+                             f"Content-Length: {len(data)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8600):
+        batch_task = asyncio.create_task(self.batcher.run())
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        print(f"serving model {self.artifact.model_id} ({self.artifact.model_name}) on http://{host}:{port}", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batch_task.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ATD-RAM 실시간 예측 서비스")
+    parser.add_argument('--model-id', help="레지스트리 모델 ID (기본값: 가장 최근 모델)")
+    parser.add_argument('--registry', default=None, help="모델 레지스트리 폴더")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--max-batch', type=int, default=2048, help="마이크로 배치 최대 행 수")
+    parser.add_argument('--max-wait-ms', type=float, default=5.0, help="마이크로 배치 최대 대기 시간 (ms)")
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.registry)
+    model_id = args.model_id
+    if model_id is None:
+        registered = registry.list()
+        if not registered:
+            parser.exit(1, "no registered models\n")
+        model_id = registered[0]['model_id']
+
+    service = PredictionService(registry.load(model_id), args.max_batch, args.max_wait_ms)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+import argparse
+import hashlib
+import os
+import threading
+import time
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+import atd_engine as engine
+import atd_trace as trace
+
+# ==========================================
+# ATD-RAM 공유 데이터셋 저장소 (세션/워커 프로세스 공통)
+#  - 업로드된 마스터 parquet -> 내용 해시(sha256) 이름의 압축 없는 Arrow IPC(Feather v2) 파일로 한 번만 변환
+#      <root>/<digest>.arrow          : load_master 결과
+#      <root>/<digest>-compact.arrow  : 메모리 절약 모드 (compact_frame) 결과
+#  - 읽기는 읽기 전용 memory map -> 숫자/시각 컬럼은 파일 페이지를 그대로 가리키는 배열 (복사 없음)
+#    같은 데이터를 여는 세션/학습 워커는 OS 페이지 캐시 한 벌만 공유 (분석가 10명 != 메모리 10배)
+#  - 문자열은 Arrow 문자열(string[pyarrow])로 받아 파이썬 객체로 풀지 않음
+#  - 최근 사용 시각(mtime) 기준 LRU로 용량 한도를 넘는 오래된 데이터셋 삭제
+#    (열려 있는 매핑은 삭제 후에도 유효 -> 사용 중인 세션은 영향 없음)
+# ==========================================
+
+DEFAULT_ROOT = os.environ.get('ATD_STORE', 'atd_store')
+DEFAULT_MAX_GB = float(os.environ.get('ATD_STORE_MAX_GB', 8))
+FORMAT_VERSION = 2  # 1: 혼잡 피처를 읽기 시점에 추가하던 형식
+SUFFIX = '.arrow'
+HASH_CHUNK = 1 << 20
+
+_STRING_TYPES = {pa.string(): pd.StringDtype('pyarrow'), pa.large_string(): pd.StringDtype('pyarrow')}
+
+
+def content_hash(source):
+    # source: 파일 경로 또는 업로드된 파일 객체 (읽은 뒤 처음 위치로 되돌림)
+    h = hashlib.sha256(f"atd-store-v{FORMAT_VERSION}".encode('utf-8'))
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+                h.update(chunk)
+    else:
+        source.seek(0)
+        for chunk in iter(lambda: source.read(HASH_CHUNK), b''):
+            h.update(chunk)
+        source.seek(0)
+    return h.hexdigest()[:32]
+
+
+class DatasetStore:
+    def __init__(self, root=None, max_bytes=None):
+        self.root = root or DEFAULT_ROOT
+        self.max_bytes = int(max_bytes if max_bytes is not None else DEFAULT_MAX_GB * 2 ** 30)
+        self._lock = threading.Lock()
+
+    def path(self, digest, compact=False):
+        return os.path.join(self.root, f"{digest}{'-compact' if compact else ''}{SUFFIX}")
+
+    def exists(self, digest, compact=False):
+        return os.path.exists(self.path(digest, compact))
+
+    # ---- 쓰기 ----
+    def put(self, source, compact=False):
+        # 같은 내용이면 변환 없이 기존 파일 재사용 -> 데이터셋 ID(digest) 반환
+        digest = content_hash(source)
+        path = self.path(digest, compact)
+        if os.path.exists(path):
+            self._touch(path)
+            return digest
+        with trace.span('store put') as span:
+            df, _ = engine.load_master(source, compact)
+            span.rows = len(df)
+            os.makedirs(self.root, exist_ok=True)
+            # 임시 파일에 다 쓴 뒤 rename -> 동시에 같은 파일을 올려도 읽는 쪽은 완성된 파일만 봄
+            tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+            try:
+                feather.write_feather(df, tmp, compression='uncompressed')
+                os.replace(tmp, path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        self.evict(keep=path)
+        return digest
+
+    # ---- 읽기 ----
+    def table(self, digest, compact=False):
+        path = self.path(digest, compact)
+        self._touch(path)
+        return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+    def frame(self, digest, compact=False):
+        # split_blocks: 컬럼마다 별도 블록 -> 결측 없는 숫자/시각 컬럼은 매핑된 버퍼를 그대로 사용 (읽기 전용)
+        with trace.span('store open') as span:
+            df = self.table(digest, compact).to_pandas(split_blocks=True, types_mapper=_STRING_TYPES.get)
+            span.rows = len(df)
+        return df
+
+    # ---- LRU 관리 ----
+    @staticmethod
+    def _touch(path):
+        # atime은 noatime/relatime 마운트에서 믿을 수 없으므로 mtime을 최근 사용 시각으로 씀
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def entries(self):
+        rows = []
+        if os.path.isdir(self.root):
+            for name in os.listdir(self.root):
+                if not name.endswith(SUFFIX):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.root, name))
+                except OSError:
+                    continue  # 다른 프로세스가 방금 삭제
+                digest = name[:-len(SUFFIX)]
+                compact = digest.endswith('-compact')
+                rows.append({'digest': digest.removesuffix('-compact'), 'compact': compact,
+                             'bytes': stat.st_size,
+                             'size_mb': round(stat.st_size / 2 ** 20, 1), 'last_used': stat.st_mtime,
+                             'path': os.path.join(self.root, name)})
+        frame = pd.DataFrame(rows, columns=['digest', 'compact', 'bytes', 'size_mb', 'last_used', 'path'])
+        frame['last_used'] = pd.to_datetime(frame['last_used'], unit='s')
+        return frame.sort_values('last_used', ascending=False, ignore_index=True)
+
+    def total_bytes(self):
+        return int(self.entries()['bytes'].sum())
+
+    def evict(self, max_bytes=None, keep=None):
+        # 오래 안 쓴 순서대로 삭제 (keep: 방금 추가한 파일은 한도를 넘어도 남김)
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        removed = []
+        with self._lock:
+            entries = self.entries().iloc[::-1]
+            total = int(entries['bytes'].sum())
+            for path, size in zip(entries['path'], entries['bytes']):
+                if total <= max_bytes:
+                    break
+                if keep is not None and os.path.abspath(path) == os.path.abspath(keep):
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed.append(path)
+        return removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ATD-RAM 공유 데이터셋 저장소 (memory-mapped Arrow)")
+    parser.add_argument('--root', default=None, help="저장소 폴더 (기본값: $ATD_STORE 또는 ./atd_store)")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help="저장된 데이터셋 목록 (최근 사용 순)")
+    put = sub.add_parser('put', help="마스터 parquet을 저장소에 추가")
+    put.add_argument('parquet')
+    put.add_argument('--compact', action='store_true')
+    evict = sub.add_parser('evict', help="용량 한도까지 오래된 데이터셋 삭제")
+    evict.add_argument('--max-gb', type=float, default=DEFAULT_MAX_GB)
+    args = parser.parse_args(argv)
+
+    store = DatasetStore(args.root)
+    if args.command == 'list':
+        print(store.entries().drop(columns=['bytes', 'path']).to_string(index=False))
+    elif args.command == 'put':
+        started = time.perf_counter()
+        digest = store.put(args.parquet, args.compact)
+        print(f"{digest}  {store.path(digest, args.compact)}  ({time.perf_counter() - started:.1f}s)")
+    else:
+        for path in store.evict(int(args.max_gb * 2 ** 30)):
+            print(f"removed {path}")
+
+
+if __name__ == '__main__':
+    main()
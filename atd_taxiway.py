@@ -0,0 +1,215 @@
+import argparse
+import functools
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import atd_lazy as lazy
+from atd_geo import EARTH_RADIUS_M, RUNWAY_ENDS, STANDS_CSV, TAXIWAY_FILE, haversine_m, load_stands
+
+# 그래프 라이브러리는 그래프를 만들 때 import (atd_lazy)
+sparse = lazy.module('scipy.sparse')
+csgraph = lazy.module('scipy.sparse.csgraph')
+skneighbors = lazy.module('sklearn.neighbors')
+
+# ==========================================
+# RKSI 유도로 그래프 + 운영 방향별 최단 경로 사전 계산
+#  - 유도로 중심선 파일: GeoJSON LineString (예: OSM aeroway=taxiway 추출본)
+#      properties.ref 또는 properties.name = 유도로 이름 (A, B, ... / 경로 혼잡 피처에 사용)
+#      같은 좌표를 공유하는 꼭짓점 = 교차점
+#  - 주기장 / 활주로 시단을 가장 가까운 그래프 노드에 연결 (BallTree)
+#  - 활주로 시단마다 Dijkstra 한 번 -> 운영 방향별 (주기장 x 출발 활주로) 경로 거리 행렬 + 사용 유도로 비트마스크
+#    조회는 배열 인덱싱 O(1)
+# ==========================================
+
+COORD_DECIMALS = 6  # 약 0.1 m 이내 꼭짓점은 같은 노드로 취급
+
+# 출발 활주로 운영 방향
+RUNWAY_CONFIGS = {
+    '33L/34R': ['33L', '34R'],
+    '33R/34L': ['33R', '34L'],
+    '15R/16L': ['15R', '16L'],
+    '15L/16R': ['15L', '16R'],
+    'ALL': list(RUNWAY_ENDS),
+}
+
+
+def read_taxiways(path=TAXIWAY_FILE):
+    # GeoJSON -> [(유도로 이름, [(lat, lon), ...]), ...]
+    with open(path, encoding='utf-8') as f:
+        collection = json.load(f)
+    lines = []
+    for feature in collection.get('features', []):
+        geometry = feature.get('geometry') or {}
+        props = feature.get('properties') or {}
+        name = str(props.get('ref') or props.get('name') or '')
+        if geometry.get('type') == 'LineString':
+            parts = [geometry['coordinates']]
+        elif geometry.get('type') == 'MultiLineString':
+            parts = geometry['coordinates']
+        else:
+            continue
+        for coords in parts:
+            lines.append((name, [(lat, lon) for lon, lat, *_ in coords]))
+    return lines
+
+
+class TaxiwayGraph:
+    def __init__(self, lines, stands, runways=None):
+        runways = runways or RUNWAY_ENDS
+        node_ids = {}
+        edges = {}  # (작은 노드, 큰 노드) -> 유도로 비트마스크 (겹치는 선분은 한 간선으로 합침)
+        names = sorted({name for name, _ in lines if name})
+        self.taxiway_names = names[:63]  # 비트마스크(uint64)에 들어가는 만큼
+        bit = {name: 1 << i for i, name in enumerate(self.taxiway_names)}
+
+        for name, coords in lines:
+            prev = None
+            for lat, lon in coords:
+                key = (round(lat, COORD_DECIMALS), round(lon, COORD_DECIMALS))
+                node = node_ids.setdefault(key, len(node_ids))
+                if prev is not None and prev != node:
+                    pair = (min(prev, node), max(prev, node))
+                    edges[pair] = edges.get(pair, 0) | int(bit.get(name, 0))
+                prev = node
+
+        if not node_ids:
+            raise ValueError("taxiway file has no LineString geometry")
+        self.node_latlon = np.array(list(node_ids), dtype=np.float64)
+        n_nodes = len(self.node_latlon)
+
+        # 주기장 / 활주로 시단 -> 최근접 노드 연결 (연결 구간 길이는 경로 거리에 더함)
+        tree = skneighbors.BallTree(np.radians(self.node_latlon), metric='haversine')
+        self.stand_ids = pd.Index(stands['Stand_ID'].astype(str))
+        self.runway_names = pd.Index(list(runways))
+        stand_latlon = stands[['Lat', 'Lon']].to_numpy(dtype=np.float64)
+        runway_latlon = np.array([runways[r] for r in self.runway_names], dtype=np.float64)
+        stand_gap, self.stand_node = (a[:, 0] for a in tree.query(np.radians(stand_latlon), k=1))
+        runway_gap, self.runway_node = (a[:, 0] for a in tree.query(np.radians(runway_latlon), k=1))
+        self.stand_gap_m = stand_gap * EARTH_RADIUS_M
+        self.runway_gap_m = runway_gap * EARTH_RADIUS_M
+
+        pairs = np.array(list(edges), dtype=np.int64).reshape(-1, 2)
+        src, dst = pairs[:, 0], pairs[:, 1]
+        weight = haversine_m(self.node_latlon[src, 0], self.node_latlon[src, 1],
+                             self.node_latlon[dst, 0], self.node_latlon[dst, 1])
+        self.graph = sparse.coo_matrix((np.maximum(weight, 1e-3), (src, dst)), shape=(n_nodes, n_nodes)).tocsr()
+        self.edge_mask = {}
+        for (a, b), m in edges.items():
+            self.edge_mask[(a, b)] = self.edge_mask[(b, a)] = m
+
+        self._precompute()
+
+    def _precompute(self):
+        # 활주로 시단마다 Dijkstra 한 번 (무방향) -> 모든 주기장까지 거리 + 경로상 유도로 비트마스크
+        dist, pred = csgraph.dijkstra(self.graph, directed=False, indices=self.runway_node, return_predecessors=True)
+        self.predecessors = pred.astype(np.int32)
+        n_stands, n_runways = len(self.stand_ids), len(self.runway_names)
+
+        route = dist[:, self.stand_node].T + self.stand_gap_m[:, None] + self.runway_gap_m[None, :]
+        self.route_m = np.where(np.isfinite(route), route, np.nan).astype(np.float32)  # (주기장, 활주로)
+
+        self.route_mask = np.zeros((n_stands, n_runways), dtype=np.uint64)
+        for r in range(n_runways):
+            self.route_mask[:, r] = self._node_masks(dist[r], self.predecessors[r])[self.stand_node]
+
+        # 운영 방향별 (주기장, 방향 내 활주로) 행렬 = 전체 행렬의 열 부분집합
+        self.configs = {}
+        for config, ends in RUNWAY_CONFIGS.items():
+            cols = self.runway_names.get_indexer(ends)
+            cols = cols[cols >= 0]
+            self.configs[config] = (self.runway_names[cols], self.route_m[:, cols], self.route_mask[:, cols])
+
+    def _node_masks(self, dist, pred):
+        # 최단 경로 트리를 거리 오름차순으로 훑으며 부모 마스크를 물려받음 -> 각 노드까지 경로에 쓰인 유도로 비트마스크
+        masks = [0] * len(pred)
+        for node in np.argsort(dist)[:np.isfinite(dist).sum()].tolist():
+            parent = int(pred[node])
+            if parent >= 0:
+                masks[node] = masks[parent] | self.edge_mask.get((parent, node), 0)
+        return np.array(masks, dtype=np.uint64)
+
+    def route(self, stand_ids, runways):
+        # 배치 조회 (O(1)/건): 경로 거리(m), 사용 유도로 비트마스크 / 모르는 주기장·활주로는 NaN, 0
+        stand_idx = self.stand_ids.get_indexer(pd.Index(np.asarray(stand_ids)).astype(str))
+        runway_idx = self.runway_names.get_indexer(pd.Index(np.asarray(runways)).astype(str))
+        valid = (stand_idx >= 0) & (runway_idx >= 0)
+        dist = np.full(len(stand_idx), np.nan)
+        mask = np.zeros(len(stand_idx), dtype=np.uint64)
+        dist[valid] = self.route_m[stand_idx[valid], runway_idx[valid]]
+        mask[valid] = self.route_mask[stand_idx[valid], runway_idx[valid]]
+        return dist, mask
+
+    def config_matrix(self, config):
+        # 운영 방향 하나의 (주기장 x 출발 활주로) 경로 거리 표
+        runways, route_m, _ = self.configs[config]
+        return pd.DataFrame(route_m, index=self.stand_ids, columns=runways)
+
+    def taxiway_flags(self, masks):
+        # 비트마스크 -> 유도로별 0/1 컬럼 (Taxiway_<이름>_Used)
+        masks = np.asarray(masks, dtype=np.uint64)
+        return pd.DataFrame({f"Taxiway_{name}_Used": ((masks >> np.uint64(i)) & np.uint64(1)).astype(np.int8)
+                             for i, name in enumerate(self.taxiway_names)})
+
+    def path(self, stand_id, runway):
+        # 지도 표시용 경로 좌표 [(lat, lon), ...] (주기장 -> 활주로 시단)
+        s = self.stand_ids.get_loc(str(stand_id))
+        r = self.runway_names.get_loc(runway)
+        pred = self.predecessors[r]
+        node = self.stand_node[s]
+        nodes = [node]
+        while pred[node] >= 0:
+            node = pred[node]
+            nodes.append(node)
+        if node != self.runway_node[r]:
+            return []
+        return [tuple(p) for p in self.node_latlon[nodes]]
+
+    def geojson(self):
+        # 지도 레이어용 유도로 네트워크 (간선 단위 LineString)
+        coo = self.graph.tocoo()
+        features = [
+            {'type': 'Feature',
+             'geometry': {'type': 'LineString', 'coordinates': [[self.node_latlon[a, 1], self.node_latlon[a, 0]],
+                                                                 [self.node_latlon[b, 1], self.node_latlon[b, 0]]]},
+             'properties': {}}
+            for a, b in zip(coo.row.tolist(), coo.col.tolist())
+        ]
+        return {'type': 'FeatureCollection', 'features': features}
+
+
+@functools.lru_cache(maxsize=2)
+def _graph(path, mtime, stands_path, stands_mtime):
+    return TaxiwayGraph(read_taxiways(path), load_stands(stands_path))
+
+
+def load_graph(path=TAXIWAY_FILE, stands_path=STANDS_CSV):
+    # 유도로 파일이 없으면 None (거리 피처는 atd_geo의 근사 경로 거리 사용)
+    if not os.path.exists(path):
+        return None
+    return _graph(os.path.abspath(path), os.path.getmtime(path), os.path.abspath(stands_path), os.path.getmtime(stands_path))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RKSI 유도로 그래프 최단 경로")
+    parser.add_argument('--graph', default=TAXIWAY_FILE, help="유도로 중심선 GeoJSON")
+    parser.add_argument('--stands', default=STANDS_CSV)
+    parser.add_argument('--config', choices=list(RUNWAY_CONFIGS), default='ALL')
+    parser.add_argument('--out', help="경로 거리 행렬 CSV 저장 경로 (기본값: 요약만 출력)")
+    args = parser.parse_args(argv)
+
+    graph = load_graph(args.graph, args.stands)
+    if graph is None:
+        parser.exit(1, f"no taxiway file at {args.graph}\n")
+    table = graph.config_matrix(args.config)
+    if args.out:
+        table.to_csv(args.out)
+    else:
+        print(f"{len(graph.node_latlon):,} nodes, {graph.graph.nnz:,} edges, {len(graph.taxiway_names)} named taxiways")
+        print(table.describe().round(0).to_string())
+
+
+if __name__ == '__main__':
+    main()
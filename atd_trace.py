@@ -0,0 +1,248 @@
+import contextvars
+import json
+import os
+import platform
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+# ==========================================
+# ATD-RAM 계측(Instrumentation) 레이어
+#  - 중첩 구간(span)마다 경과 시간 / CPU 시간(프로세스 전체) / 최대 RSS / 처리 행 수 기록
+#  - 활성 Tracer는 contextvar로 전달 -> 엔진/설명/VIF 코드는 trace.span(...)만 쓰고, Tracer가 없으면 아무것도 안 함
+#  - 최대 RSS: 열린 구간이 있는 동안만 도는 샘플링 스레드 하나가 모든 열린 구간의 최대값을 갱신
+#  - 병렬 워커 프로세스의 Optuna trial처럼 다른 프로세스에서 끝난 구간은 record()로 시작/종료 시각만 추가
+#  - 내보내기: JSON (구간 목록) / Chrome trace (chrome://tracing, Perfetto)
+# ==========================================
+
+MAX_SPANS = 5000
+SAMPLE_INTERVAL = 0.02
+
+_tracer = contextvars.ContextVar('atd_tracer', default=None)
+_parent = contextvars.ContextVar('atd_span', default=None)
+
+
+def rss_bytes():
+    # 현재 RSS (리눅스 /proc, 그 외 유닉스는 프로세스 최대 RSS로 대신함, Windows는 측정 안 함 -> 0)
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    scale = 1 if platform.system() == 'Darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class Span:
+    __slots__ = ('id', 'parent', 'name', 'rows', 'attrs', 'start', 'wall', 'cpu', 'start_rss', 'peak_rss', 'thread',
+                 'error', '_cpu0')
+
+    def __init__(self, id, parent, name, rows=None, attrs=None):
+        self.id = id
+        self.parent = parent
+        self.name = name
+        self.rows = rows
+        self.attrs = attrs or {}
+        self.start = self.wall = self.cpu = None
+        self.start_rss = self.peak_rss = None
+        self.thread = threading.get_ident()
+        self.error = None
+
+    def to_dict(self):
+        return {
+            'id': self.id, 'parent': self.parent, 'name': self.name, 'rows': self.rows,
+            'start_s': self.start, 'wall_s': self.wall, 'cpu_s': self.cpu,
+            'peak_rss_mb': None if self.peak_rss is None else round(self.peak_rss / 2 ** 20, 1),
+            'rss_delta_mb': None if self.peak_rss is None else round((self.peak_rss - self.start_rss) / 2 ** 20, 1),
+            'rows_per_s': round(self.rows / self.wall, 1) if self.rows and self.wall else None,
+            'thread': self.thread, 'error': self.error, **self.attrs,
+        }
+
+
+class _NullSpan:
+    # Tracer가 없을 때: span.rows = ... / span.attrs[...] = ... 같은 대입만 받아주고 버림
+    rows = None
+
+    @property
+    def attrs(self):
+        # 호출마다 새 dict -> 계측을 끈 동안 쓴 값이 공유 객체에 쌓이지 않음
+        return {}
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL = _NullSpan()
+
+
+class Tracer:
+    def __init__(self, max_spans=MAX_SPANS, sample_interval=SAMPLE_INTERVAL):
+        self.spans = deque(maxlen=max_spans)
+        self.sample_interval = sample_interval
+        self.t0 = time.perf_counter()
+        self.epoch0 = time.time()
+        self._ids = 0
+        self._open = {}
+        self._lock = threading.Lock()
+        self._sampler = None
+
+    # ---- 기록 ----
+    def _next_id(self):
+        with self._lock:
+            self._ids += 1
+            return self._ids
+
+    def _sample(self):
+        while True:
+            time.sleep(self.sample_interval)
+            rss = rss_bytes()
+            with self._lock:
+                if not self._open:
+                    self._sampler = None
+                    return
+                for span in self._open.values():
+                    span.peak_rss = max(span.peak_rss, rss)
+
+    @contextmanager
+    def span(self, name, rows=None, **attrs):
+        span = Span(self._next_id(), _parent.get(), name, rows, attrs)
+        span.start_rss = span.peak_rss = rss_bytes()
+        with self._lock:
+            self._open[span.id] = span
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, daemon=True, name='atd-trace-sampler')
+                self._sampler.start()
+        token = _parent.set(span.id)
+        span._cpu0 = time.process_time()
+        started = time.perf_counter()
+        span.start = started - self.t0
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.wall = time.perf_counter() - started
+            span.cpu = time.process_time() - span._cpu0
+            _parent.reset(token)
+            rss = rss_bytes()
+            with self._lock:
+                self._open.pop(span.id, None)
+                span.peak_rss = max(span.peak_rss, rss)
+                self.spans.append(span)
+
+    def record(self, name, started_at, finished_at, rows=None, **attrs):
+        # 다른 프로세스에서 끝난 구간 (시작/종료 시각: datetime 또는 epoch 초)
+        to_epoch = lambda t: t.timestamp() if hasattr(t, 'timestamp') else float(t)
+        span = Span(self._next_id(), _parent.get(), name, rows, attrs)
+        span.start = to_epoch(started_at) - self.epoch0
+        span.wall = to_epoch(finished_at) - to_epoch(started_at)
+        span.thread = 'worker'
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+    # ---- 조회 / 내보내기 ----
+    def to_frame(self):
+        # 시작 순서대로, 이름 앞에 중첩 깊이만큼 들여쓰기
+        rows = sorted((s.to_dict() for s in list(self.spans)), key=lambda r: r['start_s'])
+        depth = {}
+        for r in rows:
+            depth[r['id']] = depth[r['parent']] + 1 if r['parent'] in depth else 0
+            r['depth'] = depth[r['id']]
+            r['label'] = '  ' * r['depth'] + r['name']
+        return pd.DataFrame(rows)
+
+    def summary(self):
+        # 같은 이름 구간별 합계 (예: trial 여러 번)
+        frame = self.to_frame()
+        if frame.empty:
+            return frame
+        grouped = frame.groupby('name', sort=False).agg(
+            count=('id', 'size'), wall_s=('wall_s', 'sum'), cpu_s=('cpu_s', 'sum'),
+            peak_rss_mb=('peak_rss_mb', 'max'), rows=('rows', 'sum'))
+        return grouped.sort_values('wall_s', ascending=False).reset_index()
+
+    def to_json(self):
+        return json.dumps({'spans': [s.to_dict() for s in list(self.spans)]}, ensure_ascii=False, default=str, indent=2)
+
+    def chrome_trace(self):
+        # Chrome trace event format ("X" = 시작 + 지속시간, 마이크로초)
+        threads = {}
+        events = []
+        for s in list(self.spans):
+            tid = threads.setdefault(s.thread, len(threads) + 1)
+            args = {k: v for k, v in s.to_dict().items() if k not in ('id', 'parent', 'name', 'start_s', 'thread')}
+            events.append({'name': s.name, 'cat': 'atd', 'ph': 'X', 'pid': os.getpid(), 'tid': tid,
+                           'ts': round(s.start * 1e6, 1), 'dur': round((s.wall or 0) * 1e6, 1), 'args': args})
+        return json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'}, default=str)
+
+
+# to_dict()가 만드는 고정 필드 (나머지는 구간 속성)
+_SPAN_FIELDS = ('id', 'parent', 'name', 'rows', 'start_s', 'wall_s', 'cpu_s', 'peak_rss_mb', 'rss_delta_mb',
+                'rows_per_s', 'thread', 'error')
+
+
+def load(path):
+    # to_json()으로 저장한 구간 -> 조회/내보내기용 Tracer (학습 작업 프로세스의 계측을 앱 패널에서 볼 때)
+    with open(path, encoding='utf-8') as f:
+        rows = json.load(f)['spans']
+    tracer = Tracer()
+    for r in rows:
+        span = Span(r['id'], r['parent'], r['name'], r['rows'], {k: v for k, v in r.items() if k not in _SPAN_FIELDS})
+        span.start, span.wall, span.cpu = r['start_s'], r['wall_s'], r['cpu_s']
+        if r['peak_rss_mb'] is not None:
+            span.peak_rss = r['peak_rss_mb'] * 2 ** 20
+            span.start_rss = span.peak_rss - (r['rss_delta_mb'] or 0) * 2 ** 20
+        span.thread = r['thread']
+        span.error = r['error']
+        tracer.spans.append(span)
+    return tracer
+
+
+# ==========================================
+# 전역 진입점 (활성 Tracer가 없으면 비용 없는 no-op)
+# ==========================================
+def current():
+    return _tracer.get()
+
+
+def use(tracer):
+    # 현재 컨텍스트(스크립트 실행 스레드)의 활성 Tracer 지정
+    return _tracer.set(tracer)
+
+
+@contextmanager
+def activate(tracer):
+    token = _tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _tracer.reset(token)
+
+
+@contextmanager
+def span(name, rows=None, **attrs):
+    tracer = _tracer.get()
+    if tracer is None:
+        yield _NULL
+        return
+    with tracer.span(name, rows, **attrs) as s:
+        yield s
+
+
+def record(name, started_at, finished_at, rows=None, **attrs):
+    tracer = _tracer.get()
+    if tracer is not None:
+        tracer.record(name, started_at, finished_at, rows, **attrs)
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# ATD-RAM What-If 민감도 스윕 엔진
+#  - 항공편 n편 x 변수 1~2개의 값 격자(G 조합)를 (n * G, p) 행렬 하나로 만들어
+#    EnsemblePredictor.predict 한 번으로 채점
+#  - 결과: ICE 곡선 (항공편별 반응) + PD 곡선 (ICE 평균)
+# ==========================================
+
+MAX_GRID_ROWS = 2000000
+
+
+def value_grid(values, n_points=25, lower=0.01, upper=0.99):
+    # 값 종류가 적은 변수(0/1 플래그 등)는 실제 값 그대로, 연속 변수는 분위수 구간을 균등 분할
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return np.zeros(1)
+    unique = np.unique(values)
+    if len(unique) <= n_points:
+        return unique
+    return np.linspace(np.quantile(values, lower), np.quantile(values, upper), n_points)
+
+
+class Sweep:
+    # ice: (항공편 수, 격자1 길이[, 격자2 길이]) 분 단위 예측
+    def __init__(self, features, grids, ice, index):
+        self.features = list(features)
+        self.grids = [np.asarray(g) for g in grids]
+        self.ice = ice
+        self.index = index
+
+    @property
+    def partial_dependence(self):
+        return self.ice.mean(axis=0)
+
+    def frame(self):
+        # 긴 형식 (항공편, 변수 값들, 예측)
+        mesh = np.meshgrid(*self.grids, indexing='ij')
+        n_grid = mesh[0].size
+        data = {'Flight': np.repeat(np.asarray(self.index), n_grid)}
+        for name, values in zip(self.features, mesh):
+            data[name] = np.tile(values.ravel(), len(self.index))
+        data['Pred'] = self.ice.reshape(-1)
+        return pd.DataFrame(data)
+
+
+def sweep(predictor, X, features, grids):
+    # X: 기준 항공편들 (DataFrame), features: 바꿔볼 변수 1~2개, grids: 변수별 값 목록
+    if not 1 <= len(features) <= 2 or len(features) != len(grids):
+        raise ValueError("sweep takes one or two features with one value grid each")
+    base = predictor.matrix(X)
+    cols = [predictor.features.index(name) for name in features]
+    grids = [np.asarray(g, dtype=np.float64) for g in grids]
+
+    combos = np.column_stack([m.ravel() for m in np.meshgrid(*grids, indexing='ij')])
+    n_rows = len(base) * len(combos)
+    if n_rows > MAX_GRID_ROWS:
+        raise ValueError(f"sweep grid has {n_rows:,} rows (limit {MAX_GRID_ROWS:,}); use fewer flights or grid points")
+
+    matrix = np.repeat(base, len(combos), axis=0)
+    matrix[:, cols] = np.tile(combos, (len(base), 1))
+    preds = predictor.predict(matrix)
+
+    index = X.index if isinstance(X, pd.DataFrame) else pd.RangeIndex(len(base))
+    return Sweep(features, grids, preds.reshape((len(base),) + tuple(len(g) for g in grids)), index)
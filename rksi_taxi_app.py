@@ -1,133 +1,208 @@
-import streamlit as st
-import pandas as pd
-import folium
-from streamlit_folium import st_folium
-import os
-
-st.set_page_config(page_title="Incheon Airport Zone Map", layout="wide")
-
-# 1. 데이터 로드
-@st.cache_data
-def load_data():
-    file_path = 'rksi_stands_zoned.csv'
-    if not os.path.exists(file_path):
-        st.error(f"🚨 '{file_path}' 파일이 없습니다! 먼저 데이터 복구 코드를 실행해주세요.")
-        return pd.DataFrame()
-    return pd.read_csv(file_path)
-
-df = load_data()
-
-st.title("🛫 인천공항(RKSI) 주기장 8개 구역별 상세 지도")
-
-if df.empty:
-    st.stop()
-
-# 2. 사이드바 설정 (runways 부분만 교체하세요)
-st.sidebar.header("설정 (Configuration)")
-
-# 활주로 좌표 (인천공항 4활주로 시스템 반영)
-# L/R은 방향(Left/Right), 숫자는 방위각입니다.
-runways = {
-    # [제3, 4 활주로 / 서쪽]
-    '33L': (37.4541, 126.4608), '15R': (37.4816, 126.4363), # 서로 반대편
-    '33R': (37.4563, 126.4647), '15L': (37.4838, 126.4402), # 서로 반대편
-    
-    # [제1, 2 활주로 / 동쪽]
-    '34L': (37.4411, 126.4377), '16R': (37.4680, 126.4130), # 서로 반대편
-    '34R': (37.4433, 126.4416), '16L': (37.4700, 126.4170)  # 서로 반대편
-}
-# 3. 구역(Category) 필터링
-# 실제 데이터에 존재하는 구역만 정렬해서 표시
-all_categories = sorted(df['Category'].unique().tolist())
-
-# 우선순위 정렬 (Apron -> Cargo -> Others)
-sort_order = [
-    'Apron 1', 'Apron 2', 'Apron 3', 'Apron 4',
-    'Cargo Apron 1', 'Cargo Apron 2', 
-    'Maintenance Apron', 'De-icing Apron', 'Isolated Security Position'
-]
-all_categories = sorted(all_categories, key=lambda x: sort_order.index(x) if x in sort_order else 99)
-
-st.sidebar.subheader("표시할 구역 선택")
-selected_zones = st.sidebar.multiselect(
-    "구역(Zone) 필터",
-    options=all_categories,
-    default=all_categories
-)
-
-df_filtered = df[df['Category'].isin(selected_zones)]
-
-# 4. 지도 시각화
-# 중심 좌표를 데이터의 평균 위치로 자동 조정
-center_lat = df['Lat'].mean() if not df.empty else 37.46
-center_lon = df['Lon'].mean() if not df.empty else 126.44
-m = folium.Map(location=[center_lat, center_lon], zoom_start=13)
-
-# 활주로 표시
-for r_name, coord in runways.items():
-    folium.Marker(
-        location=coord,
-        popup=f"RWY {r_name}",
-        icon=folium.Icon(color='gray', icon='plane', prefix='fa')
-    ).add_to(m)
-
-# 8개 구역별 색상 매핑 (Color Mapping)
-color_map = {
-    'Apron 1': 'blue',          # T1: 파랑
-    'Apron 2': 'green',         # 탑승동: 초록
-    'Apron 3': 'purple',        # T2: 보라
-    'Apron 4': 'cadetblue',
-    'Cargo Apron 1': 'orange',  # 화물1: 주황
-    'Cargo Apron 2': 'darkred', # 화물2: 진한 빨강
-    'Maintenance Apron': 'black', # 정비: 검정
-    'De-icing Apron': 'aqua', # 제방빙: 아쿠아
-    'Isolated Security Position': 'red' # 격리: 빨강 (경고)
-}
-
-# 주기장 마커 찍기
-for _, row in df_filtered.iterrows():
-    cat = row['Category']
-    # 매핑된 색상이 없으면 회색(gray) 사용
-    color = color_map.get(cat, 'gray') 
-    
-    # 제방빙장은 더 크고 눈에 띄게
-    radius = 10 if 'De-icing Apron' in cat else 4
-    
-    folium.CircleMarker(
-        location=[row['Lat'], row['Lon']],
-        radius=radius,
-        color=color,
-        fill=True,
-        fill_opacity=0.7,
-        popup=f"<b>[{cat}]</b><br>Stand: {row['Stand_ID']}",
-        tooltip=f"{row['Stand_ID']}"
-    ).add_to(m)
-
-# 화면 구성
-col1, col2 = st.columns([3, 1])
-
-with col1:
-    st_folium(m, width="100%", height=700)
-
-with col2:
-    st.subheader("범례 (Legend)")
-    
-    # 범례 HTML 생성
-    legend_html = ""
-    for zone in all_categories:
-        c = color_map.get(zone, 'gray')
-        legend_html += f"- <span style='color:{c}'>●</span> **{zone}**<br>"
-    
-    st.markdown(legend_html, unsafe_allow_html=True)
-    
-    st.divider()
-    st.write(f"**총 표시 개수:** {len(df_filtered)}개")
-    
-    if not df_filtered.empty:
-        stats = df_filtered['Category'].value_counts().reindex(all_categories).fillna(0).astype(int).reset_index()
-        stats.columns = ['구역', '개수']
-        st.dataframe(stats, hide_index=True)
-
-
-
-
+import streamlit as st
+import pandas as pd
+import folium
+import os
+
+from atd_geo import RUNWAY_ENDS, TAXIWAY_FILE
+
+st.set_page_config(page_title="Incheon Airport Zone Map", layout="wide")
+
+# 1. 데이터 로드
+@st.cache_data
+def load_data():
+    file_path = 'rksi_stands_zoned.csv'
+    if not os.path.exists(file_path):
+        st.error(f"🚨 '{file_path}' 파일이 없습니다! 먼저 데이터 복구 코드를 실행해주세요.")
+        return pd.DataFrame()
+    return pd.read_csv(file_path)
+
+df = load_data()
+
+st.title("🛫 인천공항(RKSI) 주기장 8개 구역별 상세 지도")
+
+if df.empty:
+    st.stop()
+
+# 2. 사이드바 설정 (runways 부분만 교체하세요)
+st.sidebar.header("설정 (Configuration)")
+
+# 활주로 시단 좌표 (인천공항 4활주로 시스템 반영, 거리 계산 모듈과 공유)
+runways = RUNWAY_ENDS
+# 3. 구역(Category) 필터링
+# 실제 데이터에 존재하는 구역만 정렬해서 표시
+all_categories = sorted(df['Category'].unique().tolist())
+
+# 우선순위 정렬 (Apron -> Cargo -> Others)
+sort_order = [
+    'Apron 1', 'Apron 2', 'Apron 3', 'Apron 4',
+    'Cargo Apron 1', 'Cargo Apron 2', 
+    'Maintenance Apron', 'De-icing Apron', 'Isolated Security Position'
+]
+all_categories = sorted(all_categories, key=lambda x: sort_order.index(x) if x in sort_order else 99)
+
+# 8개 구역별 색상 매핑 (Color Mapping)
+color_map = {
+    'Apron 1': 'blue',          # T1: 파랑
+    'Apron 2': 'green',         # 탑승동: 초록
+    'Apron 3': 'purple',        # T2: 보라
+    'Apron 4': 'cadetblue',
+    'Cargo Apron 1': 'orange',  # 화물1: 주황
+    'Cargo Apron 2': 'darkred', # 화물2: 진한 빨강
+    'Maintenance Apron': 'black', # 정비: 검정
+    'De-icing Apron': 'aqua', # 제방빙: 아쿠아
+    'Isolated Security Position': 'red' # 격리: 빨강 (경고)
+}
+
+st.sidebar.subheader("표시 구역 선택")
+st.sidebar.caption("선택한 구역이 통계와 지도에 표시됩니다. 지도 안에서는 오른쪽 위 레이어 버튼으로 잠깐 켜고 끌 수 있습니다.")
+selected_zones = st.sidebar.multiselect(
+    "구역(Zone) 필터",
+    options=all_categories,
+    default=all_categories
+)
+
+df_filtered = df[df['Category'].isin(selected_zones)]
+
+# 유도로 그래프 (rksi_taxiways.geojson이 있을 때만): 운영 방향별 주기장 -> 출발 활주로 최단 경로 조회
+@st.cache_resource
+def taxiway_graph():
+    # 유도로 파일이 없으면 그래프 모듈(scipy / scikit-learn)을 읽지 않음
+    if not os.path.exists(TAXIWAY_FILE):
+        return None
+    import atd_taxiway as taxiway
+    return taxiway.load_graph()
+
+graph = taxiway_graph()
+route_stand = route_config = None
+if graph is not None:
+    st.sidebar.subheader("지상 이동 경로")
+    route_config = st.sidebar.selectbox("출발 활주로 운영 방향", list(graph.configs), index=0)
+    route_stand = st.sidebar.selectbox("주기장", graph.stand_ids.tolist(), index=None, placeholder="경로를 볼 주기장 선택")
+
+# 4. 지도 시각화
+#  - 구역별 주기장을 GeoJSON FeatureCollection 하나로 만들어 캐시 (행마다 마커/팝업 HTML을 만들지 않음)
+#  - 지도는 구역 선택과 무관하게 (경로 주기장, 운영 방향)마다 한 번만 구성/렌더링해 HTML로 캐시
+#    -> 구역 토글은 LayerControl로 브라우저에서 처리, 사이드바 조작으로 재실행돼도 같은 HTML 재사용
+#    (folium Map 객체는 렌더링할 때마다 스크립트가 덧붙으므로 객체가 아닌 렌더링 결과를 캐시)
+@st.cache_data
+def stand_layer(category):
+    stands = df[df['Category'] == category]
+    features = [
+        {'type': 'Feature',
+         'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+         'properties': {'Stand_ID': str(stand_id), 'Category': category}}
+        for stand_id, lat, lon in zip(stands['Stand_ID'].to_numpy(), stands['Lat'].to_numpy(), stands['Lon'].to_numpy())
+    ]
+    return {'type': 'FeatureCollection', 'features': features}
+
+@st.cache_data
+def taxiway_layer():
+    return graph.geojson()
+
+@st.cache_data
+def route_layer(stand_id, config):
+    # 선택한 주기장 -> 운영 방향 내 각 출발 활주로 최단 경로
+    runway_names, route_m, _ = graph.configs[config]
+    s = graph.stand_ids.get_loc(stand_id)
+    features = [
+        {'type': 'Feature',
+         'geometry': {'type': 'LineString', 'coordinates': [[lon, lat] for lat, lon in graph.path(stand_id, rwy)]},
+         'properties': {'Route': f"{stand_id} -> RWY {rwy}: {route_m[s, i]:,.0f} m"}}
+        for i, rwy in enumerate(runway_names)
+    ]
+    return {'type': 'FeatureCollection', 'features': [f for f in features if f['geometry']['coordinates']]}
+
+@st.cache_data
+def runway_layer():
+    features = [
+        {'type': 'Feature',
+         'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+         'properties': {'Runway': f"RWY {name}"}}
+        for name, (lat, lon) in runways.items()
+    ]
+    return {'type': 'FeatureCollection', 'features': features}
+
+def build_map(zones, route_stand, route_config):
+    # 중심 좌표를 데이터의 평균 위치로 자동 조정 (canvas 렌더링 -> 수천 개 점도 가볍게 표시)
+    center_lat = df['Lat'].mean() if not df.empty else 37.46
+    center_lon = df['Lon'].mean() if not df.empty else 126.44
+    m = folium.Map(location=[center_lat, center_lon], zoom_start=13, prefer_canvas=True)
+
+    # 활주로 표시
+    folium.GeoJson(
+        runway_layer(),
+        name="Runways",
+        marker=folium.Marker(icon=folium.Icon(color='gray', icon='plane', prefix='fa')),
+        popup=folium.GeoJsonPopup(fields=['Runway'], labels=False),
+    ).add_to(m)
+
+    # 유도로 네트워크 / 선택한 주기장의 출발 경로
+    if graph is not None:
+        folium.GeoJson(
+            taxiway_layer(), name="Taxiways",
+            style_function=lambda _: {'color': '#888888', 'weight': 1.5, 'opacity': 0.6},
+        ).add_to(m)
+        if route_stand is not None:
+            folium.GeoJson(
+                route_layer(route_stand, route_config), name=f"Routes ({route_config})",
+                style_function=lambda _: {'color': 'crimson', 'weight': 4},
+                tooltip=folium.GeoJsonTooltip(fields=['Route'], labels=False),
+            ).add_to(m)
+
+    # 주기장: 구역별 레이어 (매핑된 색상이 없으면 회색, 제방빙장은 더 크고 눈에 띄게, 선택하지 않은 구역은 꺼진 상태)
+    for cat in all_categories:
+        color = color_map.get(cat, 'gray')
+        folium.GeoJson(
+            stand_layer(cat),
+            name=cat,
+            show=cat in zones,
+            marker=folium.CircleMarker(radius=10 if 'De-icing Apron' in cat else 4, fill=True),
+            style_function=lambda _, color=color: {'color': color, 'fillColor': color, 'fillOpacity': 0.7},
+            tooltip=folium.GeoJsonTooltip(fields=['Stand_ID'], labels=False),
+            popup=folium.GeoJsonPopup(fields=['Category', 'Stand_ID'], aliases=['구역', 'Stand']),
+        ).add_to(m)
+
+    folium.LayerControl(collapsed=False).add_to(m)
+    return m
+
+@st.cache_data
+def map_html(zones, route_stand, route_config):
+    # zones: 선택 구역 튜플 (캐시 키)
+    return build_map(zones, route_stand, route_config).get_root().render()
+
+html = map_html(tuple(selected_zones), route_stand, route_config)
+
+# 화면 구성
+col1, col2 = st.columns([3, 1])
+
+with col1:
+    # 지도 조작(확대/이동/레이어 토글)은 iframe 안에서만 처리 -> 앱 재실행 없음
+    st.iframe(html, height=700)
+
+with col2:
+    st.subheader("범례 (Legend)")
+    
+    # 범례 HTML 생성
+    legend_html = ""
+    for zone in all_categories:
+        c = color_map.get(zone, 'gray')
+        legend_html += f"- <span style='color:{c}'>●</span> **{zone}**<br>"
+    
+    st.markdown(legend_html, unsafe_allow_html=True)
+    
+    st.divider()
+    st.write(f"**총 표시 개수:** {len(df_filtered)}개")
+    
+    if route_stand is not None:
+        st.divider()
+        st.write(f"**{route_stand} 출발 경로 거리** ({route_config})")
+        st.dataframe(graph.config_matrix(route_config).loc[[route_stand]].T.round(0).rename(columns={route_stand: 'm'}))
+
+    if not df_filtered.empty:
+        stats = df_filtered['Category'].value_counts().reindex(all_categories).fillna(0).astype(int).reset_index()
+        stats.columns = ['구역', '개수']
+        st.dataframe(stats, hide_index=True)
+
+
+
+
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 최상위 atd_*.py 모듈을 import할 수 있도록 저장소 루트를 경로에 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def stacking_artifact():
+    # 작은 스태킹 모델 (XGBoost + LightGBM + 양수 선형 메타) + 학습 행렬
+    xgb = pytest.importorskip('xgboost')
+    lgb = pytest.importorskip('lightgbm')
+    linear = pytest.importorskip('sklearn.linear_model')
+    from atd_engine import MODE_STACKING, ModelArtifact
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({'Taxi_Distance': rng.random(300), 'Dep_Count_30': rng.integers(0, 20, 300).astype(float),
+                      'Physical_Min_Taxi': rng.uniform(5, 12, 300)})
+    y = np.log1p(10 + 20 * X['Taxi_Distance'] + X['Dep_Count_30'] + rng.random(300))
+    xgb_model = xgb.XGBRegressor(n_estimators=20, max_depth=3).fit(X, y)
+    lgb_model = lgb.LGBMRegressor(n_estimators=20, num_leaves=7, min_child_samples=5, verbose=-1).fit(X, y)
+    meta = linear.LinearRegression(positive=True).fit(
+        pd.DataFrame({'XGB': xgb_model.predict(X), 'LGBM': lgb_model.predict(X)}), y)
+    artifact = ModelArtifact(xgb_model, meta, X.columns, MODE_STACKING, "Stacking (XGB + LGBM)", lgb_model=lgb_model,
+                             train_years=[2024], metrics={'MAE': 1.5}, data_hash='abc', config={'trials': 2})
+    return artifact, X
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from atd_collinearity import GramAccumulator, vif_scores
+
+sm = pytest.importorskip('statsmodels.api')
+outliers_influence = pytest.importorskip('statsmodels.stats.outliers_influence')
+
+
+def make_features(n=2000, seed=0):
+    # 서로 상관된 변수 + 큰 평균값(수치 안정성 확인용) + 결측/무한대
+    rng = np.random.default_rng(seed)
+    a = rng.normal(size=n)
+    b = 0.8 * a + 0.6 * rng.normal(size=n)
+    c = rng.normal(size=n)
+    d = 0.5 * a - 0.3 * c + 0.4 * rng.normal(size=n)
+    X = pd.DataFrame({'a': a, 'b': b, 'c': c + 1e6, 'd': d})
+    X.iloc[::97, 1] = np.nan
+    X.iloc[::113, 3] = np.inf
+    return X
+
+
+def statsmodels_vif(X):
+    # 절편을 넣은 표준 VIF (결측/무한대는 GramAccumulator와 같이 0으로)
+    exog = sm.add_constant(X.replace([np.inf, -np.inf], 0).fillna(0)).to_numpy()
+    return pd.Series([outliers_influence.variance_inflation_factor(exog, i + 1) for i in range(X.shape[1])],
+                     index=X.columns)
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 333, 5000])
+def test_vif_matches_statsmodels(chunk_rows):
+    X = make_features()
+    pd.testing.assert_series_equal(vif_scores(X, chunk_rows=chunk_rows), statsmodels_vif(X), rtol=1e-8)
+
+
+def test_chunk_iterator_matches_frame():
+    X = make_features()
+    chunks = (X.iloc[i:i + 250].to_numpy() for i in range(0, len(X), 250))
+    pd.testing.assert_series_equal(vif_scores(chunks, features=list(X.columns)), vif_scores(X))
+
+
+def test_perfect_collinearity_and_constant_are_inf():
+    X = make_features().fillna(0).replace(np.inf, 0)
+    X['a_plus_c'] = X['a'] + X['c']
+    X['const'] = 3.0
+    scores = GramAccumulator(X.columns).update(X.to_numpy()).vif()
+    assert np.isinf(scores[['a', 'c', 'a_plus_c', 'const']]).all()
+    assert np.isfinite(scores[['b', 'd']]).all()
+
+
+def test_too_few_rows_is_nan():
+    assert GramAccumulator(['a', 'b']).update(np.ones((1, 2))).vif().isna().all()
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from atd_congestion import WINDOWS_MIN, CongestionTracker, add_congestion_features, feature_names, rolling_counts
+
+
+def make_flights(n=600, seed=0):
+    # 같은 분에 여러 편이 몰리는 경우가 나오도록 분 단위 시각
+    rng = np.random.default_rng(seed)
+    minutes = np.sort(rng.integers(0, 24 * 60, n))
+    return pd.DataFrame({
+        'RAM_Datetime': pd.Timestamp('2025-01-01') + pd.to_timedelta(minutes, unit='min'),
+        'Category': rng.choice(['Apron 1', 'Apron 2', 'Cargo Apron 1'], n),
+        'Dep_RWY': rng.choice(['33L', '33R', '34L', '34R'], n),
+    })
+
+
+def brute_force(seconds, groups, windows):
+    out = np.full((len(seconds), len(windows)), np.nan)
+    for i in range(len(seconds)):
+        if groups[i] < 0:
+            continue
+        for j, w in enumerate(windows):
+            earlier = np.arange(len(seconds)) != i
+            # 같은 시각이면 입력 순서상 앞선 항공편만
+            earlier &= (seconds < seconds[i]) | ((seconds == seconds[i]) & (np.arange(len(seconds)) < i))
+            out[i, j] = np.count_nonzero(earlier & (groups == groups[i]) & (seconds >= seconds[i] - w * 60))
+    return out
+
+
+def test_rolling_counts_matches_brute_force():
+    rng = np.random.default_rng(1)
+    seconds = rng.integers(0, 4 * 3600, 300) // 60 * 60
+    groups = rng.integers(-1, 3, 300)
+    np.testing.assert_array_equal(rolling_counts(seconds, groups, WINDOWS_MIN),
+                                  brute_force(seconds, groups, WINDOWS_MIN))
+
+
+@pytest.mark.parametrize('batch_rows', [1, 37, 250])
+def test_tracker_matches_batch(batch_rows):
+    flights = make_flights()
+    expected = add_congestion_features(flights)
+
+    tracker = CongestionTracker()
+    parts = [tracker.update(flights.iloc[i:i + batch_rows]) for i in range(0, len(flights), batch_rows)]
+    actual = pd.concat(parts)
+
+    pd.testing.assert_frame_equal(actual[feature_names()], expected[feature_names()])
+
+
+def test_tracker_keeps_only_recent_history():
+    flights = make_flights()
+    tracker = CongestionTracker(windows=(15, 30))
+    tracker.update(flights)
+    oldest = tracker.history['RAM_Datetime'].min()
+    assert oldest >= flights['RAM_Datetime'].max() - pd.Timedelta(minutes=30)
@@ -0,0 +1,34 @@
+import numpy as np
+
+import atd_explain as explain
+
+
+def contributions(n, n_features=3):
+    rng = np.random.default_rng(0)
+    return explain.Contributions('xgb', rng.random((n, n_features), dtype=np.float32), np.zeros(n),
+                                 rng.random((n, n_features)), [f"f{i}" for i in range(n_features)])
+
+
+def test_sample_rows_is_fixed_and_ordered():
+    contrib = contributions(500)
+    rows = contrib.sample_rows(max_rows=100)
+    assert len(rows) == 100 and len(np.unique(rows)) == 100
+    assert np.all(np.diff(rows) > 0)
+    np.testing.assert_array_equal(rows, contrib.sample_rows(max_rows=100))
+    assert len(contrib.to_shap(rows).values) == 100
+
+
+def test_sample_rows_keeps_small_sets_whole():
+    contrib = contributions(50)
+    assert len(contrib.to_shap(contrib.sample_rows(max_rows=100)).values) == 50
+
+
+def test_ensemble_contributions_decompose_predictions(stacking_artifact):
+    # 앙상블 기여도 합 + 기준값 = 메타 모델의 로그 공간 예측, 배치 예측 = 기존 DataFrame 예측
+    artifact, X = stacking_artifact
+    predictor = explain.EnsemblePredictor(artifact)
+    results = predictor.contributions(X, batch_rows=64, n_workers=2)
+    assert list(results) == [artifact.model_name, 'XGBoost', 'LightGBM']
+    np.testing.assert_allclose(results[artifact.model_name].predictions, artifact.predict_log(X), atol=1e-4)
+    np.testing.assert_allclose(results['XGBoost'].predictions, artifact.xgb_model.predict(X), atol=1e-4)
+    np.testing.assert_allclose(predictor.predict(X), artifact.predict(X), rtol=1e-6)
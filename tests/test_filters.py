@@ -0,0 +1,80 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from atd_engine import FILTER_COLS, TARGET_COL, FilterEngine, apply_filters, make_filter_spec, outlier_threshold
+
+
+def mask_chain(df, spec, years=None):
+    # 기존 구현: 복사 후 조건마다 DataFrame을 다시 만드는 방식
+    filtered_df = df.copy()
+    if spec.get('remove_outliers'):
+        threshold = outlier_threshold(filtered_df[TARGET_COL])
+        filtered_df = filtered_df[filtered_df[TARGET_COL] <= threshold]
+    for col in FILTER_COLS:
+        values = spec.get(col)
+        if values and col in filtered_df.columns:
+            filtered_df = filtered_df[filtered_df[col].isin(values)]
+    if years:
+        filtered_df = filtered_df[filtered_df['Year'].isin(years)]
+    return filtered_df
+
+
+@pytest.fixture(scope='module')
+def frame():
+    rng = np.random.default_rng(0)
+    n = 3000
+    choices = {
+        'Weather_Type': ['Clear', 'Rain', 'Snow', None],
+        'Snow_Phase': ['None', 'Falling', 'Accumulated'],
+        'NAT': ['KOR', 'USA', 'CHN', 'JPN'],
+        'STS': ['DEP', 'ARR'],
+    }
+    df = pd.DataFrame({col: rng.choice(np.array(values, dtype=object), n) for col, values in choices.items()})
+    df['Year'] = rng.choice([2023, 2024, 2025], n)
+    target = rng.gamma(4, 5, n)
+    target[rng.choice(n, 30, replace=False)] = 600  # 3-Sigma 밖
+    target[rng.choice(n, 10, replace=False)] = np.nan
+    df[TARGET_COL] = target
+    return df
+
+
+SPECS = [
+    make_filter_spec(remove_outliers=False),
+    make_filter_spec(),
+    make_filter_spec(Weather_Type=['Rain', 'Snow']),
+    make_filter_spec(remove_outliers=False, NAT=['KOR'], STS=['DEP']),
+    make_filter_spec(Snow_Phase=['Falling'], NAT=['USA', 'JPN', 'XXX']),
+    make_filter_spec(Weather_Type=['Nowhere']),
+]
+
+
+@pytest.mark.parametrize('spec, years', list(itertools.product(SPECS, [None, [2024], [2023, 2025]])))
+def test_matches_mask_chain(frame, spec, years):
+    expected = mask_chain(frame, spec, years)
+    result = FilterEngine(frame).filter(spec, years)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_apply_filters_matches_mask_chain(frame):
+    for spec in SPECS:
+        pd.testing.assert_frame_equal(apply_filters(frame, spec), mask_chain(frame, spec))
+
+
+def test_unfiltered_returns_source_frame(frame):
+    assert FilterEngine(frame).filter(make_filter_spec(remove_outliers=False)) is frame
+
+
+def test_lru_cache(frame):
+    engine = FilterEngine(frame, max_entries=2)
+    first = engine.indices(SPECS[1])
+    assert engine.indices(SPECS[1]) is first
+    assert not first.flags.writeable
+    engine.indices(SPECS[2])
+    engine.indices(SPECS[3])
+    assert engine.key(SPECS[1]) not in engine._cache
+    assert len(engine._cache) == 2
+    # 연도 순서가 달라도 같은 키
+    assert engine.key(make_filter_spec(NAT=['KOR']), [2025, 2023]) == engine.key(make_filter_spec(NAT=['KOR']), [2023, 2025])
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('sklearn')
+
+from atd_geo import RUNWAY_ENDS, AirportGeometry, haversine_m  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def geometry():
+    rng = np.random.default_rng(0)
+    stands = pd.DataFrame({'Stand_ID': [str(100 + i) for i in range(60)],
+                           'Lat': rng.uniform(37.44, 37.48, 60), 'Lon': rng.uniform(126.42, 126.46, 60)})
+    return AirportGeometry(stands)
+
+
+def test_nearest_stand_matches_brute_force(geometry):
+    rng = np.random.default_rng(1)
+    lat, lon = rng.uniform(37.44, 37.48, 50), rng.uniform(126.42, 126.46, 50)
+    ids, dist = geometry.nearest_stand(lat, lon)
+    brute = haversine_m(lat[:, None], lon[:, None], geometry.stand_latlon[None, :, 0], geometry.stand_latlon[None, :, 1])
+    np.testing.assert_array_equal(ids[:, 0], geometry.stand_ids.to_numpy()[brute.argmin(axis=1)])
+    np.testing.assert_allclose(dist[:, 0], brute.min(axis=1), rtol=1e-6)
+
+    runways, runway_dist = geometry.nearest_runway(*RUNWAY_ENDS['15L'])
+    assert runways[0] == '15L' and runway_dist[0] == pytest.approx(0, abs=1e-6)
+
+
+def test_distance_lookup(geometry):
+    stand = geometry.stands.iloc[3]
+    direct, taxi = geometry.distances([stand['Stand_ID'], stand['Stand_ID'], '999'], ['33L', 'XX', '33L'])
+    assert direct[0] == pytest.approx(haversine_m(stand['Lat'], stand['Lon'], *RUNWAY_ENDS['33L']), rel=1e-6)
+    # 활주로 축 기준 맨해튼 거리 >= 직선 거리
+    assert taxi[0] >= direct[0] * (1 - 1e-6)
+    assert np.isnan(direct[1:]).all() and np.isnan(taxi[1:]).all()
+
+
+def test_enrich_keeps_existing_min_taxi(geometry):
+    flights = pd.DataFrame({'Stand_ID': geometry.stand_ids[:3], 'Dep_RWY': ['33L', '34R', '15R'],
+                            'Physical_Min_Taxi': [1.0, 2.0, 3.0]})
+    out = geometry.enrich(flights)
+    np.testing.assert_array_equal(out['Physical_Min_Taxi'], [1.0, 2.0, 3.0])
+    fresh = geometry.enrich(flights, overwrite=True)
+    np.testing.assert_allclose(fresh['Physical_Min_Taxi'], geometry.min_taxi_minutes(fresh['Stand_RWY_Taxi_Dist']))
@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import atd_ingest as ingest
+from atd_congestion import WINDOWS_MIN, add_congestion_features, feature_names
+
+MASTER = 'ATD_RAM_Master.parquet'
+
+
+@pytest.fixture(scope='module')
+def master():
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), MASTER)
+    if not os.path.exists(path):
+        pytest.skip(f"{MASTER} not available")
+    df = pd.read_parquet(path).drop(columns=feature_names(), errors='ignore')
+    return df.drop_duplicates(ingest.KEY_COLS, keep='last').sort_values('RAM_Datetime', kind='stable', ignore_index=True)
+
+
+def write_extract(df, path):
+    df.to_parquet(path, index=False)
+    return str(path)
+
+
+def read_back(root):
+    df = ingest.open_dataset(root).to_table().to_pandas()
+    return df.sort_values(ingest.KEY_COLS, ignore_index=True)
+
+
+def test_backfill_refreshes_following_month(master, tmp_path):
+    # 뒤 달을 먼저 적재한 뒤 앞 달을 보충 -> 일괄 계산과 같은 혼잡 피처
+    root = str(tmp_path / 'dataset')
+    times = master['RAM_Datetime']
+    month = times.dt.to_period('M')
+    # 다음 달 첫 항공편이 윈도우 안에 앞 달 항공편을 세는 월 경계
+    boundary = (month != month.shift()) & (times - times.shift() <= pd.Timedelta(minutes=max(WINDOWS_MIN)))
+    if not boundary.any():
+        pytest.skip("no month boundary inside a congestion window")
+    backfill = month == month[boundary.idxmax()] - 1
+    ingest.append_extract(write_extract(master[~backfill], tmp_path / 'rest.parquet'), root)
+    summary = ingest.append_extract(write_extract(master[backfill], tmp_path / 'backfill.parquet'), root)
+    assert len(summary['refreshed']) == 1
+
+    expected = add_congestion_features(master).sort_values(ingest.KEY_COLS, ignore_index=True)
+    actual = read_back(root)
+    np.testing.assert_array_equal(actual[feature_names()].to_numpy(), expected[feature_names()].to_numpy())
+
+
+def test_extract_without_stored_column_keeps_schema(master, tmp_path):
+    root = str(tmp_path / 'dataset')
+    dropped = master.columns[-1]
+    last_month = master['RAM_Datetime'].dt.to_period('M') == master['RAM_Datetime'].dt.to_period('M').max()
+    ingest.append_extract(write_extract(master[~last_month], tmp_path / 'history.parquet'), root)
+    summary = ingest.append_extract(write_extract(master[last_month].drop(columns=dropped), tmp_path / 'daily.parquet'),
+                                    root)
+
+    assert summary['missing_columns'] == [dropped]
+    stored = read_back(root)
+    assert dropped in stored.columns
+    new_rows = stored['RAM_Datetime'].dt.to_period('M') == stored['RAM_Datetime'].dt.to_period('M').max()
+    assert stored.loc[new_rows, dropped].isna().all()
+    assert stored.loc[~new_rows, dropped].notna().any()
+
+
+def test_extract_missing_required_columns_is_rejected(master, tmp_path):
+    with pytest.raises(KeyError, match=ingest.TARGET_COL):
+        ingest.append_extract(write_extract(master.drop(columns=ingest.TARGET_COL).head(50), tmp_path / 'bad.parquet'),
+                              str(tmp_path / 'dataset'))
+
+
+def test_frame_source_auto_split_holds_out_latest_rows():
+    # 업로드 파일이 시간순이 아니어도 자동 분할의 평가 구간은 가장 최근 10%
+    from atd_engine import SPLIT_AUTO, TARGET_COL, split_by_year
+    rng = np.random.default_rng(0)
+    times = pd.date_range('2024-01-01', periods=400, freq='15min')
+    df = pd.DataFrame({'Year': 2024, 'FLT': [f"KE{i:03d}" for i in range(400)], 'RAM_Datetime': times,
+                       'Taxi_Distance': rng.random(400), TARGET_COL: rng.integers(5, 40, 400)})
+    shuffled = df.sample(frac=1, random_state=0, ignore_index=True)
+    frame = ingest.FrameSource(shuffled).read({})
+    assert frame['RAM_Datetime'].is_monotonic_increasing
+    X_train, X_test, _, _ = split_by_year(frame, ['Taxi_Distance'], SPLIT_AUTO, [2024])
+    held_out = frame.loc[X_test.index, 'RAM_Datetime']
+    assert len(held_out) == 40
+    assert held_out.min() > frame.loc[X_train.index, 'RAM_Datetime'].max()
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import atd_jobs as jobs
+
+
+def dead_pid():
+    proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+    proc.wait()
+    return proc.pid
+
+
+def test_claim_records_owner_pid(tmp_path):
+    store = jobs.JobStore(str(tmp_path))
+    job_id = store.create({'mode': 'xgb'})
+    assert store.claim(job_id)
+    assert not store.claim(job_id)
+    with open(store._path(job_id, 'claim')) as f:
+        assert int(f.read()) == os.getpid()
+    assert not store.claim_stale(job_id)
+
+
+def test_recover_releases_orphaned_claims(tmp_path):
+    store = jobs.JobStore(str(tmp_path))
+    orphaned, legacy, fresh, live = (store.create({'mode': 'xgb'}) for _ in range(4))
+    with open(store._path(orphaned, 'claim'), 'w') as f:
+        f.write(str(dead_pid()))
+    # pid 없는 예전 형식 claim: 오래됐으면 버려진 것, 방금 생긴 것은 아직 쓰는 중일 수 있으므로 유지
+    open(store._path(legacy, 'claim'), 'w').close()
+    old = time.time() - 60
+    os.utime(store._path(legacy, 'claim'), (old, old))
+    open(store._path(fresh, 'claim'), 'w').close()
+    store.claim(live)
+
+    jobs.JobScheduler._recover(SimpleNamespace(store=store))
+
+    assert not os.path.exists(store._path(orphaned, 'claim'))
+    assert not os.path.exists(store._path(legacy, 'claim'))
+    assert os.path.exists(store._path(fresh, 'claim'))
+    assert os.path.exists(store._path(live, 'claim'))
+    assert store.claim(orphaned)
+    assert all(j['status'] == jobs.QUEUED for j in store.list())
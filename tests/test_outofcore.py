@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('xgboost')
+
+import atd_outofcore as ooc  # noqa: E402
+from atd_engine import (SPLIT_AUTO, SPLIT_HOLDOUT, TARGET_COL, TrainingError, make_filter_spec,  # noqa: E402
+                        split_by_year, tail_split)
+from atd_ingest import FrameSource  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def master(tmp_path_factory):
+    # 시간순이 아닌 파일 (연도 2개, 3-Sigma 극단치 포함)
+    rng = np.random.default_rng(0)
+    n = 1500
+    times = pd.date_range('2023-06-01', '2024-09-30', periods=n)
+    target = rng.integers(5, 40, n).astype(float)
+    target[rng.choice(n, 5, replace=False)] = 900
+    df = pd.DataFrame({'Year': times.year, 'FLT': [f"F{i:04d}" for i in range(n)], 'RAM_Datetime': times,
+                       'NAT': rng.choice(['KOR', 'USA'], n), 'Taxi_Distance': rng.random(n),
+                       'Dep_Count_30': rng.integers(0, 20, n), TARGET_COL: target})
+    df = df.sample(frac=1, random_state=1, ignore_index=True)
+    path = tmp_path_factory.mktemp('ooc') / 'master.parquet'
+    df.to_parquet(path, index=False)
+    return df, str(path)
+
+
+def stream_roles(stream):
+    # 스트림 위치 -> 항공편 번호 (역할 배열과 같은 순서)
+    flights = np.concatenate([b.column('FLT').to_numpy(zero_copy_only=False) for b in stream._scan(['FLT'])])
+    return {role: set(flights[(stream.role & role) != 0]) for role in (ooc.ROLE_TRAIN, ooc.ROLE_VALID, ooc.ROLE_TEST)}
+
+
+@pytest.mark.parametrize('split_mode, train_years, test_years',
+                         [(SPLIT_AUTO, [2023, 2024], []), (SPLIT_HOLDOUT, [2023], [2024])])
+def test_split_matches_in_memory(master, split_mode, train_years, test_years):
+    df, path = master
+    spec = make_filter_spec(NAT=['KOR'])
+    features = ['Taxi_Distance', 'Dep_Count_30']
+    stream = ooc.ParquetStream(path, features, spec, split_mode, train_years, test_years, batch_rows=97)
+
+    frame = FrameSource(df).read(spec, years=sorted(set(train_years) | set(test_years)))
+    X_full, X_test, _, _ = split_by_year(frame, features, split_mode, train_years, test_years)
+    train_pos, valid_pos = tail_split(np.arange(len(X_full)))
+    expected = {ooc.ROLE_TRAIN: set(frame.loc[X_full.index[train_pos], 'FLT']),
+                ooc.ROLE_VALID: set(frame.loc[X_full.index[valid_pos], 'FLT']),
+                ooc.ROLE_TEST: set(frame.loc[X_test.index, 'FLT'])}
+    assert stream_roles(stream) == expected
+
+    # 배치로 읽은 평가 행 = 같은 항공편의 타겟 / 변수
+    X, y = [], []
+    for X_batch, y_batch, _, _ in stream.batches(ooc.ROLE_TEST):
+        X.append(X_batch)
+        y.append(y_batch)
+    X, y = np.vstack(X), np.concatenate(y)
+    order = np.lexsort(X.T[::-1])
+    test = frame.loc[X_test.index]
+    test_order = np.lexsort(test[features].to_numpy(dtype=np.float32).T[::-1])
+    np.testing.assert_allclose(X[order], test[features].to_numpy(dtype=np.float32)[test_order])
+    np.testing.assert_allclose(y[order], np.log1p(test[TARGET_COL].to_numpy())[test_order])
+
+
+def test_detects_dataset_change(master, tmp_path):
+    df, _ = master
+    path = tmp_path / 'master.parquet'
+    df.to_parquet(path, index=False)
+    stream = ooc.ParquetStream(str(path), ['Taxi_Distance'], make_filter_spec(remove_outliers=False))
+    # 계획 이후 파일이 바뀌면 역할 배열과 행이 어긋나므로 학습을 멈춤
+    df.iloc[:10].to_parquet(path, index=False)
+    with pytest.raises(TrainingError):
+        next(stream.batches(ooc.ROLE_FULL))
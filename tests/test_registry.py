@@ -0,0 +1,26 @@
+import numpy as np
+
+from atd_registry import ModelRegistry
+
+
+def test_round_trip_predictions(stacking_artifact, tmp_path):
+    art, X = stacking_artifact
+    registry = ModelRegistry(str(tmp_path))
+    model_id = registry.register(art)
+    loaded = registry.load(model_id)
+    assert loaded.model_id == model_id
+    assert loaded.features == art.features and loaded.mode == art.mode
+    assert loaded.train_years == [2024] and loaded.metrics == {'MAE': 1.5}
+    np.testing.assert_allclose(loaded.predict(X), art.predict(X), rtol=1e-5)
+    assert [m['model_id'] for m in registry.list()] == [model_id]
+
+
+def test_same_config_registers_separate_models(stacking_artifact, tmp_path):
+    # 같은 데이터/설정으로 다시 등록해도 기존 모델을 덮어쓰지 않음
+    art, _ = stacking_artifact
+    registry = ModelRegistry(str(tmp_path))
+    first, second = registry.register(art), registry.register(art)
+    assert first != second
+    assert {m['model_id'] for m in registry.list()} == {first, second}
+    assert registry.manifest(first)['model_key'] == registry.manifest(second)['model_key']
+    assert not [name for name in tmp_path.iterdir() if name.name.startswith('.')]
@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+import numpy as np
+
+from atd_engine import feature_profile
+from atd_serve import PredictionService
+
+
+def run(service, calls):
+    # 배치 루프를 띄우고 요청들을 동시에 보냄
+    async def main():
+        task = asyncio.create_task(service.batcher.run())
+        try:
+            return await asyncio.gather(*(service.handle(*call) for call in calls))
+        finally:
+            task.cancel()
+    return asyncio.run(main())
+
+
+def flights(X):
+    return [{k: float(v) for k, v in row.items()} for row in X.to_dict('records')]
+
+
+def test_concurrent_requests_share_a_batch(stacking_artifact):
+    artifact, X = stacking_artifact
+    service = PredictionService(artifact, max_batch=4096, max_wait_ms=50)
+    chunks = [X.iloc[i:i + n] for i, n in [(0, 1), (1, 5), (6, 20), (26, 3)]]
+    calls = [('POST', '/predict', json.dumps({'flights': flights(chunk)}).encode()) for chunk in chunks]
+    responses = run(service, calls)
+
+    for (status, body), chunk in zip(responses, chunks):
+        assert status == 200
+        np.testing.assert_allclose(body['predictions'], artifact.predict(chunk), rtol=1e-6)
+    assert service.batcher.stats == {'requests': 4, 'rows': 29, 'batches': 1}
+
+
+def test_request_errors(stacking_artifact):
+    artifact, X = stacking_artifact
+    artifact.schema = feature_profile(X)
+    try:
+        service = PredictionService(artifact)
+        responses = run(service, [
+            ('POST', '/predict', b'{"flight": {"Gate_Color": 1}}'),
+            ('POST', '/predict', b'{"flight": {"Taxi_Distance": "far"}}'),
+            ('POST', '/predict', b'not json'),
+            ('GET', '/nowhere', b''),
+            ('POST', '/predict', b'{"flight": {"Taxi_Distance": 0.5, "FLT": "KE001"}}'),
+        ])
+    finally:
+        artifact.schema = None
+    assert [status for status, _ in responses] == [400, 400, 400, 404, 200]
+    assert 'Gate_Color' in responses[0][1]['error']
+
+
+def test_prediction_failure_returns_500(stacking_artifact):
+    artifact, _ = stacking_artifact
+    service = PredictionService(artifact)
+
+    def broken(X):
+        raise RuntimeError("booster gone")
+    service.batcher.predict_fn = broken
+    [(status, body)] = run(service, [('POST', '/predict', b'{"flight": {"Taxi_Distance": 0.5}}')])
+    assert status == 500 and 'RuntimeError' in body['error']
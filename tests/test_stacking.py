@@ -0,0 +1,82 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import atd_engine as engine
+
+
+def test_legs_run_concurrently_and_report_on_caller_thread():
+    caller = threading.get_ident()
+    seen_threads = []
+    started = threading.Barrier(2, timeout=5)
+
+    def fit(model_name, leg_progress, n_jobs):
+        started.wait()  # 두 갈래가 동시에 돌아야 통과
+        for trial in range(3):
+            leg_progress({'type': 'trial', 'model': model_name, 'trial': trial + 1})
+        return model_name, n_jobs
+
+    def progress(event):
+        seen_threads.append(threading.get_ident())
+
+    results = engine.run_stacking_legs(fit, progress)
+    assert [name for name, _ in results] == list(engine.REFITS)
+    assert all(n_jobs >= 1 for _, n_jobs in results)
+    assert seen_threads == [caller] * 6
+
+
+def test_cancel_from_progress_stops_both_legs():
+    # 진행 콜백이 예외를 내면 (작업 취소) 두 갈래 모두 다음 이벤트에서 멈춤
+    trials = {}
+
+    def fit(model_name, leg_progress, n_jobs):
+        for trial in range(200):
+            trials[model_name] = trial
+            leg_progress({'type': 'trial', 'model': model_name, 'trial': trial + 1})
+            time.sleep(0.01)
+        return model_name
+
+    class Cancelled(Exception):
+        pass
+
+    def progress(event):
+        if event['trial'] >= 5:
+            raise Cancelled()
+
+    with pytest.raises(Cancelled):
+        engine.run_stacking_legs(fit, progress)
+    time.sleep(0.3)
+    snapshot = dict(trials)
+    time.sleep(0.3)
+    assert trials == snapshot and max(trials.values()) < 199
+
+
+def test_leg_error_propagates():
+    def fit(model_name, leg_progress, n_jobs):
+        if model_name == 'LightGBM':
+            raise ValueError("bad params")
+        return model_name
+
+    with pytest.raises(ValueError, match='bad params'):
+        engine.run_stacking_legs(fit)
+
+
+def test_stacking_training_end_to_end():
+    pytest.importorskip('xgboost')
+    pytest.importorskip('lightgbm')
+    rng = np.random.default_rng(0)
+    n = 600
+    df = pd.DataFrame({'Year': 2024, 'FLT': [f"F{i:04d}" for i in range(n)],
+                       'RAM_Datetime': pd.date_range('2024-01-01', periods=n, freq='30min'),
+                       'Taxi_Distance': rng.random(n), 'Dep_Count_30': rng.integers(0, 20, n).astype(float)})
+    df[engine.TARGET_COL] = 10 + 20 * df['Taxi_Distance'] + df['Dep_Count_30'] + rng.random(n)
+    events = []
+    result = engine.run_training(df, ['Taxi_Distance', 'Dep_Count_30'], engine.MODE_STACKING, trials=2,
+                                 early_stop_rounds=0, train_years=[2024], progress=events.append)
+    artifact = result.artifact
+    assert artifact.lgb_model is not None and (artifact.meta_model.coef_ >= 0).all()
+    assert {e['model'] for e in events if e['type'] == 'trial'} == set(engine.REFITS)
+    assert len(result.X_test) == 60 and np.isfinite(result.metrics['MAE'])
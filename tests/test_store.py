@@ -0,0 +1,52 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import atd_engine as engine
+from atd_store import DatasetStore
+
+
+def write_master(path, seed=0, n=200):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'Year': 2024, 'FLT': [f"KE{i:03d}" for i in range(n)],
+                       'RAM_Datetime': pd.date_range('2024-03-01', periods=n, freq='7min'),
+                       'NAT': rng.choice(['KOR', 'USA'], n), 'Taxi_Distance': rng.random(n),
+                       engine.TARGET_COL: rng.integers(5, 40, n)})
+    df.to_parquet(path, index=False)
+    return str(path)
+
+
+def test_put_and_frame_round_trip(tmp_path):
+    source = write_master(tmp_path / 'master.parquet')
+    store = DatasetStore(str(tmp_path / 'store'))
+    digest = store.put(source)
+    with open(source, 'rb') as f:
+        # 업로드 파일 객체와 경로는 같은 데이터셋 ID
+        assert store.put(io.BytesIO(f.read())) == digest
+    assert len(store.entries()) == 1
+
+    frame = store.frame(digest)
+    expected, _ = engine.load_master(source)
+    assert list(frame.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(frame, expected, check_dtype=False)
+    # 숫자 컬럼은 매핑된 파일을 그대로 가리킴 (읽기 전용)
+    assert not frame['Taxi_Distance'].to_numpy().flags.writeable
+
+
+def test_evicts_least_recently_used(tmp_path):
+    store = DatasetStore(str(tmp_path / 'store'))
+    digests = [store.put(write_master(tmp_path / f"m{i}.parquet", seed=i)) for i in range(3)]
+    paths = [store.path(d) for d in digests]
+    for age, path in zip([300, 100, 200], paths):
+        os.utime(path, (os.path.getatime(path), os.path.getmtime(path) - age))
+    size = os.path.getsize(paths[0])
+
+    removed = store.evict(max_bytes=2 * size + size // 2)
+    assert removed == [paths[0]]
+    store.frame(digests[2])  # 읽으면 최근 사용으로 갱신
+    assert store.evict(max_bytes=size + size // 2) == [paths[1]]
+    with pytest.raises(FileNotFoundError):
+        store.frame(digests[0])
@@ -0,0 +1,87 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('scipy')
+pytest.importorskip('sklearn')
+
+from atd_geo import haversine_m  # noqa: E402
+from atd_taxiway import TaxiwayGraph, read_taxiways  # noqa: E402
+
+# 작은 유도로망 (lat, lon): A 가로, B 세로, C 대각선 지름길, D 위쪽 우회로, E 떨어진 구간
+P = {
+    'w': (37.460, 126.440), 'c': (37.460, 126.450), 'e': (37.460, 126.460),
+    's': (37.455, 126.450), 'n': (37.465, 126.450), 'ne': (37.465, 126.460),
+    'x1': (37.480, 126.480), 'x2': (37.481, 126.480),
+}
+LINES = {
+    'A': ['w', 'c', 'e'],
+    'B': ['s', 'c', 'n'],
+    'C': ['w', 'n'],
+    'D': ['n', 'ne', 'e'],
+    'E': ['x1', 'x2'],
+}
+STANDS = pd.DataFrame({'Stand_ID': ['101', '202'], 'Lat': [37.4549, 37.4600], 'Lon': [126.4500, 126.4399]})
+RUNWAYS = {'R1': (37.4651, 126.4601), 'R2': (37.4600, 126.4601), 'R3': (37.4811, 126.4800)}
+
+
+def gap(point, node):
+    return float(haversine_m(*point, *P[node]))
+
+
+def brute_force(start, goal):
+    # 모든 단순 경로를 나열해 가장 짧은 경로 (길이, 사용 유도로 집합)
+    edges = {}
+    for name, nodes in LINES.items():
+        for a, b in zip(nodes, nodes[1:]):
+            edges.setdefault(a, []).append((b, name))
+            edges.setdefault(b, []).append((a, name))
+    best = (np.inf, set())
+
+    def walk(node, seen, length, used):
+        nonlocal best
+        if node == goal:
+            best = min(best, (length, used), key=lambda b: b[0])
+            return
+        for nxt, name in edges.get(node, []):
+            if nxt not in seen:
+                walk(nxt, seen | {nxt}, length + float(haversine_m(*P[node], *P[nxt])), used | {name})
+
+    walk(start, {start}, 0.0, frozenset())
+    return best
+
+
+@pytest.fixture(scope='module')
+def graph(tmp_path_factory):
+    features = [{'type': 'Feature', 'properties': {'ref': name},
+                 'geometry': {'type': 'LineString', 'coordinates': [[P[p][1], P[p][0]] for p in nodes]}}
+                for name, nodes in LINES.items()]
+    path = tmp_path_factory.mktemp('taxiway') / 'toy.geojson'
+    path.write_text(json.dumps({'type': 'FeatureCollection', 'features': features}))
+    return TaxiwayGraph(read_taxiways(str(path)), STANDS, RUNWAYS)
+
+
+@pytest.mark.parametrize('stand, stand_node', [('101', 's'), ('202', 'w')])
+@pytest.mark.parametrize('runway, runway_node', [('R1', 'ne'), ('R2', 'e')])
+def test_routes_match_brute_force(graph, stand, stand_node, runway, runway_node):
+    length, used = brute_force(stand_node, runway_node)
+    stand_point = tuple(STANDS.set_index('Stand_ID').loc[stand, ['Lat', 'Lon']])
+    expected = length + gap(stand_point, stand_node) + gap(RUNWAYS[runway], runway_node)
+    dist, mask = graph.route([stand], [runway])
+    assert dist[0] == pytest.approx(expected, rel=1e-5)
+    flags = graph.taxiway_flags(mask).iloc[0]
+    assert {name for name in graph.taxiway_names if flags[f"Taxiway_{name}_Used"]} == used
+
+    coords = graph.path(stand, runway)
+    assert coords[0] == pytest.approx(P[stand_node]) and coords[-1] == pytest.approx(P[runway_node])
+    along = sum(float(haversine_m(*a, *b)) for a, b in zip(coords, coords[1:]))
+    assert along == pytest.approx(length, rel=1e-5)
+
+
+def test_unreachable_and_unknown(graph):
+    dist, mask = graph.route(['101', '999', '101'], ['R3', 'R1', 'R9'])
+    assert np.isnan(dist).all()
+    assert (mask == 0).all()
+    assert graph.path('101', 'R3') == []
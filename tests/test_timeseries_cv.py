@@ -0,0 +1,45 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from atd_engine import TimeSeriesCV
+
+
+def make_cv(n=103, n_splits=4, seed=0):
+    # 시각이 뒤섞인 행 + 같은 시각 (안정 정렬 -> 입력 순서 유지)
+    rng = np.random.default_rng(seed)
+    order = rng.integers(0, n // 2, n)
+    X = pd.DataFrame({'x': np.arange(n, dtype=float)})
+    return TimeSeriesCV(X, np.arange(n, dtype=float), order, n_splits), order
+
+
+@pytest.mark.parametrize('n_splits', [2, 4, 5])
+def test_folds_are_expanding_forward_blocks(n_splits):
+    cv, order = make_cv(n_splits=n_splits)
+    ranked = np.argsort(order, kind='stable')
+    blocks = np.array_split(ranked, n_splits + 1)
+
+    assert len(cv.folds) == n_splits
+    for k, (train_idx, valid_idx) in enumerate(cv.folds):
+        np.testing.assert_array_equal(train_idx, np.sort(np.concatenate(blocks[:k + 1])))
+        np.testing.assert_array_equal(valid_idx, np.sort(blocks[k + 1]))
+        # 검증 구간은 학습 구간보다 과거가 아님, 겹치는 행 없음
+        assert order[train_idx].max() <= order[valid_idx].min()
+        assert not np.intersect1d(train_idx, valid_idx).size
+
+
+def test_oof_covers_every_block_after_the_first_once():
+    cv, order = make_cv()
+    first_block = cv.folds[0][0]
+    np.testing.assert_array_equal(np.sort(cv.oof_index), np.setdiff1d(np.arange(len(order)), first_block))
+    np.testing.assert_array_equal(cv.oof_target, cv.y[cv.oof_index])
+
+
+def test_pickle_drops_fold_cache():
+    cv, _ = make_cv()
+    cv._cache[('XGBoost', 0)] = object()
+    restored = pickle.loads(pickle.dumps(cv))
+    assert restored._cache == {}
+    assert len(restored.folds) == len(cv.folds)
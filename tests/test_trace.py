@@ -0,0 +1,25 @@
+import pandas as pd
+
+import atd_trace as trace
+
+
+def test_load_round_trips_to_json(tmp_path):
+    tracer = trace.Tracer()
+    with tracer.span('run_training', rows=1000, mode='stacking'):
+        for k in range(3):
+            with tracer.span('XGBoost trial', rows=900, trial=k):
+                pass
+    path = tmp_path / 'spans.json'
+    path.write_text(tracer.to_json(), encoding='utf-8')
+
+    loaded = trace.load(path)
+    pd.testing.assert_frame_equal(loaded.to_frame(), tracer.to_frame())
+    pd.testing.assert_frame_equal(loaded.summary(), tracer.summary())
+    assert loaded.chrome_trace() == tracer.chrome_trace()
+
+
+def test_null_span_attrs_are_not_shared():
+    with trace.span('outside') as span:
+        span.attrs['x'] = 1
+    with trace.span('outside') as span:
+        assert span.attrs == {}
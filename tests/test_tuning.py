@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+optuna = pytest.importorskip('optuna')
+pytest.importorskip('xgboost')
+
+import atd_engine as engine  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({'Taxi_Distance': rng.random(400), 'Dep_Count_30': rng.integers(0, 20, 400).astype(float)})
+    y = pd.Series(np.log1p(10 + 20 * X['Taxi_Distance'] + X['Dep_Count_30'] + rng.random(400)))
+    train_pos, valid_pos = engine.tail_split(np.arange(len(X)))
+    return X.iloc[train_pos], y.iloc[train_pos], X.iloc[valid_pos], y.iloc[valid_pos]
+
+
+def test_plateau_callback_stops_after_patience():
+    # 첫 trial 이후 개선 없음 3번 -> 조기 종료 (가지치기된 trial도 개선 없음으로 셈)
+    events = []
+    callback = engine.OptunaPlateauCallback(20, 3, 'XGBoost', events.append)
+    study = optuna.create_study(direction='minimize')
+    values = iter([5.0, 6.0, None, 7.0, 1.0, 1.0])
+
+    def objective(trial):
+        value = next(values)
+        if value is None:
+            raise optuna.TrialPruned()
+        return value
+
+    study.optimize(objective, n_trials=20, callbacks=[callback])
+    assert len(study.trials) == 4
+    trials = [e for e in events if e['type'] == 'trial']
+    assert [e['stall'] for e in trials] == [0, 1, 2, 3]
+    assert [e['pruned'] for e in trials] == [False, False, True, False]
+    assert events[-1] == {'type': 'early_stop', 'model': 'XGBoost', 'patience': 3}
+
+
+def test_pruned_tuning_records_finished_trials(data):
+    tuning = engine.TuningConfig(pruner=engine.PRUNER_MEDIAN, round_early_stop=20, report_every=5)
+    study = engine.tune('XGBoost', data, trials=8, early_stop_rounds=0, tuning=tuning, n_jobs=1)
+    states = {t.state.name for t in study.trials}
+    assert len(study.trials) == 8 and states <= set(engine.FINISHED_STATES)
+    assert study.best_value < 5
+
+
+def test_parallel_workers_share_the_trial_budget(data):
+    events = []
+    tuning = engine.TuningConfig(n_workers=2)
+    study = engine.tune('XGBoost', data, trials=5, early_stop_rounds=0, progress=events.append, tuning=tuning, n_jobs=2)
+    assert len(study.trials) == 5
+    assert [e['trial'] for e in events if e['type'] == 'trial'] == [1, 2, 3, 4, 5]
+    assert 'stop_requested' not in study.user_attrs
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+import atd_whatif as whatif
+from atd_explain import EnsemblePredictor
+
+
+def test_value_grid():
+    np.testing.assert_array_equal(whatif.value_grid([1, 0, 1, np.nan]), [0, 1])
+    grid = whatif.value_grid(np.arange(1000), n_points=5)
+    assert len(grid) == 5 and grid[0] == pytest.approx(9.99) and grid[-1] == pytest.approx(989.01)
+
+
+@pytest.mark.parametrize('features', [['Taxi_Distance'], ['Taxi_Distance', 'Dep_Count_30']])
+def test_sweep_matches_row_by_row(stacking_artifact, features):
+    # 한 번의 배치 채점 = 항공편/격자 조합마다 값을 바꿔 따로 예측한 결과
+    artifact, X = stacking_artifact
+    predictor = EnsemblePredictor(artifact)
+    flights = X.iloc[:7]
+    grids = [whatif.value_grid(X[name], n_points=4) for name in features]
+    result = whatif.sweep(predictor, flights, features, grids)
+    assert result.ice.shape == (7,) + tuple(len(g) for g in grids)
+
+    for i, (_, row) in enumerate(flights.iterrows()):
+        for cell in np.ndindex(*result.ice.shape[1:]):
+            changed = row.to_frame().T.copy()
+            for name, grid, j in zip(features, grids, cell):
+                changed[name] = grid[j]
+            assert result.ice[(i,) + cell] == pytest.approx(artifact.predict(changed)[0], rel=1e-6)
+
+    np.testing.assert_allclose(result.partial_dependence, result.ice.mean(axis=0))
+    frame = result.frame()
+    assert len(frame) == result.ice.size
+    np.testing.assert_allclose(frame['Pred'], result.ice.reshape(-1))
+
+
+def test_sweep_rejects_large_grids(stacking_artifact, monkeypatch):
+    artifact, X = stacking_artifact
+    monkeypatch.setattr(whatif, 'MAX_GRID_ROWS', 100)
+    with pytest.raises(ValueError, match='limit'):
+        whatif.sweep(EnsemblePredictor(artifact), X, ['Taxi_Distance'], [np.linspace(0, 1, 10)])